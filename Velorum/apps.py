@@ -8,21 +8,28 @@ from django.apps import AppConfig
 class VelorumConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Velorum'
-    
+
     def ready(self):
         """
         Hook que se ejecuta cuando Django está listo
         """
         import os
-        
-        # Iniciar scheduler:
-        # - En desarrollo (runserver): solo cuando RUN_MAIN=true (evita duplicados en auto-reload)
-        # - En producción (gunicorn/otros): siempre (RUN_MAIN no existe)
+        from django.conf import settings
+
+        # Hooks de DRF para medir la serialización (Velorum/instrumentation.py)
+        from . import instrumentation
+        instrumentation.instalar()
+
+        # Los workers web no arrancan el scheduler: los jobs corren en un
+        # proceso dedicado (`python manage.py run_scheduler`).
+        # SCHEDULER_AUTOSTART=true lo arranca dentro del proceso (desarrollo);
+        # con runserver solo en el proceso principal (RUN_MAIN=true) para
+        # evitar duplicados en el auto-reload.
+        if not settings.SCHEDULER_AUTOSTART:
+            return
+
         run_main = os.environ.get('RUN_MAIN')
-        is_production = run_main is None  # gunicorn no setea RUN_MAIN
-        is_dev_main = run_main == 'true'  # runserver proceso principal
-        
-        if is_production or is_dev_main:
+        if run_main is None or run_main == 'true':
             try:
                 from . import scheduler
                 scheduler.start()
@@ -0,0 +1,172 @@
+"""
+Backend de cache en dos niveles para los workers de gunicorn
+
+- L1: LocMemCache del proceso, con TTL corto (L1_TIMEOUT). Evita ir a la red
+  en lecturas repetidas dentro del mismo worker.
+- L2: cache compartido entre workers y hosts (RedisCache si hay REDIS_URL).
+  Es la fuente de verdad; L1 solo guarda copias que vencen rápido, así que
+  una invalidación en otro worker se ve a más tardar en L1_TIMEOUT segundos.
+
+Las claves se arman una sola vez acá (KEY_PREFIX + VERSION de CACHES) y los
+dos niveles las usan tal cual. Subir CACHE_VERSION invalida todo el cache.
+
+`get_or_set` tiene protección contra estampidas: ante un miss, solo el worker
+que toma el lock en L2 calcula el valor; el resto espera a que aparezca.
+"""
+
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+_MISSING = object()
+
+
+def raw_key(key, key_prefix, version):
+    """KEY_FUNCTION de los niveles internos: la clave ya viene armada"""
+    return key
+
+
+class TieredCache(BaseCache):
+    """
+    CACHES = {'default': {
+        'BACKEND': 'Velorum.cache.TieredCache',
+        'OPTIONS': {
+            'L1_TIMEOUT': 5,
+            'L2': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://...'},
+        },
+    }}
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self.lock_wait = options.get('LOCK_WAIT', 5)
+        self.lock_poll = options.get('LOCK_POLL', 0.05)
+
+        self.l1 = LocMemCache(f'tiered-l1-{location}', {
+            'TIMEOUT': self.l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)},
+            'KEY_FUNCTION': raw_key,
+        })
+        l2 = dict(options.get('L2') or {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'})
+        backend = import_string(l2.pop('BACKEND'))
+        self.l2 = backend(l2.pop('LOCATION', f'tiered-l2-{location}'), {
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            **l2,
+            'KEY_FUNCTION': raw_key,
+        })
+
+    def _l1_ttl(self, timeout):
+        """TTL de la copia local: nunca más que L1_TIMEOUT"""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.l1_timeout
+        return min(self.l1_timeout, timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        valor = self.l1.get(key, _MISSING)
+        if valor is not _MISSING:
+            return valor
+        valor = self.l2.get(key, _MISSING)
+        if valor is _MISSING:
+            return default
+        self.l1.set(key, valor, self.l1_timeout)
+        return valor
+
+    def get_many(self, keys, version=None):
+        claves = {self.make_and_validate_key(key, version=version): key for key in keys}
+        encontrados = self.l1.get_many(claves)
+        faltantes = [k for k in claves if k not in encontrados]
+        if faltantes:
+            desde_l2 = self.l2.get_many(faltantes)
+            if desde_l2:
+                self.l1.set_many(desde_l2, self.l1_timeout)
+            encontrados.update(desde_l2)
+        return {claves[k]: v for k, v in encontrados.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.l2.set(key, value, timeout)
+        self.l1.set(key, value, self._l1_ttl(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        datos = {self.make_and_validate_key(k, version=version): v for k, v in data.items()}
+        fallidos = self.l2.set_many(datos, timeout)
+        self.l1.set_many(datos, self._l1_ttl(timeout))
+        return fallidos
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if not self.l2.add(key, value, timeout):
+            return False
+        self.l1.set(key, value, self._l1_ttl(timeout))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.l1.touch(key, self._l1_ttl(timeout))
+        return self.l2.touch(key, timeout)
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.l1.delete(key)
+        return self.l2.delete(key)
+
+    def delete_many(self, keys, version=None):
+        claves = [self.make_and_validate_key(key, version=version) for key in keys]
+        self.l1.delete_many(claves)
+        self.l2.delete_many(claves)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.l1.has_key(key) or self.l2.has_key(key)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # El contador vive en L2 (INCR atómico en Redis); la copia local se descarta
+        self.l1.delete(key)
+        return self.l2.incr(key, delta)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Como BaseCache.get_or_set, pero ante un miss solo un proceso calcula
+        `default`: toma un lock con add() en L2 (SET NX en Redis) y los demás
+        esperan hasta LOCK_WAIT segundos a que el valor aparezca.
+        """
+        valor = self.get(key, _MISSING, version=version)
+        if valor is not _MISSING:
+            return valor
+
+        lock = self.make_and_validate_key(f'{key}:lock', version=version)
+        if self.l2.add(lock, 1, self.lock_timeout):
+            try:
+                valor = default() if callable(default) else default
+                self.set(key, valor, timeout, version=version)
+            finally:
+                self.l2.delete(lock)
+            return valor
+
+        limite = time.monotonic() + self.lock_wait
+        while time.monotonic() < limite:
+            time.sleep(self.lock_poll)
+            valor = self.get(key, _MISSING, version=version)
+            if valor is not _MISSING:
+                return valor
+
+        # El que tenía el lock tardó demasiado (o murió): calcular igual
+        valor = default() if callable(default) else default
+        self.set(key, valor, timeout, version=version)
+        return valor
@@ -0,0 +1,241 @@
+"""
+Instrumentación por request: consultas SQL, tiempo en base, serialización y total
+
+InstrumentationMiddleware mide una muestra de los requests
+(INSTRUMENTATION_SAMPLE_RATE, 0 a 1). Para cada request muestreado:
+
+- cuenta las consultas y el tiempo en SQL con un execute_wrapper en cada
+  conexión;
+- acumula el tiempo de serialización: `serializer.data` de DRF (ahí corre
+  to_representation) y el render a JSON;
+- agrega el header `Server-Timing` (db, ser, app y total), que el navegador
+  muestra en la pestaña de red;
+- registra histogramas por ruta (nombre de la vista) y método, que expone
+  `/metrics` en formato de texto de Prometheus (solo administradores).
+
+Con el muestreo apagado (0, el valor por defecto) el middleware solo
+sortea el request: no envuelve conexiones ni toma tiempos. Los hooks de DRF
+se instalan una vez (VelorumConfig.ready) y sin muestra activa cuestan una
+lectura de contextvar.
+
+Las métricas viven en memoria de cada proceso: con varios workers cada uno
+publica las suyas (como `prometheus_client` sin modo multiproceso).
+"""
+
+import contextvars
+import functools
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_muestra_actual = contextvars.ContextVar('instrumentation_muestra', default=None)
+
+
+class Muestra:
+    """Tiempos de un request muestreado (en segundos)"""
+    __slots__ = ('consultas', 'db', 'serializacion', 'inicio', 'anidado')
+
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.serializacion = 0.0
+        self.inicio = time.perf_counter()
+        self.anidado = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper de las conexiones
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def medir_serializacion(func):
+    """
+    Suma la duración de `func` a la serialización del request muestreado,
+    sin las consultas que dispare (querysets lazy): esas ya cuentan como db.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        muestra = _muestra_actual.get()
+        if muestra is None or muestra.anidado:
+            return func(*args, **kwargs)
+        muestra.anidado = True
+        inicio = time.perf_counter()
+        db_antes = muestra.db
+        try:
+            return func(*args, **kwargs)
+        finally:
+            muestra.serializacion += time.perf_counter() - inicio - (muestra.db - db_antes)
+            muestra.anidado = False
+    wrapper._instrumentado = True
+    return wrapper
+
+
+def instalar():
+    """
+    Envuelve BaseSerializer.data (Serializer.data y ListSerializer.data lo
+    llaman vía super(); los serializers anidados usan to_representation y no
+    se cuentan dos veces) y JSONRenderer.render. Idempotente.
+    """
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data
+    if not getattr(data.fget, '_instrumentado', False):
+        BaseSerializer.data = property(medir_serializacion(data.fget))
+    if not getattr(JSONRenderer.render, '_instrumentado', False):
+        JSONRenderer.render = medir_serializacion(JSONRenderer.render)
+
+
+class Histograma:
+    __slots__ = ('buckets', 'conteos', 'suma', 'total')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            yield f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}'
+        yield f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.total}'
+        yield f'{nombre}_sum{{{etiquetas}}} {self.suma:.6f}'
+        yield f'{nombre}_count{{{etiquetas}}} {self.total}'
+
+
+METRICAS = {
+    'velorum_http_request_duration_seconds': ('Duración total del request', BUCKETS_SEGUNDOS),
+    'velorum_http_db_duration_seconds': ('Tiempo en consultas SQL por request', BUCKETS_SEGUNDOS),
+    'velorum_http_serialization_duration_seconds': ('Tiempo de serialización por request', BUCKETS_SEGUNDOS),
+    'velorum_http_db_queries': ('Consultas SQL por request', BUCKETS_CONSULTAS),
+}
+
+
+class Registro:
+    """Histogramas por (ruta, método) y contador por status, thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.histogramas = {nombre: {} for nombre in METRICAS}
+            self.requests = {}
+
+    def registrar(self, ruta, metodo, status, muestra, total):
+        valores = {
+            'velorum_http_request_duration_seconds': total,
+            'velorum_http_db_duration_seconds': muestra.db,
+            'velorum_http_serialization_duration_seconds': muestra.serializacion,
+            'velorum_http_db_queries': muestra.consultas,
+        }
+        clave = (ruta, metodo)
+        with self._lock:
+            for nombre, valor in valores.items():
+                por_ruta = self.histogramas[nombre]
+                if clave not in por_ruta:
+                    por_ruta[clave] = Histograma(METRICAS[nombre][1])
+                por_ruta[clave].observar(valor)
+            self.requests[(ruta, metodo, status)] = self.requests.get((ruta, metodo, status), 0) + 1
+
+    def exportar(self):
+        """Formato de texto de Prometheus (versión 0.0.4)"""
+        lineas = [
+            '# HELP velorum_http_requests_total Requests muestreados',
+            '# TYPE velorum_http_requests_total counter',
+        ]
+        with self._lock:
+            for (ruta, metodo, status), cantidad in sorted(self.requests.items()):
+                lineas.append(
+                    f'velorum_http_requests_total{{{_etiquetas(ruta, metodo)},status="{status}"}} {cantidad}'
+                )
+            for nombre, (ayuda, _) in METRICAS.items():
+                lineas.append(f'# HELP {nombre} {ayuda}')
+                lineas.append(f'# TYPE {nombre} histogram')
+                for (ruta, metodo), histograma in sorted(self.histogramas[nombre].items()):
+                    lineas.extend(histograma.lineas(nombre, _etiquetas(ruta, metodo)))
+        return '\n'.join(lineas) + '\n'
+
+
+def _etiquetas(ruta, metodo):
+    ruta = ruta.replace('\\', '\\\\').replace('"', '\\"')
+    return f'route="{ruta}",method="{metodo}"'
+
+
+registro = Registro()
+
+
+def _ruta(request):
+    # Nombre de la vista, no el path: /products/12/ y /products/13/ son la misma serie
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'sin_ruta'
+    return match.view_name or match._func_path
+
+
+def server_timing(muestra, total):
+    app = max(total - muestra.db - muestra.serializacion, 0)
+    return ', '.join([
+        f'db;dur={muestra.db * 1000:.1f};desc="{muestra.consultas} consultas"',
+        f'ser;dur={muestra.serializacion * 1000:.1f}',
+        f'app;dur={app * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ])
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tasa = settings.INSTRUMENTATION_SAMPLE_RATE
+        if tasa <= 0 or (tasa < 1 and random.random() >= tasa):
+            return self.get_response(request)
+
+        muestra = Muestra()
+        token = _muestra_actual.set(muestra)
+        try:
+            with ExitStack() as stack:
+                for conexion in connections.all():
+                    stack.enter_context(conexion.execute_wrapper(muestra))
+                response = self.get_response(request)
+        finally:
+            _muestra_actual.reset(token)
+        total = time.perf_counter() - muestra.inicio
+
+        if settings.INSTRUMENTATION_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(muestra, total)
+        registro.registrar(_ruta(request), request.method, response.status_code, muestra, total)
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Métricas de los requests muestreados, en formato Prometheus"""
+    return HttpResponse(registro.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,86 @@
+"""
+Benchmark de latencia, consultas y memoria de la API del market
+
+Crea una base de test descartable (SQLite en memoria con la configuración
+por defecto, o el archivo de --db-file), siembra los volúmenes pedidos,
+mide cada escenario (market/benchmark.py) y escribe un reporte JSON.
+
+Uso:
+    python manage.py benchmark_market --output bench.json
+    python manage.py benchmark_market --productos 10000 --iteraciones 50
+    python manage.py benchmark_market --escenarios product_list checkout
+    python manage.py benchmark_market --comparar bench-main.json   # diferencias con otro reporte
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from market.benchmark import VOLUMENES, Benchmark, comparar
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia, consultas y memoria de los endpoints del market sobre datos sembrados'
+
+    def add_arguments(self, parser):
+        for nombre, valor in VOLUMENES.items():
+            parser.add_argument(f'--{nombre.replace("_", "-")}', type=int, default=valor, dest=nombre)
+        parser.add_argument('--iteraciones', type=int, default=20)
+        parser.add_argument('--escenarios', nargs='+', help='Solo estos escenarios (por defecto todos)')
+        parser.add_argument('--output', help='Archivo del reporte JSON (por defecto stdout)')
+        parser.add_argument('--comparar', help='Reporte JSON anterior para mostrar las diferencias')
+        parser.add_argument('--db-file', help='Archivo SQLite para la base del benchmark (por defecto en memoria)')
+
+    def handle(self, *args, **options):
+        if options['iteraciones'] < 1:
+            raise CommandError('--iteraciones debe ser al menos 1')
+        base = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                base = json.load(archivo)
+
+        if options['db_file']:
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = options['db_file']
+
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            benchmark = Benchmark({nombre: options[nombre] for nombre in VOLUMENES}, options['iteraciones'])
+            try:
+                reporte = benchmark.ejecutar(options['escenarios'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        salida = json.dumps(reporte, indent=2, sort_keys=True, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Reporte escrito en {options['output']}"))
+        else:
+            self.stdout.write(salida)
+
+        self._resumen(reporte, comparar(base, reporte) if base else None)
+
+    def _resumen(self, reporte, diferencias):
+        # A stderr, para no mezclarse con el JSON cuando va a stdout
+        self.stderr.write(f"{'escenario':<24}{'consultas':>10}{'mediana ms':>12}{'p95 ms':>10}{'memoria KB':>12}")
+        for nombre, resultado in reporte['escenarios'].items():
+            latencia = resultado['latencia_ms']
+            linea = (
+                f"{nombre:<24}{resultado['consultas']:>10}{latencia['mediana']:>12.2f}"
+                f"{latencia['p95']:>10.2f}{resultado['memoria_kb']:>12.1f}"
+            )
+            if diferencias and nombre in diferencias:
+                consultas = diferencias[nombre]['consultas']
+                variacion = diferencias[nombre]['mediana_ms'][2]
+                if consultas[0] != consultas[1]:
+                    linea += f"  consultas {consultas[0]} -> {consultas[1]}"
+                if variacion is not None:
+                    linea += f"  mediana {variacion:+.1f}%"
+            self.stderr.write(linea)
@@ -0,0 +1,119 @@
+"""
+Benchmark de la sincronización con el proveedor sin red
+
+Reproduce una grabación (market/provider_replay.py) sobre una base de test
+descartable y corre sync_external_products `--rondas` veces: la primera crea
+todo el catálogo y las siguientes no encuentran cambios. Informa, por ronda,
+la duración y cada etapa de SyncRun con su rendimiento (cantidad / segundo).
+
+Uso:
+    python manage.py benchmark_sync --fixture proveedor.jsonl.gz
+    python manage.py benchmark_sync --productos 50000 --output sync.json   # grabación sintética temporal
+    python manage.py benchmark_sync --productos 10000 --memoria            # + pico de memoria (más lento)
+"""
+
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from market.benchmark import git_commit
+from market.provider_replay import generar_fixture
+from market.scraper import sync_external_products
+
+
+class Command(BaseCommand):
+    help = 'Mide las etapas de la sincronización reproduciendo una grabación del proveedor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixture', help='Grabación a reproducir')
+        parser.add_argument('--productos', type=int, help='Sin --fixture: genera una grabación sintética de este tamaño')
+        parser.add_argument('--rondas', type=int, default=2)
+        parser.add_argument('--memoria', action='store_true', help='Medir el pico de memoria con tracemalloc')
+        parser.add_argument('--output', help='Archivo del reporte JSON (por defecto stdout)')
+        parser.add_argument('--db-file', help='Archivo SQLite para la base del benchmark (por defecto en memoria)')
+
+    def handle(self, *args, **options):
+        if bool(options['fixture']) == bool(options['productos']):
+            raise CommandError('Indicar --fixture o --productos')
+        if options['rondas'] < 1:
+            raise CommandError('--rondas debe ser al menos 1')
+
+        temporal = None
+        fixture = options['fixture']
+        if not fixture:
+            temporal = tempfile.NamedTemporaryFile(suffix='.jsonl.gz', delete=False)
+            temporal.close()
+            fixture = temporal.name
+            generar_fixture(fixture, options['productos'])
+
+        if options['db_file']:
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = options['db_file']
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(SCRAPER_TRANSPORT='replay', SCRAPER_FIXTURE=fixture, TELEGRAM_BOT_TOKEN=None):
+                rondas = [self.ronda(options['memoria']) for _ in range(options['rondas'])]
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+            if temporal:
+                os.unlink(temporal.name)
+
+        reporte = {
+            'meta': {
+                'commit': git_commit(),
+                'fixture': options['fixture'] or f"sintetico ({options['productos']} productos)",
+                'base_de_datos': connection.vendor,
+            },
+            'rondas': rondas,
+        }
+        salida = json.dumps(reporte, indent=2, sort_keys=True, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Reporte escrito en {options['output']}"))
+        else:
+            self.stdout.write(salida)
+        self._resumen(rondas)
+
+    def ronda(self, memoria):
+        if memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        resultado = sync_external_products()
+        total = time.perf_counter() - inicio
+        if not resultado['success']:
+            raise CommandError(resultado.get('error', 'La sincronización falló'))
+        ronda = {
+            'segundos': round(total, 3),
+            'productos': resultado['productos'],
+            'nuevos': resultado['nuevos'],
+            'actualizados': resultado['actualizados'],
+            'sin_cambios': resultado['sin_cambios'],
+            'etapas': {
+                etapa: {**datos, 'por_segundo': round(datos['cantidad'] / datos['segundos'], 1) if datos['segundos'] else None}
+                for etapa, datos in resultado['etapas'].items()
+            },
+        }
+        if memoria:
+            ronda['memoria_pico_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            tracemalloc.stop()
+        return ronda
+
+    def _resumen(self, rondas):
+        # A stderr, para no mezclarse con el JSON cuando va a stdout
+        for numero, ronda in enumerate(rondas, 1):
+            linea = f"ronda {numero}: {ronda['segundos']:.2f}s, {ronda['productos']} productos"
+            if 'memoria_pico_kb' in ronda:
+                linea += f", pico {ronda['memoria_pico_kb'] / 1024:.1f} MB"
+            self.stderr.write(linea)
+            for etapa, datos in ronda['etapas'].items():
+                por_segundo = f"{datos['por_segundo']:>12.1f}/s" if datos['por_segundo'] else ''
+                self.stderr.write(f"  {etapa:<12}{datos['segundos']:>10.3f}s{datos['cantidad']:>10}{por_segundo}")
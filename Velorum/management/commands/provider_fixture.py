@@ -0,0 +1,57 @@
+"""
+Grabaciones del proveedor para correr el scraper sin red (market/provider_replay.py)
+
+Uso:
+    python manage.py provider_fixture grabar --output proveedor.jsonl.gz
+    python manage.py provider_fixture generar --productos 50000 --output sintetico.jsonl.gz
+    python manage.py provider_fixture generar --productos 100000 --base proveedor.jsonl.gz --output grande.jsonl.gz
+
+`grabar` pide la home y todas las páginas de CATEGORIAS_CONFIG al proveedor
+real (no escribe en la base). Para reproducir una grabación:
+SCRAPER_TRANSPORT=replay SCRAPER_FIXTURE=<archivo>.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from market import scraper
+from market.provider_replay import generar_fixture
+
+
+class Command(BaseCommand):
+    help = 'Graba las respuestas del proveedor o genera una grabación sintética'
+
+    def add_arguments(self, parser):
+        acciones = parser.add_subparsers(dest='accion', required=True)
+        grabar = acciones.add_parser('grabar', help='Graba las respuestas del proveedor real')
+        grabar.add_argument('--output', required=True)
+        generar = acciones.add_parser('generar', help='Genera una grabación sintética')
+        generar.add_argument('--output', required=True)
+        generar.add_argument('--productos', type=int, default=10000)
+        generar.add_argument('--base', help='Grabación real cuyos productos se usan de plantilla')
+        generar.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['accion'] == 'grabar':
+            self.grabar(options['output'])
+        else:
+            if options['productos'] < 1:
+                raise CommandError('--productos debe ser al menos 1')
+            por_categoria = generar_fixture(
+                options['output'], options['productos'], base=options['base'], semilla=options['semilla']
+            )
+            detalle = ', '.join(f'{nombre}: {cantidad}' for nombre, cantidad in por_categoria.items())
+            self.stdout.write(self.style.SUCCESS(f"Grabación sintética en {options['output']} ({detalle})"))
+
+    def grabar(self, archivo):
+        with override_settings(SCRAPER_TRANSPORT='record', SCRAPER_FIXTURE=archivo):
+            session, csrf_token = scraper.get_session_and_csrf()
+            if not session or not csrf_token:
+                raise CommandError('No se pudo establecer sesión con el proveedor')
+            client = scraper.ProviderClient(session, csrf_token)
+            for config in scraper.CATEGORIAS_CONFIG.values():
+                productos = scraper.scrape_category(
+                    session, csrf_token, config['ids'], config['categoria_nombre'], client
+                )
+                self.stdout.write(f"{config['categoria_nombre']}: {len(productos)} productos")
+        self.stdout.write(self.style.SUCCESS(f'{len(client.page_timings)} páginas grabadas en {archivo}'))
@@ -0,0 +1,45 @@
+"""
+Proceso dedicado para los jobs en segundo plano (sincronización del proveedor)
+
+Uso:
+    python manage.py run_scheduler          # corre hasta recibir SIGINT/SIGTERM
+    python manage.py run_scheduler --once   # una sincronización si es el líder
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from Velorum import scheduler
+
+
+def _salir(signum, frame):
+    raise SystemExit(0)
+
+
+class Command(BaseCommand):
+    help = 'Corre el scheduler de tareas en segundo plano con elección de líder'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Ejecuta una sincronización (si este proceso es el líder) y termina',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            from market.scraper import sync_external_products
+
+            resultado = scheduler.leader_only(sync_external_products)()
+            if resultado is None:
+                self.stdout.write('Otro proceso es el líder del scheduler; no se sincronizó')
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Sincronización: {resultado.get('message', resultado)}"))
+            scheduler.release_leadership()
+            return
+
+        # SIGTERM (docker stop, systemd) corta igual que Ctrl+C y libera el lease
+        signal.signal(signal.SIGTERM, _salir)
+        self.stdout.write(self.style.SUCCESS(f'Scheduler dedicado en ejecución ({scheduler.OWNER})'))
+        scheduler.run_forever()
@@ -1,56 +1,164 @@
 """
 Configuración del scheduler para tareas automáticas
+
+Los workers web no arrancan ningún scheduler. Los jobs corren en un proceso
+dedicado (`python manage.py run_scheduler`) y, si por error hay más de uno,
+un lease en base de datos (market.SchedulerLease) elige un único líder:
+solo el titular del lease ejecuta los jobs; los demás quedan en espera y
+toman el control si el líder deja de renovarlo.
 """
 
+import functools
+import logging
+import os
+import socket
+
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-import logging
+from django.conf import settings
+from django.db import close_old_connections
 
 logger = logging.getLogger(__name__)
 
+LEASE_NAME = 'scheduler'
+OWNER = f'{socket.gethostname()}:{os.getpid()}'
+
 scheduler = BackgroundScheduler()
 scheduler_started = False
 
 
+def is_leader():
+    """Toma o renueva el lease del scheduler; True si este proceso es el líder"""
+    from market.models import SchedulerLease
+
+    close_old_connections()
+    try:
+        return SchedulerLease.acquire(LEASE_NAME, OWNER, settings.SCHEDULER_LEASE_SECONDS)
+    except Exception as e:
+        logger.error(f"Error al renovar el lease del scheduler: {str(e)}")
+        return False
+    finally:
+        close_old_connections()
+
+
+def leader_only(func):
+    """Ejecuta el job solo si este proceso tiene el lease del scheduler"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_leader():
+            logger.info(f"⏸️ {func.__name__} omitido: otro proceso es el líder del scheduler")
+            return None
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def release_leadership():
+    from market.models import SchedulerLease
+
+    try:
+        SchedulerLease.release(LEASE_NAME, OWNER)
+    except Exception as e:
+        logger.error(f"Error al liberar el lease del scheduler: {str(e)}")
+
+
+def configure_jobs(target):
+    """Registra los jobs en el scheduler `target`"""
+    from market.scraper import sync_external_products
+    from market.mp_events import process_mp_events
+    from market.telegram import drain_outbox
+
+    # Heartbeat: mantiene el lease mientras el líder esté vivo (incluso
+    # durante una sincronización larga) y permite el failover si muere
+    target.add_job(
+        func=is_leader,
+        trigger=IntervalTrigger(seconds=max(settings.SCHEDULER_LEASE_SECONDS // 3, 1)),
+        id='scheduler_heartbeat',
+        name='Renovar lease del scheduler',
+        replace_existing=True,
+        max_instances=1,
+    )
+
+    # Configurar job de sincronización cada 30 minutos
+    target.add_job(
+        func=leader_only(sync_external_products),
+        trigger=IntervalTrigger(minutes=settings.SCHEDULER_SYNC_MINUTES),
+        id='sync_external_products',
+        name='Sincronizar productos externos',
+        replace_existing=True,
+        max_instances=1  # Solo una instancia a la vez
+    )
+
+    # Cola de notificaciones de Telegram: un único worker (el líder) la vacía
+    target.add_job(
+        func=leader_only(drain_outbox),
+        trigger=IntervalTrigger(seconds=settings.TELEGRAM_OUTBOX_SECONDS),
+        id='drain_telegram_outbox',
+        name='Enviar notificaciones de Telegram',
+        replace_existing=True,
+        max_instances=1,
+    )
+
+    # Notificaciones de pago de Mercado Pago registradas por el webhook
+    target.add_job(
+        func=leader_only(process_mp_events),
+        trigger=IntervalTrigger(seconds=settings.MERCADOPAGO_EVENTS_SECONDS),
+        id='process_mp_events',
+        name='Procesar notificaciones de Mercado Pago',
+        replace_existing=True,
+        max_instances=1,
+    )
+
+
 def start():
     """
-    Inicia el scheduler cuando Django arranca
+    Inicia el scheduler en segundo plano dentro del proceso actual.
+    Solo se usa con SCHEDULER_AUTOSTART (desarrollo); en producción
+    correr `python manage.py run_scheduler`.
     """
     global scheduler_started
-    
+
     if scheduler_started:
         logger.info("Scheduler ya está en ejecución")
         return
-    
+
     try:
-        from market.scraper import sync_external_products
-        
-        # Configurar job de sincronización cada 30 minutos
-        scheduler.add_job(
-            func=sync_external_products,
-            trigger=IntervalTrigger(minutes=30),
-            id='sync_external_products',
-            name='Sincronizar productos externos',
-            replace_existing=True,
-            max_instances=1  # Solo una instancia a la vez
-        )
-        
+        configure_jobs(scheduler)
         scheduler.start()
         scheduler_started = True
-        
-        logger.info("✅ Scheduler iniciado - Sincronización automática cada 30 minutos")
-        
+
+        logger.info(f"✅ Scheduler iniciado - Sincronización automática cada {settings.SCHEDULER_SYNC_MINUTES} minutos")
+
     except Exception as e:
         logger.error(f"Error al iniciar scheduler: {str(e)}")
 
 
+def run_forever():
+    """Corre el scheduler en primer plano hasta recibir una señal de corte"""
+    runner = BlockingScheduler()
+    configure_jobs(runner)
+    is_leader()
+    logger.info(f"✅ Scheduler dedicado iniciado ({OWNER})")
+    try:
+        runner.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        release_leadership()
+        logger.info("Scheduler dedicado detenido")
+
+
 def stop():
     """
     Detiene el scheduler
     """
     global scheduler_started
-    
+
     if scheduler_started:
         scheduler.shutdown()
         scheduler_started = False
+        release_leadership()
         logger.info("Scheduler detenido")
@@ -74,6 +74,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Velorum.instrumentation.InstrumentationMiddleware',  # primero: mide el request completo
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -184,6 +185,10 @@ REST_FRAMEWORK = {
     ],
  }
 
+# Paginación keyset del catálogo (market.pagination.ProductKeysetPagination)
+PRODUCTS_PAGE_SIZE = int(os.getenv('PRODUCTS_PAGE_SIZE', '24'))
+PRODUCTS_MAX_PAGE_SIZE = int(os.getenv('PRODUCTS_MAX_PAGE_SIZE', '100'))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),  # Duración del token de acceso
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),     # Duración del token de refresco
@@ -205,15 +210,71 @@ SIMPLE_JWT = {
 # Mercado Pago Configuration
 MERCADOPAGO_ACCESS_TOKEN = os.getenv('MERCADOPAGO_ACCESS_TOKEN', 'TEST-4465996122919556-112013-3b348094cef7d20c6e26358ae34779d1-183650403')
 MERCADOPAGO_PUBLIC_KEY = os.getenv('MERCADOPAGO_PUBLIC_KEY', 'TEST-86cf3df5-ce45-468f-bc58-782a35b1550e')
+# Cliente HTTP compartido (market/mercadopago_service.py)
+MERCADOPAGO_API_URL = os.getenv('MERCADOPAGO_API_URL', 'https://api.mercadopago.com')
+MERCADOPAGO_CONNECT_TIMEOUT = float(os.getenv('MERCADOPAGO_CONNECT_TIMEOUT', '3.05'))
+MERCADOPAGO_READ_TIMEOUT = float(os.getenv('MERCADOPAGO_READ_TIMEOUT', '10'))
+MERCADOPAGO_MAX_RETRIES = int(os.getenv('MERCADOPAGO_MAX_RETRIES', '3'))
+MERCADOPAGO_POOL_SIZE = int(os.getenv('MERCADOPAGO_POOL_SIZE', '10'))  # conexiones keep-alive por proceso
+# Cola de notificaciones del webhook (market/mp_events.py)
+MERCADOPAGO_EVENTS_SECONDS = int(os.getenv('MERCADOPAGO_EVENTS_SECONDS', '5'))
+MERCADOPAGO_EVENTS_MAX_INTENTOS = int(os.getenv('MERCADOPAGO_EVENTS_MAX_INTENTOS', '8'))
+MERCADOPAGO_EVENTS_BACKOFF_SECONDS = int(os.getenv('MERCADOPAGO_EVENTS_BACKOFF_SECONDS', '30'))
+MERCADOPAGO_EVENTS_CLAIM_SECONDS = int(os.getenv('MERCADOPAGO_EVENTS_CLAIM_SECONDS', '120'))  # reclamo de un worker caído
+
+# Instrumentación por request (Velorum/instrumentation.py): fracción de
+# requests muestreados (0 = apagado, 1 = todos) y header Server-Timing
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', '0'))
+INSTRUMENTATION_SERVER_TIMING = os.getenv('INSTRUMENTATION_SERVER_TIMING', 'True').lower() in ('1', 'true', 'yes')
+
+# Cache de respuestas del catálogo público (market/catalog_cache.py); 0 lo desactiva
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '300'))
+
+# Scraper del proveedor (market/scraper.py)
+SCRAPER_MAX_CONCURRENCY = int(os.getenv('SCRAPER_MAX_CONCURRENCY', '4'))  # requests simultáneos
+SCRAPER_REQUESTS_PER_SECOND = float(os.getenv('SCRAPER_REQUESTS_PER_SECOND', '5'))  # por host
+SCRAPER_MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', '3'))
+SCRAPER_BACKOFF_FACTOR = float(os.getenv('SCRAPER_BACKOFF_FACTOR', '0.5'))
+SCRAPER_TIMEOUT = int(os.getenv('SCRAPER_TIMEOUT', '15'))
+SCRAPER_BULK_BATCH_SIZE = int(os.getenv('SCRAPER_BULK_BATCH_SIZE', '500'))  # filas por INSERT/UPDATE
+# Transporte (market/provider_replay.py): live, record (graba en SCRAPER_FIXTURE) o replay (sin red)
+SCRAPER_TRANSPORT = os.getenv('SCRAPER_TRANSPORT', 'live')
+SCRAPER_FIXTURE = os.getenv('SCRAPER_FIXTURE', '')
+
+# Scheduler (Velorum/scheduler.py): corre en `python manage.py run_scheduler`
+SCHEDULER_AUTOSTART = os.getenv('SCHEDULER_AUTOSTART', 'False').lower() in ('1', 'true', 'yes')  # solo desarrollo
+SCHEDULER_LEASE_SECONDS = int(os.getenv('SCHEDULER_LEASE_SECONDS', '90'))  # failover si el líder muere
+SCHEDULER_SYNC_MINUTES = int(os.getenv('SCHEDULER_SYNC_MINUTES', '30'))
 
 # Telegram Configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_TIMEOUT = int(os.getenv("TELEGRAM_TIMEOUT", "10"))
+# Cola de notificaciones (market/telegram.py), la vacía el job del scheduler
+TELEGRAM_OUTBOX_SECONDS = int(os.getenv("TELEGRAM_OUTBOX_SECONDS", "15"))
+TELEGRAM_DIGEST_MAX = int(os.getenv("TELEGRAM_DIGEST_MAX", "5"))  # pedidos por mensaje; 1 = sin agrupar
+TELEGRAM_MAX_INTENTOS = int(os.getenv("TELEGRAM_MAX_INTENTOS", "8"))
+TELEGRAM_BACKOFF_SECONDS = int(os.getenv("TELEGRAM_BACKOFF_SECONDS", "30"))
+
+# Cache Configuration (Velorum/cache.py)
+# L1 en memoria de cada worker + L2 compartido. Con REDIS_URL el L2 es Redis
+# (compartido entre workers y hosts); sin él, memoria local (desarrollo).
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHE_L2 = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}
+else:
+    CACHE_L2 = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
 
-# Cache Configuration
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': BASE_DIR / 'cache',
+        'BACKEND': 'Velorum.cache.TieredCache',
+        'KEY_PREFIX': 'velorum',
+        'VERSION': int(os.getenv('CACHE_VERSION', '1')),  # subirlo invalida todo el cache
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')),
+        'OPTIONS': {
+            'L1_TIMEOUT': int(os.getenv('CACHE_L1_TIMEOUT', '5')),  # staleness máxima entre workers
+            'L2': CACHE_L2,
+        },
     }
 }
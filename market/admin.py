@@ -46,4 +46,48 @@ class UsoCodigoDescuentoAdmin(admin.ModelAdmin):
     list_filter = ('fecha_uso', 'codigo')
     search_fields = ('codigo__codigo', 'orden__id', 'usuario__username')
     readonly_fields = ('fecha_uso',)
-    
\ No newline at end of file
+    
+
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'categoria', 'markup', 'markup_oferta', 'redondeo', 'redondeo_hacia_arriba', 'actualizado')
+    list_select_related = ('categoria',)
+    readonly_fields = ('actualizado',)
+
+
+@admin.register(TelegramOutbox)
+class TelegramOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'pedido', 'estado', 'intentos', 'proximo_intento', 'creado', 'enviado_en')
+    list_filter = ('estado', 'creado')
+    readonly_fields = ('creado', 'enviado_en', 'ultimo_error')
+
+
+@admin.register(MercadoPagoEvent)
+class MercadoPagoEventAdmin(admin.ModelAdmin):
+    list_display = ('payment_id', 'pedido', 'estado', 'estado_pago', 'notificaciones', 'intentos', 'ultima_notificacion', 'procesado_en')
+    list_filter = ('estado', 'estado_pago')
+    search_fields = ('payment_id',)
+    readonly_fields = ('recibido', 'ultima_notificacion', 'procesado_en', 'ultimo_error')
+
+
+@admin.register(SyncRun)
+class SyncRunAdmin(admin.ModelAdmin):
+    list_display = (
+        'iniciado', 'estado', 'origen', 'usuario', 'duracion_segundos', 'paginas', 'productos',
+        'nuevos', 'actualizados', 'sin_cambios', 'desactivados', 'segundos_fetch', 'segundos_persist',
+    )
+    list_filter = ('estado', 'origen', 'iniciado')
+    list_select_related = ('usuario',)
+    date_hierarchy = 'iniciado'
+    readonly_fields = [field.name for field in SyncRun._meta.fields]
+
+    @admin.display(description='fetch (s)')
+    def segundos_fetch(self, obj):
+        return obj.segundos_etapa('fetch')
+
+    @admin.display(description='persist (s)')
+    def segundos_persist(self, obj):
+        return obj.segundos_etapa('persist')
+
+    def has_add_permission(self, request):
+        return False
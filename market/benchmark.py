@@ -0,0 +1,284 @@
+"""
+Benchmark de la API del market: latencia, consultas y memoria por escenario
+
+Siembra un volumen configurable de catálogo, pedidos y carrito y mide cada
+escenario con el test client de DRF (pasa por middleware, permisos y
+serializers, como un request real):
+
+- `consultas`: consultas SQL de una ejecución (después del warmup)
+- `memoria_kb`: pico de memoria asignada durante esa ejecución (tracemalloc)
+- `latencia_ms`: min / mediana / p95 / max de `iteraciones` ejecuciones sin
+  instrumentar
+
+El reporte es JSON con claves ordenadas para poder compararlo entre commits
+(ver `comparar`). Lo usa `python manage.py benchmark_market`, que corre todo
+sobre una base de test descartable.
+"""
+
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from decimal import Decimal
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from account_admin.models import User
+
+from .fake_mercadopago import FakeMercadoPago
+from .mercadopago_service import reset_sdk
+from .models import Cart, CartItem, Category, Order, OrderDetail, Product
+from .mp_events import process_mp_events
+from .scraper import CATEGORIAS_CONFIG, persist_products
+
+VOLUMENES = {
+    'productos': 2000,
+    'categorias': 3,
+    'pedidos': 200,
+    'items_por_pedido': 3,
+    'items_carrito': 20,
+    'productos_sync': 500,
+}
+
+
+def producto_proveedor(external_id, precio=1000, cantidad=5):
+    """Producto con la forma del JSON del proveedor (ver scraper.normalize_product_data)"""
+    return {
+        'idProductos': external_id,
+        'p_nombre': f'Producto {external_id}',
+        'p_descripcion': 'Descripción del producto',
+        'p_precio': precio,
+        'p_link': f'producto-{external_id}',
+        'stock': [{'s_cantidad': cantidad, 's_ilimitado': 0, 's_precio': precio}],
+        'imagenes': [{'i_link': f'img/{external_id}.jpg'}],
+    }
+
+
+class Benchmark:
+    def __init__(self, volumenes=None, iteraciones=20):
+        self.volumenes = {**VOLUMENES, **(volumenes or {})}
+        self.iteraciones = iteraciones
+
+    # Siembra ----------------------------------------------------------------
+
+    def sembrar(self):
+        v = self.volumenes
+        # Las categorías del proveedor, para que sync arme external_url
+        nombres = [c['categoria_nombre'] for c in CATEGORIAS_CONFIG.values()]
+        nombres += [f'Categoría {i}' for i in range(len(nombres), v['categorias'])]
+        self.categorias = [
+            Category.objects.get_or_create(nombre=nombre, defaults={'descripcion': nombre})[0]
+            for nombre in nombres[:max(v['categorias'], 1)]
+        ]
+        Product.objects.bulk_create([
+            Product(
+                nombre=f'Reloj {i}', descripcion='Reloj de pulsera', slug=f'bench-reloj-{i}',
+                precio=Decimal(1000 + i), precio_proveedor=Decimal(500 + i), stock_ilimitado=True,
+                en_oferta=i % 5 == 0, precio_oferta=Decimal(900 + i) if i % 5 == 0 else None,
+                categoria=self.categorias[i % len(self.categorias)], imagenes=[f'https://cdn/{i}.jpg'],
+            )
+            for i in range(v['productos'])
+        ], batch_size=500)
+        self.producto_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+
+        self.cliente = User.objects.create_user(
+            username='bench-cliente', email='cliente@bench.local', password='x', role='client'
+        )
+        self.admin = User.objects.create_user(
+            username='bench-admin', email='admin@bench.local', password='x', role='admin', is_staff=True
+        )
+        pedidos = Order.objects.bulk_create([
+            Order(usuario=self.cliente, direccion_envio='Calle 123', total=0) for _ in range(v['pedidos'])
+        ])
+        OrderDetail.objects.bulk_create([
+            OrderDetail(
+                pedido=pedido, producto_id=self.producto_ids[(n * v['items_por_pedido'] + j) % len(self.producto_ids)],
+                cantidad=1, subtotal=Decimal('1000'),
+            )
+            for n, pedido in enumerate(pedidos) for j in range(v['items_por_pedido'])
+        ])
+        self.carrito = Cart.objects.create(usuario=self.cliente)
+        self.llenar_carrito()
+
+        self.sync_categoria = self.categorias[0]
+        self.sync_json = [producto_proveedor(900000 + i) for i in range(v['productos_sync'])]
+        persist_products(self.sync_json, self.sync_categoria)
+
+    def llenar_carrito(self):
+        CartItem.objects.filter(carrito=self.carrito).delete()
+        CartItem.objects.bulk_create([
+            CartItem(carrito=self.carrito, producto_id=pk, cantidad=1)
+            for pk in self.producto_ids[:self.volumenes['items_carrito']]
+        ])
+
+    def api(self, usuario=None):
+        client = APIClient()
+        if usuario is not None:
+            client.force_authenticate(user=usuario)
+        return client
+
+    # Escenarios -------------------------------------------------------------
+
+    def escenarios(self):
+        """{nombre: (preparar, ejecutar)}; `preparar` no se mide"""
+        anonimo = self.api()
+        cliente = self.api(self.cliente)
+        admin = self.api(self.admin)
+        productos = reverse('product-list')
+        sync = {'ronda': 0}
+        mp = self.mp
+        pagos = {'siguiente': 1}
+
+        def sin_cache():
+            cache.clear()
+
+        def cambiar_precios():
+            # 10% del catálogo del proveedor cambia de precio en cada ronda
+            sync['ronda'] += 1
+            for producto in self.sync_json[::10]:
+                producto['stock'][0]['s_precio'] = 1000 + sync['ronda']
+
+        def notificacion():
+            payment_id = pagos['siguiente']
+            pagos['siguiente'] += 1
+            pedido = Order.objects.create(usuario=self.cliente, total=100)
+            mp.agregar_pago(payment_id, order_id=pedido.id, monto=100)
+            return payment_id
+
+        def webhook():
+            payment_id = notificacion()
+            return lambda: anonimo.post(
+                reverse('mp-webhook'), {'type': 'payment', 'data': {'id': payment_id}}, format='json'
+            )
+
+        def worker():
+            anonimo.post(reverse('mp-webhook'), {'type': 'payment', 'data': {'id': notificacion()}}, format='json')
+            return process_mp_events
+
+        return {
+            'product_list': (sin_cache, lambda: anonimo.get(productos)),
+            'product_list_cached': (None, lambda: anonimo.get(productos)),
+            'product_list_card': (sin_cache, lambda: anonimo.get(productos, {'view': 'card'})),
+            'product_list_ordered': (sin_cache, lambda: anonimo.get(productos, {'ordering': 'precio_final', 'disponible': 'true'})),
+            'cart_read': (None, lambda: cliente.get(reverse('cart-list'))),
+            'checkout': (self.llenar_carrito, lambda: cliente.post(reverse('cart-checkout'))),
+            'order_list': (None, lambda: admin.get(reverse('order-list'))),
+            'my_orders': (None, lambda: cliente.get(reverse('order-my-orders'))),
+            'webhook': (webhook, None),
+            'webhook_worker': (worker, None),
+            'sync_sin_cambios': (None, lambda: persist_products(self.sync_json, self.sync_categoria)),
+            'sync_cambios': (cambiar_precios, lambda: persist_products(self.sync_json, self.sync_categoria)),
+        }
+
+    # Medición ---------------------------------------------------------------
+
+    def _una_vez(self, preparar, ejecutar):
+        # Si preparar devuelve una función, esa es la que se mide
+        preparado = preparar() if preparar else None
+        return ejecutar or preparado
+
+    def medir(self, preparar, ejecutar):
+        # Warmup: caches de proceso (tabla de precios, SDK, etc.)
+        self._una_vez(preparar, ejecutar)()
+
+        funcion = self._una_vez(preparar, ejecutar)
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = funcion()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # Leerlas ya: el próximo request vuelve a vaciar el log
+        consultas = len(ctx.captured_queries)
+
+        tiempos = []
+        for _ in range(self.iteraciones):
+            funcion = self._una_vez(preparar, ejecutar)
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        resultado = {
+            'consultas': consultas,
+            'memoria_kb': round(pico / 1024, 1),
+            'latencia_ms': {
+                'min': round(tiempos[0], 3),
+                'mediana': round(statistics.median(tiempos), 3),
+                'p95': round(tiempos[min(int(len(tiempos) * 0.95), len(tiempos) - 1)], 3),
+                'max': round(tiempos[-1], 3),
+            },
+        }
+        status = getattr(respuesta, 'status_code', None)
+        if status is not None:
+            resultado['status'] = status
+        return resultado
+
+    def ejecutar(self, nombres=None):
+        """Siembra, corre los escenarios (todos o `nombres`) y devuelve el reporte"""
+        inicio = time.perf_counter()
+        with FakeMercadoPago() as self.mp, override_settings(
+            MERCADOPAGO_API_URL=self.mp.url, MERCADOPAGO_ACCESS_TOKEN='TEST-benchmark',
+            TELEGRAM_BOT_TOKEN=None, CATALOG_CACHE_TIMEOUT=300,
+        ):
+            reset_sdk()
+            try:
+                self.sembrar()
+                siembra_s = time.perf_counter() - inicio
+                escenarios = self.escenarios()
+                desconocidos = set(nombres or []) - set(escenarios)
+                if desconocidos:
+                    raise ValueError(f'Escenarios desconocidos: {", ".join(sorted(desconocidos))}')
+                resultados = {
+                    nombre: self.medir(*escenarios[nombre])
+                    for nombre in (nombres or escenarios)
+                }
+            finally:
+                reset_sdk()
+        return {
+            'meta': {
+                'fecha': timezone.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base_de_datos': connection.vendor,
+                'volumenes': self.volumenes,
+                'iteraciones': self.iteraciones,
+                'siembra_s': round(siembra_s, 2),
+            },
+            'escenarios': resultados,
+        }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def comparar(base, actual):
+    """
+    Diferencias entre dos reportes: {escenario: {'consultas': (antes, después),
+    'mediana_ms': (antes, después, variación %)}} para los escenarios en común.
+    """
+    diferencias = {}
+    for nombre, resultado in actual['escenarios'].items():
+        anterior = base.get('escenarios', {}).get(nombre)
+        if anterior is None:
+            continue
+        antes = anterior['latencia_ms']['mediana']
+        despues = resultado['latencia_ms']['mediana']
+        variacion = round((despues - antes) / antes * 100, 1) if antes else None
+        diferencias[nombre] = {
+            'consultas': (anterior['consultas'], resultado['consultas']),
+            'mediana_ms': (antes, despues, variacion),
+        }
+    return diferencias
@@ -0,0 +1,169 @@
+"""
+Cache de respuestas del catálogo público (categorías y productos)
+
+Las respuestas de list/retrieve se guardan en el cache compartido con una
+clave que incluye la *generación* del catálogo: un contador que se incrementa
+ante cualquier escritura de productos o categorías (Product.save, las
+escrituras masivas de ProductQuerySet, Category.save, etc.). Invalidar es
+O(1): las claves de la generación anterior dejan de usarse y vencen solas.
+
+La clave también incluye el alcance del usuario (el staff ve productos
+desactivados), el host y la URL con sus query params ordenados.
+
+La misma generación da ETags fuertes y, junto con el momento del último
+cambio, Last-Modified: un GET condicional que no cambió responde 304 sin
+consultar la base ni serializar.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+GENERATION_KEY = 'catalog:generation'
+MODIFIED_KEY = 'catalog:modified'
+
+
+def _generacion_inicial():
+    # Basada en el reloj (ms): si el cache se vacía, la generación nueva es
+    # mayor que cualquiera anterior y no reutiliza ETags viejos
+    return int(time.time() * 1000)
+
+
+def catalog_generation():
+    """Generación actual del catálogo (la inicializa si no existe)"""
+    generacion = cache.get(GENERATION_KEY)
+    if generacion is None:
+        cache.add(GENERATION_KEY, _generacion_inicial(), None)
+        generacion = cache.get(GENERATION_KEY)
+    return generacion
+
+
+def catalog_last_modified():
+    """
+    Timestamp (segundos) del último cambio del catálogo. Se guarda en cada
+    bump; si el cache lo perdió se reconstruye desde las columnas `actualizado`.
+    """
+    modificado = cache.get(MODIFIED_KEY)
+    if modificado is None:
+        from .models import Category, Product
+
+        fechas = [
+            Product.objects.aggregate(m=Max('actualizado'))['m'],
+            Category.objects.aggregate(m=Max('actualizado'))['m'],
+        ]
+        fechas = [f.timestamp() for f in fechas if f is not None]
+        cache.add(MODIFIED_KEY, max(fechas) if fechas else time.time(), None)
+        modificado = cache.get(MODIFIED_KEY)
+    return int(modificado)
+
+
+def _incrementar():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # La clave no existía (cache vacío o expulsada)
+        cache.add(GENERATION_KEY, _generacion_inicial(), None)
+    cache.set(MODIFIED_KEY, time.time(), None)
+
+
+def bump_catalog_generation():
+    """
+    Invalida todas las respuestas cacheadas del catálogo. Se incrementa ya y
+    otra vez al confirmar la transacción en curso: así una lectura concurrente
+    que cacheó datos previos al commit tampoco sobrevive.
+    """
+    _incrementar()
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        transaction.on_commit(_incrementar)
+
+
+def catalog_scope(user):
+    """Alcance de visibilidad: el staff ve productos desactivados"""
+    if getattr(user, 'role', None) in ['admin', 'operator']:
+        return 'staff'
+    return 'public'
+
+
+def _variante(request):
+    """Digest de lo que hace distinta a una respuesta: alcance, host, URL y params"""
+    query = '&'.join(f'{k}={v}' for k, v in sorted(request.query_params.lists()))
+    base = f'{catalog_scope(request.user)}|{request.get_host()}{request.path}?{query}'
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+
+def catalog_cache_key(request, vista, generacion=None):
+    generacion = catalog_generation() if generacion is None else generacion
+    return f'catalog:{generacion}:{vista}:{_variante(request)}'
+
+
+def catalog_etag(request, generacion=None):
+    """ETag fuerte: cambia con la generación y con la variante pedida"""
+    generacion = catalog_generation() if generacion is None else generacion
+    return f'"{generacion}-{_variante(request)[:32]}"'
+
+
+class CatalogCacheMixin:
+    """
+    Cachea list y retrieve de un ViewSet del catálogo y responde GETs
+    condicionales (If-None-Match / If-Modified-Since) con 304. Los permisos
+    ya se evaluaron en initial(); en un hit no se toca la base ni se serializa.
+    """
+    catalog_cache_timeout = None  # None: settings.CATALOG_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self._catalog_cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._catalog_cached(super().retrieve, request, *args, **kwargs)
+
+    def _catalog_cached(self, handler, request, *args, **kwargs):
+        generacion = catalog_generation()
+        modificado = catalog_last_modified()
+        validadores = HttpResponse()
+        validadores['ETag'] = catalog_etag(request, generacion)
+        validadores['Last-Modified'] = http_date(modificado)
+        patch_vary_headers(validadores, ['Authorization'])
+        condicional = get_conditional_response(
+            request, etag=validadores['ETag'], last_modified=modificado, response=validadores
+        )
+        if condicional is not validadores:
+            return condicional  # 304 (o 412) sin tocar la base
+
+        response = self._catalog_response(handler, generacion, request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = validadores['ETag']
+            response['Last-Modified'] = validadores['Last-Modified']
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def _catalog_response(self, handler, generacion, request, *args, **kwargs):
+        timeout = self.catalog_cache_timeout
+        if timeout is None:
+            timeout = settings.CATALOG_CACHE_TIMEOUT
+        if not timeout:
+            return handler(request, *args, **kwargs)
+
+        clave = catalog_cache_key(request, f'{self.basename}-{self.action}', generacion)
+        calculado = []
+
+        def calcular():
+            response = handler(request, *args, **kwargs)
+            calculado.append(response)
+            return response.status_code, response.data
+
+        # get_or_set del TieredCache: ante un miss calcula un solo worker
+        status_code, data = cache.get_or_set(clave, calcular, timeout)
+        if calculado:
+            response = calculado[0]
+            response['X-Cache'] = 'MISS'
+            return response
+        return Response(data, status=status_code, headers={'X-Cache': 'HIT'})
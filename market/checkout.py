@@ -0,0 +1,125 @@
+"""
+Reserva de stock transaccional para la creación de pedidos
+
+El flujo debe correr dentro de `transaction.atomic()`:
+
+1. Bloquea los productos afectados con un único SELECT ... FOR UPDATE
+   ordenado por id (orden fijo entre transacciones: sin deadlocks).
+2. Valida contra las filas bloqueadas: que existan, estén visibles y alcance
+   el stock (si no, StockInsuficiente o ProductoNoDisponible: un 400).
+3. Descuenta todo el stock con un único UPDATE condicional: cada fila solo
+   se modifica si todavía alcanza (`stock_proveedor - stock_vendido >= cantidad`),
+   así que aun en motores sin FOR UPDATE (SQLite) nunca se sobrevende.
+"""
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db.models import Case, F, IntegerField, Q, When
+
+from .models import Order, OrderDetail, Product
+
+
+class StockInsuficiente(Exception):
+    """No hay stock para alguno de los productos pedidos"""
+
+    def __init__(self, producto, disponible=None):
+        self.producto = producto
+        self.disponible = producto.stock_disponible if disponible is None else disponible
+        super().__init__(
+            f'Stock insuficiente para {producto.nombre}. '
+            f'Solo hay {self.disponible} unidades disponibles'
+        )
+
+
+class ProductoNoDisponible(StockInsuficiente):
+    """El producto ya no existe o está oculto (desactivado)"""
+
+    def __init__(self, producto_id, producto=None):
+        self.producto_id = producto_id
+        self.producto = producto
+        self.disponible = 0
+        nombre = producto.nombre if producto is not None else f'con ID {producto_id}'
+        Exception.__init__(self, f'El producto {nombre} ya no está disponible')
+
+
+def _validar(cantidades, productos):
+    """Primer producto (en orden de id) que falta, está oculto o no alcanza"""
+    for pk in sorted(cantidades):
+        producto = productos.get(pk)
+        if producto is None or producto.desactivado:
+            raise ProductoNoDisponible(pk, producto)
+        if cantidades[pk] > producto.stock_disponible:
+            raise StockInsuficiente(producto)
+
+
+def _bloquear_productos(ids):
+    """SELECT ... FOR UPDATE de los productos, siempre en orden de id"""
+    return {p.pk: p for p in Product.objects.select_for_update().filter(pk__in=ids).order_by('id')}
+
+
+def reservar_stock(cantidades):
+    """
+    Descuenta stock para `cantidades` ({producto_id: cantidad}).
+
+    Returns:
+        dict: {producto_id: Product} con las filas bloqueadas (precio vigente)
+
+    Raises:
+        StockInsuficiente: si algún producto no alcanza, o ProductoNoDisponible
+        (subclase) si ya no existe o está oculto; la transacción que envuelve
+        la llamada debe descartarse.
+    """
+    cantidades = {pk: cantidad for pk, cantidad in cantidades.items() if cantidad > 0}
+    if not cantidades:
+        return {}
+    productos = _bloquear_productos(cantidades)
+    _validar(cantidades, productos)
+
+    alcanza = Q()
+    for pk, cantidad in cantidades.items():
+        alcanza |= Q(pk=pk) & (
+            Q(stock_ilimitado=True) | Q(stock_proveedor__gte=F('stock_vendido') + cantidad)
+        )
+    # update_catalog: el stock disponible se ve en el catálogo (invalida su cache)
+    actualizados = Product.objects.filter(alcanza, desactivado=False).update_catalog(
+        stock_vendido=Case(
+            *[When(pk=pk, then=F('stock_vendido') + cantidad) for pk, cantidad in cantidades.items()],
+            default=F('stock_vendido'),
+            output_field=IntegerField(),
+        )
+    )
+    if actualizados != len(cantidades):
+        # Otra transacción tomó el stock (u ocultó o borró el producto) entre
+        # el bloqueo y el UPDATE, solo posible sin FOR UPDATE real: informar
+        # el primero que ya no se puede reservar
+        _validar(cantidades, Product.objects.in_bulk(list(cantidades)))
+        raise StockInsuficiente(productos[min(cantidades)])
+
+    for pk, cantidad in cantidades.items():
+        productos[pk].stock_vendido += cantidad
+        productos[pk].descartar_derivados()  # stock_disponible/disponible los recalculó la base
+    return productos
+
+
+def crear_pedido(items, **datos_pedido):
+    """
+    Reserva stock, crea el pedido con su total y sus detalles en lote.
+    `items` son pares (producto_id, cantidad); `datos_pedido` son los campos
+    del Order. Debe llamarse dentro de `transaction.atomic()`.
+    """
+    cantidades = Counter()
+    for producto_id, cantidad in items:
+        cantidades[producto_id] += cantidad
+    productos = reservar_stock(cantidades)
+
+    subtotales = {pk: productos[pk].precio * cantidad for pk, cantidad in cantidades.items()}
+    datos_pedido['total'] = sum(subtotales.values(), Decimal('0'))
+    pedido = Order.objects.create(**datos_pedido)
+
+    # bulk_create no pasa por OrderDetail.save: el subtotal va explícito
+    OrderDetail.objects.bulk_create([
+        OrderDetail(pedido=pedido, producto=productos[pk], cantidad=cantidad, subtotal=subtotales[pk])
+        for pk, cantidad in sorted(cantidades.items())
+    ])
+    return pedido
@@ -0,0 +1,121 @@
+"""
+Servidor falso de la API de Mercado Pago (tests y benchmarks)
+
+Atiende en 127.0.0.1 los endpoints que usa mercadopago_service:
+
+    POST /checkout/preferences  -> 201 {id, init_point, sandbox_init_point}
+    GET  /v1/payments/<id>      -> 200 con el pago cargado en `pagos`
+
+Es HTTP/1.1 con keep-alive, así que permite medir la reutilización de
+conexiones; `latencia` (segundos) simula el round trip a la API real.
+
+    with FakeMercadoPago(latencia=0.05) as mp:
+        with override_settings(MERCADOPAGO_API_URL=mp.url):
+            ...
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGO_RE = re.compile(r'^/v1/payments/(?P<id>[^/?]+)')
+
+
+class FakeMercadoPago:
+    def __init__(self, latencia=0):
+        self.latencia = latencia
+        self.requests = []  # (método, path, cuerpo)
+        self.conexiones = set()
+        self.respuestas = []  # (status, cuerpo) a devolver antes de la respuesta normal
+        self.pagos = {}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers y cuerpo en un solo write y sin Nagle: si no, el delayed ACK
+            # de TCP suma ~40 ms por request con keep-alive y falsea las mediciones
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def _responder(self, status, cuerpo):
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                try:
+                    self.wfile.write(datos)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # el cliente cortó por timeout
+
+            def _atender(self, metodo):
+                largo = int(self.headers.get('Content-Length', 0))
+                cuerpo = json.loads(self.rfile.read(largo)) if largo else None
+                with fake._lock:
+                    fake.requests.append((metodo, self.path, cuerpo))
+                    fake.conexiones.add(self.client_address)
+                    forzada = fake.respuestas.pop(0) if fake.respuestas else None
+                if fake.latencia:
+                    time.sleep(fake.latencia)
+                if forzada:
+                    return self._responder(*forzada)
+                return self._responder(*fake.resolver(metodo, self.path, cuerpo))
+
+            def do_GET(self):
+                self._atender('GET')
+
+            def do_POST(self):
+                self._atender('POST')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def resolver(self, metodo, path, cuerpo):
+        if metodo == 'POST' and path.startswith('/checkout/preferences'):
+            preference_id = f'pref-{uuid.uuid4().hex[:12]}'
+            return 201, {
+                'id': preference_id,
+                'init_point': f'{self.url}/checkout?pref_id={preference_id}',
+                'sandbox_init_point': f'{self.url}/sandbox/checkout?pref_id={preference_id}',
+                'external_reference': (cuerpo or {}).get('external_reference'),
+            }
+        coincidencia = PAGO_RE.match(path) if metodo == 'GET' else None
+        if coincidencia:
+            pago = self.pagos.get(coincidencia['id'])
+            if pago is None:
+                return 404, {'message': 'Payment not found', 'status': 404}
+            return 200, pago
+        return 404, {'message': 'resource not found', 'status': 404}
+
+    def agregar_pago(self, payment_id, order_id, status='approved', monto=100, **extra):
+        """Registra un pago para GET /v1/payments/<id>"""
+        self.pagos[str(payment_id)] = {
+            'id': int(payment_id),
+            'status': status,
+            'status_detail': 'accredited' if status == 'approved' else status,
+            'external_reference': str(order_id),
+            'transaction_amount': monto,
+            'payment_method_id': 'visa',
+            **extra,
+        }
+        return self.pagos[str(payment_id)]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
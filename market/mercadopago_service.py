@@ -1,10 +1,28 @@
 # Servicio de Mercado Pago
+#
+# Un único cliente del SDK por proceso (get_sdk): el SDK oficial abre una
+# requests.Session nueva en cada llamada; PooledHttpClient la reemplaza por
+# una sesión persistente con pool de conexiones keep-alive y timeouts
+# configurables (MERCADOPAGO_CONNECT_TIMEOUT / MERCADOPAGO_READ_TIMEOUT).
+# MERCADOPAGO_API_URL permite apuntar a un servidor falso (market/fake_mercadopago.py).
+import logging
+import threading
+import time
 import mercadopago
+import requests
+from mercadopago.config.request_options import RequestOptions
+from mercadopago.http.http_client import HttpClient
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 from django.core.cache import cache
 from decimal import Decimal
 import os
 
+logger = logging.getLogger(__name__)
+
+MP_API_URL = "https://api.mercadopago.com"
+
 FRONT_URL = os.getenv("FRONT_URL")
 
 if not FRONT_URL:
@@ -19,6 +37,76 @@ if not BACK_URL:
 
 BACK_URL = BACK_URL.rstrip("/")
 
+
+class PooledHttpClient(HttpClient):
+    """HttpClient del SDK con una sesión HTTP persistente (keep-alive)"""
+
+    def __init__(self, base_url=None, connect_timeout=None, read_timeout=None, max_retries=None, pool_size=None):
+        self.base_url = (base_url or settings.MERCADOPAGO_API_URL).rstrip("/")
+        self.timeout = (
+            connect_timeout or settings.MERCADOPAGO_CONNECT_TIMEOUT,
+            read_timeout or settings.MERCADOPAGO_READ_TIMEOUT,
+        )
+        retries = settings.MERCADOPAGO_MAX_RETRIES if max_retries is None else max_retries
+        pool_size = pool_size or settings.MERCADOPAGO_POOL_SIZE
+        # Mismos reintentos que el SDK (429 y 5xx; POST no se reintenta)
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=retries, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, maxretries=None, **kwargs):
+        if url.startswith(MP_API_URL):
+            url = self.base_url + url[len(MP_API_URL):]
+        # El SDK manda su connection_timeout; usamos (connect, read) de settings
+        kwargs["timeout"] = self.timeout
+        inicio = time.perf_counter()
+        api_result = self.session.request(method, url, **kwargs)
+        logger.debug(
+            "mp.http method=%s path=%s status=%s duracion_ms=%.1f",
+            method, url[len(self.base_url):], api_result.status_code, (time.perf_counter() - inicio) * 1000,
+        )
+        return {"status": api_result.status_code, "response": api_result.json()}
+
+    def close(self):
+        self.session.close()
+
+
+_sdks = {}
+_sdk_lock = threading.Lock()
+
+
+def get_sdk():
+    """
+    SDK de Mercado Pago compartido por el proceso (uno por access token y
+    URL de API). Thread-safe: requests.Session admite uso concurrente.
+    """
+    clave = (settings.MERCADOPAGO_ACCESS_TOKEN, settings.MERCADOPAGO_API_URL)
+    sdk = _sdks.get(clave)
+    if sdk is None:
+        with _sdk_lock:
+            sdk = _sdks.get(clave)
+            if sdk is None:
+                sdk = mercadopago.SDK(
+                    settings.MERCADOPAGO_ACCESS_TOKEN,
+                    http_client=PooledHttpClient(),
+                    request_options=RequestOptions(max_retries=settings.MERCADOPAGO_MAX_RETRIES),
+                )
+                _sdks[clave] = sdk
+    return sdk
+
+
+def reset_sdk():
+    """Descarta los clientes cacheados (cambio de credenciales, tests)"""
+    with _sdk_lock:
+        for sdk in _sdks.values():
+            sdk.http_client.close()
+        _sdks.clear()
+
 def create_preference(order_data, request=None):
     """
     Crea una preferencia de pago en Mercado Pago
@@ -34,8 +122,8 @@ def create_preference(order_data, request=None):
     Returns:
         dict con preference_id e init_point
     """
-    # Inicializar SDK de Mercado Pago
-    sdk = mercadopago.SDK(settings.MERCADOPAGO_ACCESS_TOKEN)
+    # Cliente compartido del proceso (conexiones reutilizadas)
+    sdk = get_sdk()
     
     # Preparar items para MP
     items = []
@@ -75,26 +163,34 @@ def create_preference(order_data, request=None):
         "statement_descriptor": "VELORUM"
     }
     
-    print(f"📤 Preference data a enviar: {preference_data}")
+    logger.debug("mp.preference.request order_id=%s payload=%s", order_data['order_id'], preference_data)
     
     # Crear preferencia
+    inicio = time.perf_counter()
     preference_response = sdk.preference().create(preference_data)
-    
-    print(f"📨 Respuesta de MP: {preference_response}")
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    status = preference_response.get("status")
     
     # Verificar si hubo error
-    if preference_response.get("status") != 201:
+    if status != 201:
         error_msg = preference_response.get("response", {}).get("message", "Error desconocido de Mercado Pago")
-        print(f"❌ Error de MP: {error_msg}")
+        logger.error(
+            "mp.preference.error order_id=%s status=%s duracion_ms=%.1f error=%s",
+            order_data['order_id'], status, duracion_ms, error_msg,
+        )
         raise Exception(f"Error de Mercado Pago: {error_msg}")
     
     preference = preference_response["response"]
     
     # Verificar que tengamos los datos necesarios
     if "id" not in preference or "init_point" not in preference:
-        print(f"❌ Respuesta de MP incompleta: {preference}")
+        logger.error("mp.preference.incompleta order_id=%s claves=%s", order_data['order_id'], sorted(preference))
         raise Exception("Mercado Pago no devolvió preference_id o init_point. Verificá tus credenciales.")
     
+    logger.info(
+        "mp.preference.ok order_id=%s preference_id=%s duracion_ms=%.1f",
+        order_data['order_id'], preference["id"], duracion_ms,
+    )
     return {
         "preference_id": preference["id"],
         "init_point": preference["init_point"],  # URL para redirigir al usuario
@@ -112,11 +208,18 @@ def process_payment_notification(payment_id):
     Returns:
         dict con información del pago
     """
-    sdk = mercadopago.SDK(settings.MERCADOPAGO_ACCESS_TOKEN)
+    sdk = get_sdk()
     
     # Obtener información del pago
+    inicio = time.perf_counter()
     payment_info = sdk.payment().get(payment_id)
     payment = payment_info["response"]
+    logger.info(
+        "mp.payment.get payment_id=%s status=%s estado_pago=%s duracion_ms=%.1f",
+        payment_id, payment_info.get("status"), payment.get("status"), (time.perf_counter() - inicio) * 1000,
+    )
+    if payment_info.get("status") != 200:
+        raise Exception(f"Error de Mercado Pago ({payment_info.get('status')}): {payment.get('message', 'pago no disponible')}")
     
     return {
         "status": payment["status"],  # approved, pending, rejected, etc.
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-17 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0007_order_apellido_invitado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['precio', 'id'], name='product_precio_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['nombre', 'id'], name='product_nombre_id_idx'),
+        ),
+    ]
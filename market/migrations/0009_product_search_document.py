@@ -0,0 +1,103 @@
+# Generated by Django 5.2 on 2026-10-17 00:00
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copia congelada del normalizador de market/search.py: la migración debe dar
+# siempre el mismo documento aunque el código de búsqueda cambie después.
+STOPWORDS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'para', 'por', 'sin', 'su', 'sus', 'un', 'una', 'unos', 'unas', 'y', 'o',
+}
+_TAGS_RE = re.compile(r'<[^>]+>')
+_NO_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    texto = _TAGS_RE.sub(' ', texto or '')
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALNUM_RE.sub(' ', texto.lower()).strip()
+
+
+def stem(token):
+    if token.isdigit() or len(token) <= 3:
+        return token
+    if token.endswith('ces') and len(token) > 4:
+        token = token[:-3] + 'z'
+    elif token.endswith('es') and len(token) > 4 and token[-3] not in 'aeiou':
+        token = token[:-2]
+    elif token.endswith('s'):
+        token = token[:-1]
+    if len(token) > 4 and token[-1] in 'aeo':
+        token = token[:-1]
+    return token
+
+
+def tokenizar(texto):
+    return [stem(t) for t in normalizar(texto).split() if t not in STOPWORDS]
+
+
+def build_search_document(nombre, descripcion):
+    nombre_tokens = tokenizar(nombre)
+    return ' '.join(nombre_tokens + nombre_tokens + tokenizar(descripcion))
+
+
+def poblar_y_crear_indices(apps, schema_editor):
+    Product = apps.get_model('market', 'Product')
+    vendor = schema_editor.connection.vendor
+
+    productos = list(Product.objects.only('id', 'nombre', 'descripcion'))
+    for producto in productos:
+        producto.search_document = build_search_document(producto.nombre, producto.descripcion)
+    Product.objects.bulk_update(productos, ['search_document'], batch_size=500)
+
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX product_search_gin_idx ON market_product "
+            "USING GIN (to_tsvector('simple', search_document))"
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            "CREATE FULLTEXT INDEX product_search_ft_idx ON market_product (search_document)"
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE market_product_fts USING fts5(search_document)"
+            )
+        except Exception:
+            # SQLite compilado sin FTS5: la búsqueda usa el fallback por términos
+            return
+        schema_editor.execute(
+            "INSERT INTO market_product_fts(rowid, search_document) "
+            "SELECT id, search_document FROM market_product"
+        )
+
+
+def borrar_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_gin_idx")
+    elif vendor == 'mysql':
+        schema_editor.execute("DROP INDEX product_search_ft_idx ON market_product")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS market_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0008_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(poblar_y_crear_indices, borrar_indices),
+    ]
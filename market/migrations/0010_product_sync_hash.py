@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0009_product_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sync_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0010_product_sync_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('owner', models.CharField(max_length=255)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Lease del Scheduler',
+                'verbose_name_plural': 'Leases del Scheduler',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 00:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0011_scheduler_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
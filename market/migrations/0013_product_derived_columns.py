@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-17 00:21
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0012_catalog_actualizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='disponible',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('desactivado', False), models.Q(('stock_ilimitado', True), ('stock_proveedor__gt', models.F('stock_vendido')), _connector='OR')), then=models.Value(True)), default=models.Value(False)), output_field=models.BooleanField()),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stock_disponible',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(stock_ilimitado=True, then=models.Value(999999)), models.When(stock_proveedor__gt=models.F('stock_vendido'), then=django.db.models.expressions.CombinedExpression(models.F('stock_proveedor'), '-', models.F('stock_vendido'))), default=models.Value(0)), output_field=models.PositiveIntegerField()),
+        ),
+        # precio_final se crea en 0014, ya leyendo precio_oferta
+    ]
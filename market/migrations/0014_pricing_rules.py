@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-17 00:26
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F
+
+
+def precio_oferta_inicial(apps, schema_editor):
+    # Markup histórico del 100% sobre el precio de oferta del proveedor
+    Product = apps.get_model('market', 'Product')
+    Product.objects.filter(precio_oferta_proveedor__gt=0).update(precio_oferta=F('precio_oferta_proveedor') * 2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0013_product_derived_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='precio_oferta',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(precio_oferta_inicial, migrations.RunPython.noop),
+        # precio_final (y sus índices) se crea recién acá, con precio_oferta ya
+        # calculado: una sola columna generada y un solo backfill
+        migrations.AddField(
+            model_name='product',
+            name='precio_final',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(en_oferta=True, precio_oferta__gt=0, then=models.F('precio_oferta')), default=models.F('precio')), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['precio_final', 'id'], name='product_precio_final_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['disponible', 'precio_final', 'id'], name='product_disp_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['en_oferta', 'precio_final', 'id'], name='product_oferta_precio_idx'),
+        ),
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('markup', models.DecimalField(decimal_places=3, default=Decimal('2'), help_text='Multiplicador (2 = 100% de margen)', max_digits=6)),
+                ('markup_oferta', models.DecimalField(blank=True, decimal_places=3, help_text='Multiplicador para ofertas (vacío = el mismo markup)', max_digits=6, null=True)),
+                ('redondeo', models.DecimalField(decimal_places=2, default=Decimal('0.01'), help_text='Múltiplo al que se redondea (0.01, 1, 10, 100...)', max_digits=8)),
+                ('redondeo_hacia_arriba', models.BooleanField(default=False, help_text='Redondear siempre hacia arriba en vez de al más cercano')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('categoria', models.OneToOneField(blank=True, help_text='Vacío = regla global', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='regla_precio', to='market.category')),
+            ],
+            options={
+                'verbose_name': 'Regla de Precio',
+                'verbose_name_plural': 'Reglas de Precios',
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('categoria', models.Value(0)), name='pricing_rule_una_por_categoria', violation_error_message='Ya existe una regla de precios global.')],
+            },
+        ),
+    ]
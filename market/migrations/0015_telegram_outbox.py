@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-17 00:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0014_pricing_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('texto', models.TextField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True, default='')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('enviado_en', models.DateTimeField(blank=True, null=True)),
+                ('pedido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notificaciones', to='market.order')),
+            ],
+            options={
+                'verbose_name': 'Notificación de Telegram',
+                'verbose_name_plural': 'Notificaciones de Telegram',
+                'indexes': [models.Index(fields=['estado', 'proximo_intento', 'id'], name='telegram_outbox_cola_idx')],
+            },
+        ),
+    ]
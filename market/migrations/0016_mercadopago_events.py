@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 00:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0015_telegram_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MercadoPagoEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_id', models.CharField(max_length=64, unique=True)),
+                ('topic', models.CharField(default='payment', max_length=50)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('procesado', 'Procesado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('notificaciones', models.PositiveIntegerField(default=1)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True, default='')),
+                ('estado_pago', models.CharField(blank=True, default='', max_length=30)),
+                ('recibido', models.DateTimeField(auto_now_add=True)),
+                ('ultima_notificacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('procesado_en', models.DateTimeField(blank=True, null=True)),
+                ('pedido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos_mp', to='market.order')),
+            ],
+            options={
+                'verbose_name': 'Evento de Mercado Pago',
+                'verbose_name_plural': 'Eventos de Mercado Pago',
+                'indexes': [models.Index(fields=['estado', 'proximo_intento', 'id'], name='mp_event_cola_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-17 00:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0016_mercadopago_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('iniciado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finalizado', models.DateTimeField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('en_curso', 'En curso'), ('ok', 'Completada'), ('error', 'Con error')], default='en_curso', max_length=20)),
+                ('origen', models.CharField(choices=[('scheduler', 'Scheduler'), ('manual', 'Manual')], default='scheduler', max_length=20)),
+                ('duracion_segundos', models.FloatField(blank=True, null=True)),
+                ('paginas', models.PositiveIntegerField(default=0)),
+                ('productos', models.PositiveIntegerField(default=0)),
+                ('nuevos', models.PositiveIntegerField(default=0)),
+                ('actualizados', models.PositiveIntegerField(default=0)),
+                ('sin_cambios', models.PositiveIntegerField(default=0)),
+                ('desactivados', models.PositiveIntegerField(default=0)),
+                ('etapas', models.JSONField(blank=True, default=dict)),
+                ('errores', models.JSONField(blank=True, default=list)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sincronización',
+                'verbose_name_plural': 'Sincronizaciones',
+                'ordering': ['-iniciado'],
+                'indexes': [models.Index(fields=['-iniciado'], name='sync_run_iniciado_idx')],
+            },
+        ),
+    ]
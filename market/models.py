@@ -1,13 +1,50 @@
-from django.db import models
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, models, transaction
+from django.db.models import ExpressionWrapper, F, Prefetch, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from account_admin.models import User
+from .search import build_search_document, index_products, unindex_products
+from .catalog_cache import bump_catalog_generation
+
+# Valor de stock_disponible para productos con stock ilimitado
+STOCK_ILIMITADO = 999999
+
+def _productos_de(categorias):
+    return list(Product.objects.filter(categoria__in=categorias).values_list('pk', flat=True))
+
+
+class CategoryQuerySet(models.QuerySet):
+    def delete(self):
+        # Los productos se borran en cascada: también hay que sacarlos del índice FTS5
+        productos = _productos_de(self)
+        resultado = super().delete()
+        unindex_products(productos)
+        bump_catalog_generation()
+        return resultado
+
 
 # Create your models here.
 class Category(models.Model):
     nombre = models.CharField(max_length=110, unique=True)
     descripcion = models.TextField(blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    objects = CategoryQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_catalog_generation()
+
+    def delete(self, *args, **kwargs):
+        productos = _productos_de([self.pk])
+        result = super().delete(*args, **kwargs)
+        unindex_products(productos)
+        bump_catalog_generation()
+        return result
 
     def __str__(self):
         return self.nombre
@@ -16,6 +53,58 @@ class Category(models.Model):
         verbose_name = "Category"  
         verbose_name_plural = "Categories"  
 
+class ProductQuerySet(models.QuerySet):
+    # Columnas que expone ProductSerializer. Se usan con only() para no traer
+    # columnas internas y para resolver la categoría en el mismo JOIN.
+    # `actualizado` va aunque no se serialice: al guardar una instancia con
+    # columnas diferidas Django solo escribe las cargadas, y sin ella el
+    # auto_now no se guardaría (ProductViewSet edita productos de este queryset).
+    CATALOG_FIELDS = (
+        'id', 'nombre', 'descripcion', 'slug', 'precio', 'precio_proveedor', 'precio_manual',
+        'en_oferta', 'precio_oferta_proveedor', 'precio_oferta', 'stock', 'stock_proveedor', 'stock_vendido',
+        'stock_ilimitado', 'imagen', 'imagenes', 'external_id', 'external_url', 'last_sync',
+        'actualizado', 'desactivado', 'stock_disponible', 'disponible', 'precio_final',
+        'categoria__id', 'categoria__nombre',
+    )
+
+    @classmethod
+    def catalog_fields(cls, prefix=''):
+        """Columnas del catálogo para un producto alcanzado por una relación (ej. 'producto__')"""
+        return [f'{prefix}{field}' for field in cls.CATALOG_FIELDS]
+
+    def for_catalog(self):
+        """Queryset del catálogo: categoría precargada y proyección de columnas"""
+        return self.select_related('categoria').only(*self.catalog_fields())
+
+    # update() queda sin efectos secundarios: lo usan escrituras que el
+    # catálogo no muestra (last_sync de la sincronización) y que no deben
+    # vaciar su cache ni mover Last-Modified.
+    def update_catalog(self, **kwargs):
+        """
+        UPDATE de columnas que muestra el catálogo (precios, visibilidad,
+        datos del proveedor): marca `actualizado` e invalida el cache de
+        respuestas del catálogo.
+        """
+        kwargs.setdefault('actualizado', timezone.now())
+        filas = self.update(**kwargs)
+        if filas:
+            bump_catalog_generation()
+        return filas
+
+    def bulk_create(self, objs, *args, **kwargs):
+        creados = super().bulk_create(objs, *args, **kwargs)
+        bump_catalog_generation()
+        return creados
+
+    def delete(self):
+        # Las filas de FTS5 no se borran solas (Product.delete lo hace por instancia)
+        pks = list(self.values_list('pk', flat=True))
+        resultado = super().delete()
+        unindex_products(pks)
+        bump_catalog_generation()
+        return resultado
+
+
 class Product(models.Model):
     # Información básica
     nombre = models.CharField(max_length=250)
@@ -30,6 +119,7 @@ class Product(models.Model):
     # Ofertas
     en_oferta = models.BooleanField(default=False)
     precio_oferta_proveedor = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    precio_oferta = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Con el markup de la regla (market/pricing.py)
     
     # Stock (sistema dual)
     stock = models.PositiveIntegerField(default=0)  # Deprecated - usar stock_proveedor
@@ -46,35 +136,80 @@ class Product(models.Model):
     external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     external_url = models.URLField(max_length=500, null=True, blank=True)
     last_sync = models.DateTimeField(null=True, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)  # también lo marca ProductQuerySet.update_catalog
+    sync_hash = models.CharField(max_length=64, blank=True, default='', editable=False)  # Huella del JSON del proveedor
     
     # Control
     desactivado = models.BooleanField(default=False)
 
-    @property
-    def stock_disponible(self):
-        """Stock disponible para vender (stock_proveedor - stock_vendido)"""
-        if self.stock_ilimitado:
-            return 999999
-        return max(0, self.stock_proveedor - self.stock_vendido)
-    
-    @property
-    def disponible(self):
-        """Producto disponible si tiene stock y no está desactivado"""
-        return self.stock_disponible > 0 and not self.desactivado
-    
+    # Texto normalizado para búsqueda (ver market/search.py)
+    search_document = models.TextField(blank=True, default='', editable=False)
+
+
+    # Columnas derivadas: las calcula y mantiene la base (columnas generadas
+    # STORED), así que se pueden filtrar, ordenar e indexar en SQL y nunca
+    # quedan desfasadas, ni con escrituras masivas (update, bulk_update) ni
+    # con el UPDATE condicional del checkout.
+    stock_disponible = models.GeneratedField(  # stock_proveedor - stock_vendido (nunca negativo)
+        expression=models.Case(
+            models.When(stock_ilimitado=True, then=Value(STOCK_ILIMITADO)),
+            models.When(stock_proveedor__gt=F('stock_vendido'), then=F('stock_proveedor') - F('stock_vendido')),
+            default=Value(0),
+        ),
+        output_field=models.PositiveIntegerField(),
+        db_persist=True,
+    )
+    disponible = models.GeneratedField(  # Tiene stock y no está desactivado
+        expression=models.Case(
+            models.When(
+                Q(desactivado=False) & (Q(stock_ilimitado=True) | Q(stock_proveedor__gt=F('stock_vendido'))),
+                then=Value(True),
+            ),
+            default=Value(False),
+        ),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+    precio_final = models.GeneratedField(  # Precio que ve el cliente (considera ofertas)
+        expression=models.Case(
+            models.When(en_oferta=True, precio_oferta__gt=0, then=F('precio_oferta')),
+            default=F('precio'),
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
+    DERIVED_FIELDS = ('stock_disponible', 'disponible', 'precio_final')
+
+    objects = ProductQuerySet.as_manager()
+
     @property
     def imagen_principal(self):
         """Retorna la primera imagen del array de imágenes"""
         if self.imagenes and len(self.imagenes) > 0:
             return self.imagenes[0]
         return None
-    
-    @property
-    def precio_final(self):
-        """Precio que ve el cliente (considera ofertas)"""
-        if self.en_oferta and self.precio_oferta_proveedor:
-            return self.precio_oferta_proveedor * 2  # Markup del 100%
-        return self.precio
+
+    def descartar_derivados(self):
+        """
+        Olvida los valores derivados en memoria: el próximo acceso los relee
+        de la base. Django no los refresca tras un UPDATE.
+        """
+        for campo in self.DERIVED_FIELDS:
+            self.__dict__.pop(campo, None)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._guardar_base_oferta()
+        return instancia
+
+    def _guardar_base_oferta(self):
+        # Costo de oferta y categoría con los que se calculó el precio_oferta
+        # guardado (None si no se cargaron: se recalcula al guardar)
+        if {'categoria_id', 'precio_oferta_proveedor'} <= self.__dict__.keys():
+            self._base_oferta = (self.categoria_id, self.precio_oferta_proveedor)
+        else:
+            self._base_oferta = None
 
     def save(self, *args, **kwargs):
         # Auto-generar slug si no existe
@@ -87,7 +222,38 @@ class Product(models.Model):
                 slug = f"{base_slug}-{counter}"
                 counter += 1
             self.slug = slug
+
+        # Mantener el documento de búsqueda al día con nombre/descripción
+        self.search_document = build_search_document(self.nombre, self.descripcion)
+        # El precio de oferta sale de la regla de precios de la categoría (lookup
+        # en memoria), solo si cambió su costo o la categoría: así no se pisa
+        # el markup explícito que aplicó repreciar()
+        if getattr(self, '_base_oferta', None) != (self.categoria_id, self.precio_oferta_proveedor):
+            from .pricing import tabla_de_precios
+            self.precio_oferta = tabla_de_precios().precio_oferta(self.categoria_id, self.precio_oferta_proveedor)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if {'nombre', 'descripcion'} & set(update_fields):
+                update_fields = {*update_fields, 'search_document'}
+            if {'precio_oferta_proveedor', 'categoria'} & set(update_fields):
+                update_fields = {*update_fields, 'precio_oferta'}
+            kwargs['update_fields'] = update_fields
+
+        nuevo = self._state.adding
         super().save(*args, **kwargs)
+        self._guardar_base_oferta()
+        if not nuevo:
+            # En un INSERT los derivados vuelven con RETURNING; en un UPDATE no
+            self.descartar_derivados()
+        index_products([self])
+        bump_catalog_generation()
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        unindex_products([pk])
+        bump_catalog_generation()
+        return result
 
     def __str__(self):
         return self.nombre
@@ -98,6 +264,13 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=['external_id']),
             models.Index(fields=['slug']),
+            # Claves compuestas de la paginación keyset del catálogo
+            models.Index(fields=['precio', 'id'], name='product_precio_id_idx'),
+            models.Index(fields=['nombre', 'id'], name='product_nombre_id_idx'),
+            models.Index(fields=['precio_final', 'id'], name='product_precio_final_id_idx'),
+            # Filtros del catálogo (?disponible=true, ?en_oferta=true) ordenados por precio final
+            models.Index(fields=['disponible', 'precio_final', 'id'], name='product_disp_precio_idx'),
+            models.Index(fields=['en_oferta', 'precio_final', 'id'], name='product_oferta_precio_idx'),
         ]  
 
 class Order(models.Model):
@@ -257,26 +430,73 @@ class Shipment(models.Model):
         verbose_name = "Shipment"  
         verbose_name_plural = "Shipments"
     
+class CartQuerySet(models.QuerySet):
+    @staticmethod
+    def resumen_aggregates(prefix='items__'):
+        """Agregados del resumen (total y cantidad) sobre los items alcanzados por `prefix`"""
+        subtotal = ExpressionWrapper(
+            F(f'{prefix}cantidad') * F(f'{prefix}producto__precio'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+        return {
+            'resumen_total': Coalesce(Sum(subtotal), Value(Decimal('0')), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            'resumen_cantidad': Coalesce(Sum(f'{prefix}cantidad'), Value(0)),
+        }
+
+    def con_resumen(self):
+        """Anota resumen_total y resumen_cantidad calculados en la base"""
+        return self.annotate(**self.resumen_aggregates())
+
+    def con_items(self):
+        """Precarga los items con su producto y categoría (lo que usa CartSerializer)"""
+        return self.prefetch_related(
+            Prefetch('items', CartItem.objects.select_related('producto__categoria').order_by('id'))
+        )
+
+    def para_usuario(self, usuario):
+        """Carrito del usuario (lo crea si no existe) con resumen e items precargados"""
+        queryset = self.con_resumen().con_items()
+        try:
+            return queryset.get(usuario=usuario)
+        except self.model.DoesNotExist:
+            self.get_or_create(usuario=usuario)
+            return queryset.get(usuario=usuario)
+
+
 class Cart(models.Model):
     """Modelo para representar el carrito de compras de un usuario"""
     usuario = models.OneToOneField(User, on_delete=models.CASCADE)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     def __str__(self):
         return f"Carrito de {self.usuario.username}"
     
+    def resumen(self):
+        """
+        Total y cantidad del carrito. Usa las anotaciones de
+        Cart.objects.con_resumen() si están; si no, un único aggregate.
+        """
+        if hasattr(self, 'resumen_total'):
+            return {'total': self.resumen_total, 'cantidad_items': self.resumen_cantidad}
+        valores = self.items.aggregate(**CartQuerySet.resumen_aggregates(prefix=''))
+        return {'total': valores['resumen_total'], 'cantidad_items': valores['resumen_cantidad']}
+
     def total(self):
         """Calcula el total del carrito"""
-        return sum(item.subtotal() for item in self.items.all())
+        return self.resumen()['total']
     
     def cantidad_items(self):
         """Obtiene la cantidad total de items en el carrito"""
-        return sum(item.cantidad for item in self.items.all())
+        return self.resumen()['cantidad_items']
     
     def limpiar(self):
         """Elimina todos los items del carrito"""
         self.items.all().delete()
+        if hasattr(self, 'resumen_total'):
+            self.resumen_total, self.resumen_cantidad = Decimal('0'), 0
     
     class Meta:
         verbose_name = "Carrito"
@@ -414,3 +634,224 @@ class UsoCodigoDescuento(models.Model):
         verbose_name = "Uso de Código"
         verbose_name_plural = "Usos de Códigos"
         ordering = ['-fecha_uso']
+
+
+class SchedulerLease(models.Model):
+    """
+    Lease en base de datos para elegir un único líder entre los procesos que
+    corren el scheduler: solo quien tiene el lease vigente ejecuta los jobs.
+    """
+    nombre = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=255)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.nombre} -> {self.owner} (vence {self.expires_at})"
+
+    @classmethod
+    def acquire(cls, nombre, owner, ttl):
+        """
+        Toma o renueva el lease `nombre` por `ttl` segundos. Devuelve True si
+        `owner` queda como titular. El UPDATE condicional es atómico, así que
+        dos procesos no pueden quedarse con un lease vencido a la vez.
+        """
+        ahora = timezone.now()
+        vence = ahora + timedelta(seconds=ttl)
+        tomado = cls.objects.filter(nombre=nombre).filter(
+            Q(owner=owner) | Q(expires_at__lt=ahora)
+        ).update(owner=owner, expires_at=vence)
+        if tomado:
+            return True
+        try:
+            with transaction.atomic():
+                cls.objects.create(nombre=nombre, owner=owner, expires_at=vence)
+            return True
+        except IntegrityError:
+            return False
+
+    @classmethod
+    def release(cls, nombre, owner):
+        """Libera el lease si `owner` es el titular (permite un failover inmediato)"""
+        cls.objects.filter(nombre=nombre, owner=owner).delete()
+
+    class Meta:
+        verbose_name = "Lease del Scheduler"
+        verbose_name_plural = "Leases del Scheduler"
+
+
+class PricingRule(models.Model):
+    """
+    Regla de precios: markup sobre el precio del proveedor, redondeo y markup
+    de ofertas. La regla sin categoría es la global; la de una categoría la
+    reemplaza para sus productos. market/pricing.py las compila en una tabla
+    en memoria y las aplica en lote (sincronización y repricing).
+    """
+    categoria = models.OneToOneField(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name='regla_precio',
+        help_text="Vacío = regla global"
+    )
+    markup = models.DecimalField(max_digits=6, decimal_places=3, default=Decimal('2'), help_text="Multiplicador (2 = 100% de margen)")
+    markup_oferta = models.DecimalField(max_digits=6, decimal_places=3, null=True, blank=True, help_text="Multiplicador para ofertas (vacío = el mismo markup)")
+    redondeo = models.DecimalField(max_digits=8, decimal_places=2, default=Decimal('0.01'), help_text="Múltiplo al que se redondea (0.01, 1, 10, 100...)")
+    redondeo_hacia_arriba = models.BooleanField(default=False, help_text="Redondear siempre hacia arriba en vez de al más cercano")
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        if self.markup is not None and self.markup <= 0:
+            raise ValidationError({'markup': 'El markup debe ser mayor a cero'})
+        if self.markup_oferta is not None and self.markup_oferta <= 0:
+            raise ValidationError({'markup_oferta': 'El markup de oferta debe ser mayor a cero'})
+        if self.redondeo is not None and self.redondeo <= 0:
+            raise ValidationError({'redondeo': 'El redondeo debe ser mayor a cero'})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .pricing import reglas_modificadas
+        reglas_modificadas(self.categoria_id)
+
+    def delete(self, *args, **kwargs):
+        categoria_id = self.categoria_id
+        result = super().delete(*args, **kwargs)
+        from .pricing import reglas_modificadas
+        reglas_modificadas(categoria_id)
+        return result
+
+    def __str__(self):
+        alcance = self.categoria.nombre if self.categoria_id else 'Global'
+        return f"{alcance}: x{self.markup}"
+
+    class Meta:
+        verbose_name = "Regla de Precio"
+        verbose_name_plural = "Reglas de Precios"
+        constraints = [
+            # Una sola regla global: las reglas sin categoría cuentan como la
+            # categoría 0. Índice funcional en vez de constraint parcial
+            # (MySQL no tiene índices con condición)
+            models.UniqueConstraint(
+                Coalesce('categoria', Value(0)), name='pricing_rule_una_por_categoria',
+                violation_error_message='Ya existe una regla de precios global.',
+            ),
+        ]
+
+
+class TelegramOutbox(models.Model):
+    """
+    Cola (outbox) de mensajes de Telegram. Se escribe en la misma transacción
+    que el cambio que notifica y la vacía un único worker (market/telegram.py),
+    así que un reinicio no pierde mensajes.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+    pedido = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='notificaciones')
+    texto = models.TextField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True, default='')
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Telegram #{self.pk} ({self.estado})"
+
+    class Meta:
+        verbose_name = "Notificación de Telegram"
+        verbose_name_plural = "Notificaciones de Telegram"
+        indexes = [
+            # Lo que busca el worker: pendientes vencidos en orden de llegada
+            models.Index(fields=['estado', 'proximo_intento', 'id'], name='telegram_outbox_cola_idx'),
+        ]
+
+
+
+class MercadoPagoEvent(models.Model):
+    """
+    Notificación de pago de Mercado Pago pendiente de procesar. El webhook
+    solo registra (o reactiva) la fila y responde; el worker del scheduler
+    consulta el pago y aplica la transición (market/mp_events.py).
+
+    Hay una fila por pago: las notificaciones repetidas se coalescen
+    incrementando `notificaciones`, que el worker usa para detectar si llegó
+    otra mientras procesaba.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('procesado', 'Procesado'),
+        ('fallido', 'Fallido'),
+    ]
+    payment_id = models.CharField(max_length=64, unique=True)
+    topic = models.CharField(max_length=50, default='payment')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    notificaciones = models.PositiveIntegerField(default=1)
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True, default='')
+    # Último estado informado por MP y aplicado al pedido
+    estado_pago = models.CharField(max_length=30, blank=True, default='')
+    pedido = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='eventos_mp')
+    recibido = models.DateTimeField(auto_now_add=True)
+    ultima_notificacion = models.DateTimeField(default=timezone.now)
+    procesado_en = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"MP pago {self.payment_id} ({self.estado})"
+
+    class Meta:
+        verbose_name = "Evento de Mercado Pago"
+        verbose_name_plural = "Eventos de Mercado Pago"
+        indexes = [
+            # Lo que busca el worker: pendientes (o reclamos vencidos) en orden de llegada
+            models.Index(fields=['estado', 'proximo_intento', 'id'], name='mp_event_cola_idx'),
+        ]
+
+
+class SyncRun(models.Model):
+    """
+    Historial de sincronizaciones con el proveedor (market/scraper.py): totales
+    y, por etapa (sesion, fetch, parse, diff, persist, deactivate), segundos
+    acumulados y cantidad procesada. Sirve para seguir la tendencia de
+    duración y ver qué etapa se volvió lenta.
+    """
+    ESTADOS = [
+        ('en_curso', 'En curso'),
+        ('ok', 'Completada'),
+        ('error', 'Con error'),
+    ]
+    ORIGENES = [
+        ('scheduler', 'Scheduler'),
+        ('manual', 'Manual'),
+    ]
+    ETAPAS = ['sesion', 'fetch', 'parse', 'diff', 'persist', 'deactivate']
+
+    iniciado = models.DateTimeField(default=timezone.now)
+    finalizado = models.DateTimeField(null=True, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='en_curso')
+    origen = models.CharField(max_length=20, choices=ORIGENES, default='scheduler')
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    duracion_segundos = models.FloatField(null=True, blank=True)
+    paginas = models.PositiveIntegerField(default=0)
+    productos = models.PositiveIntegerField(default=0)  # recibidos del proveedor
+    nuevos = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    sin_cambios = models.PositiveIntegerField(default=0)
+    desactivados = models.PositiveIntegerField(default=0)
+    etapas = models.JSONField(default=dict, blank=True)  # {etapa: {'segundos': float, 'cantidad': int}}
+    errores = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"Sync #{self.pk} {self.iniciado:%Y-%m-%d %H:%M} ({self.estado})"
+
+    def segundos_etapa(self, etapa):
+        return (self.etapas.get(etapa) or {}).get('segundos', 0)
+
+    class Meta:
+        verbose_name = "Sincronización"
+        verbose_name_plural = "Sincronizaciones"
+        ordering = ['-iniciado']
+        indexes = [
+            models.Index(fields=['-iniciado'], name='sync_run_iniciado_idx'),
+        ]
@@ -0,0 +1,195 @@
+"""
+Procesamiento asíncrono de las notificaciones de pago de Mercado Pago
+
+El webhook no llama a la API de MP: `registrar_notificacion` guarda (o
+reactiva) una fila de MercadoPagoEvent por pago y responde enseguida. Un
+único worker (el job del scheduler, ver Velorum/scheduler.py) la procesa
+con `process_mp_events`:
+
+- Coalescing: N notificaciones del mismo pago son una sola fila y, por lo
+  tanto, una sola consulta a MP con el estado más reciente.
+- Si llega otra notificación mientras se procesa, el evento vuelve a quedar
+  pendiente (se compara el contador `notificaciones`).
+- La transición del pedido y el pago se aplica en una transacción con el
+  pedido bloqueado y solo si el estado cambió: repetir un evento no vuelve a
+  tocar el pedido ni a encolar la notificación de Telegram (que va al outbox
+  en la misma transacción).
+- Errores de red o de la API se reintentan con backoff exponencial.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from .mercadopago_service import process_payment_notification
+from .models import MercadoPagoEvent, Order, Pay
+from .telegram import send_order_paid_notification
+
+logger = logging.getLogger(__name__)
+
+
+class EventoInvalido(Exception):
+    """El pago no se puede aplicar y reintentar no lo va a arreglar"""
+
+
+def estado_pago(status):
+    """Estado de Pay para un `status` de pago de MP"""
+    if status == 'approved':
+        return 'completado'
+    if status == 'pending':
+        return 'pendiente'
+    if status in ('rejected', 'cancelled'):
+        return 'fallido'
+    return 'en_revision'
+
+
+def registrar_notificacion(payment_id, topic='payment'):
+    """
+    Registra una notificación del webhook. Si el pago ya tiene evento lo
+    reactiva (coalescing) en lugar de crear otro; sin llamadas externas.
+    """
+    payment_id = str(payment_id)
+    ahora = timezone.now()
+    reactivar = dict(
+        notificaciones=F('notificaciones') + 1,
+        ultima_notificacion=ahora,
+        # Si el worker lo está procesando, él mismo lo deja pendiente al terminar
+        # (ve que cambió `notificaciones`); proximo_intento es su plazo de
+        # reclamo y adelantarlo dejaría que otro proceso lo tome en paralelo
+        proximo_intento=Case(When(estado='procesando', then=F('proximo_intento')), default=Value(ahora)),
+        estado=Case(When(estado='procesando', then=Value('procesando')), default=Value('pendiente')),
+        intentos=Case(When(estado='fallido', then=Value(0)), default=F('intentos'), output_field=PositiveIntegerField()),
+    )
+    if MercadoPagoEvent.objects.filter(payment_id=payment_id).update(**reactivar):
+        return False
+    try:
+        with transaction.atomic():
+            MercadoPagoEvent.objects.create(payment_id=payment_id, topic=topic, ultima_notificacion=ahora)
+        return True
+    except IntegrityError:
+        # Otra notificación del mismo pago lo creó en paralelo
+        MercadoPagoEvent.objects.filter(payment_id=payment_id).update(**reactivar)
+        return False
+
+
+def aplicar_pago(payment_info):
+    """
+    Aplica el estado de un pago de MP al pedido y a su Pay.
+
+    Returns:
+        tuple: (pedido, cambió). No escribe nada si el Pay ya tenía ese estado.
+    """
+    order_id = payment_info.get('order_id')
+    if not order_id:
+        raise EventoInvalido('El pago no tiene external_reference')
+    nuevo_estado = estado_pago(payment_info['status'])
+    metadata = {
+        'payment_method_id': payment_info['payment_method_id'],
+        'status_detail': payment_info['status_detail'],
+        'mp_payment_id': payment_info['payment_id'],
+    }
+
+    with transaction.atomic():
+        try:
+            order = Order.objects.select_for_update().get(pk=order_id)
+        except (Order.DoesNotExist, ValueError):
+            raise EventoInvalido(f'Orden {order_id} no encontrada')
+        external_id = str(payment_info['payment_id'])
+        pay = Pay.objects.filter(pedido=order, external_id=external_id).first()
+        anterior = pay.estado if pay else None
+        if anterior == nuevo_estado:
+            return order, False
+
+        if pay is None:
+            pay = Pay(pedido=order, external_id=external_id, metodo='tarjeta', metadata={})
+        pay.estado = nuevo_estado
+        pay.monto_pagado = payment_info['transaction_amount']
+        pay.metadata.update(metadata)
+        pay.save()
+
+        if nuevo_estado == 'completado' and order.estado in ('pendiente', 'en_revision'):
+            order.estado = 'pagado'
+            order.save(update_fields=['estado'])
+        if nuevo_estado == 'completado':
+            send_order_paid_notification(order)
+    logger.info(
+        "mp.payment.transicion order_id=%s payment_id=%s anterior=%s nuevo=%s",
+        order.pk, external_id, anterior, nuevo_estado,
+    )
+    return order, True
+
+
+def _backoff(intentos):
+    base = settings.MERCADOPAGO_EVENTS_BACKOFF_SECONDS
+    return timedelta(seconds=min(base * (2 ** max(intentos - 1, 0)), 3600))
+
+
+def procesar_evento(evento):
+    """
+    Procesa un evento ya reclamado. Devuelve 'procesado', 'sin_cambios',
+    'reintento' o 'fallido'.
+    """
+    recibidas = evento.notificaciones
+    try:
+        payment_info = process_payment_notification(evento.payment_id)
+        pedido, cambio = aplicar_pago(payment_info)
+    except EventoInvalido as e:
+        logger.warning("mp.event.invalido payment_id=%s error=%s", evento.payment_id, e)
+        MercadoPagoEvent.objects.filter(pk=evento.pk).update(
+            estado='fallido', intentos=F('intentos') + 1, ultimo_error=str(e)[:1000]
+        )
+        return 'fallido'
+    except Exception as e:
+        intentos = evento.intentos + 1
+        fallido = intentos >= settings.MERCADOPAGO_EVENTS_MAX_INTENTOS
+        logger.warning("mp.event.error payment_id=%s intentos=%s error=%s", evento.payment_id, intentos, e)
+        MercadoPagoEvent.objects.filter(pk=evento.pk).update(
+            estado='fallido' if fallido else 'pendiente', intentos=intentos,
+            ultimo_error=str(e)[:1000], proximo_intento=timezone.now() + _backoff(intentos),
+        )
+        return 'fallido' if fallido else 'reintento'
+
+    procesado = dict(
+        estado='procesado', procesado_en=timezone.now(), ultimo_error='',
+        estado_pago=payment_info['status'], pedido=pedido,
+    )
+    if not MercadoPagoEvent.objects.filter(pk=evento.pk, notificaciones=recibidas).update(**procesado):
+        # Llegó otra notificación mientras consultábamos a MP: otra vuelta
+        MercadoPagoEvent.objects.filter(pk=evento.pk).update(
+            estado='pendiente', estado_pago=payment_info['status'], pedido=pedido, proximo_intento=timezone.now()
+        )
+    return 'procesado' if cambio else 'sin_cambios'
+
+
+def process_mp_events(limit=50):
+    """
+    Procesa los eventos pendientes y vencidos (incluye reclamos de un worker
+    que murió a mitad de camino).
+
+    Returns:
+        dict: {'procesados': int, 'sin_cambios': int, 'reintentos': int, 'fallidos': int}
+    """
+    resultado = {'procesados': 0, 'sin_cambios': 0, 'reintentos': 0, 'fallidos': 0}
+    claves = {'procesado': 'procesados', 'sin_cambios': 'sin_cambios', 'reintento': 'reintentos', 'fallido': 'fallidos'}
+    ahora = timezone.now()
+    eventos = list(
+        MercadoPagoEvent.objects.filter(estado__in=['pendiente', 'procesando'], proximo_intento__lte=ahora)
+        .order_by('id')[:limit]
+    )
+    for evento in eventos:
+        # Reclamo atómico: si otro proceso lo tomó (o cambió), se saltea
+        reclamado = MercadoPagoEvent.objects.filter(
+            pk=evento.pk, estado=evento.estado, proximo_intento=evento.proximo_intento
+        ).update(
+            estado='procesando',
+            proximo_intento=timezone.now() + timedelta(seconds=settings.MERCADOPAGO_EVENTS_CLAIM_SECONDS),
+        )
+        if not reclamado:
+            continue
+        evento.refresh_from_db(fields=['notificaciones', 'intentos'])
+        resultado[claves[procesar_evento(evento)]] += 1
+    return resultado
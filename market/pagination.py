@@ -0,0 +1,182 @@
+"""
+Paginación por cursor (keyset) para el catálogo de productos
+"""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ProductKeysetPagination(BasePagination):
+    """
+    Paginación keyset sobre una clave compuesta estable.
+
+    En lugar de OFFSET, cada página filtra por "filas posteriores a la última
+    fila vista" usando la clave de orden completa (por ej. precio, id), por lo
+    que el costo de pedir la página N no crece con N. El cursor es opaco para
+    el cliente (base64 de la clave de la última fila).
+
+    Es opcional: solo se activa cuando llega `cursor` o `page_size` en la
+    query, para no romper a los clientes que esperan la lista completa.
+
+    GET /api/market/model/products/?page_size=24&ordering=precio
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+
+    # Órdenes permitidos -> clave compuesta. Siempre termina en `id` para que
+    # el orden sea total y el cursor no salte ni repita filas con empates.
+    orderings = {
+        'id': ('id',),
+        '-id': ('-id',),
+        'precio': ('precio', 'id'),
+        '-precio': ('-precio', '-id'),
+        'precio_final': ('precio_final', 'id'),
+        '-precio_final': ('-precio_final', '-id'),
+        'nombre': ('nombre', 'id'),
+        '-nombre': ('-nombre', '-id'),
+    }
+    default_ordering = '-id'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_query_param not in request.query_params
+                and self.page_size_query_param not in request.query_params):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering_key = self.get_ordering_key(request)
+        ordering = self.orderings[self.ordering_key]
+
+        queryset = queryset.order_by(*ordering)
+
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            queryset = queryset.filter(self.build_keyset_filter(ordering, cursor))
+
+        # Se pide una fila extra para saber si hay página siguiente sin COUNT(*)
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'PRODUCTS_PAGE_SIZE', 24)
+        maximo = getattr(settings, 'PRODUCTS_MAX_PAGE_SIZE', 100)
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            page_size = default
+        if page_size <= 0:
+            page_size = default
+        return min(page_size, maximo)
+
+    def get_ordering_key(self, request):
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering in self.orderings:
+            return ordering
+        return self.default_ordering
+
+    def build_keyset_filter(self, ordering, values):
+        """
+        Arma el filtro "fila > cursor" para una clave compuesta:
+        (a > va) OR (a = va AND b > vb) OR ...
+        Para campos descendentes la comparación se invierte.
+        """
+        condition = Q()
+        igualdades = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**igualdades, **{f'{name}__{lookup}': value})
+            igualdades[name] = value
+        return condition
+
+    def encode_cursor(self, row):
+        ordering = self.orderings[self.ordering_key]
+        values = [str(self._value(row, field.lstrip('-'))) for field in ordering]
+        payload = json.dumps({'o': self.ordering_key, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = payload['v']
+            ordering_key = payload['o']
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Un cursor solo es válido para el mismo orden con el que se generó
+        ordering = self.orderings.get(self.ordering_key)
+        if ordering_key != self.ordering_key or not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Los valores vienen del cliente: se convierten con el campo del modelo
+        # para que uno adulterado sea un cursor inválido y no un error al filtrar
+        try:
+            return [self._to_python(model, field.lstrip('-'), value) for field, value in zip(ordering, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _to_python(model, name, value):
+        field = model._meta.get_field(name)
+        # Columnas generadas (precio_final): el tipo es el de output_field
+        field = getattr(field, 'output_field', field)
+        value = field.to_python(value)
+        if value is None:
+            raise ValueError(name)
+        # Rango de enteros de la base, largo máximo, etc.
+        field.run_validators(value)
+        return field.get_prep_value(value)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_first_link(self):
+        return remove_query_param(self.base_url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'first': self.get_first_link(),
+            'page_size': self.page_size,
+            'ordering': self.ordering_key,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'page_size': {'type': 'integer'},
+                'ordering': {'type': 'string'},
+                'results': schema,
+            },
+        }
+
+    @staticmethod
+    def _value(row, field):
+        # Soporta instancias de modelo y filas de .values()
+        if isinstance(row, dict):
+            return row[field]
+        return getattr(row, field)
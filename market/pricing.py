@@ -0,0 +1,275 @@
+"""
+Reglas de precios y repricing masivo del catálogo
+
+Las reglas (PricingRule: global y por categoría) se compilan una vez en una
+TablaDePrecios en memoria: calcular un precio es un lookup O(1) por
+categoría, sin consultas. La tabla compilada se comparte por proceso y se
+recompila cuando cambia la versión guardada en el cache compartido (cada
+vez que se guarda o borra una regla, en cualquier worker).
+
+El repricing se hace con un único UPDATE basado en expresiones (`precio =
+ROUND(precio_proveedor * markup)` con un CASE por categoría): no se cargan
+filas en Python ni se pasa por Product.save, así que el costo no depende del
+tamaño del catálogo en round trips.
+
+El modo `dry_run` no escribe nada: calcula con agregados en la base cuántos
+productos cambiarían y cuánto se mueven los precios.
+"""
+
+import threading
+import time
+from decimal import ROUND_CEILING, ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Ceil, Round
+
+from .models import PricingRule, Product
+
+VERSION_KEY = 'pricing:version'
+CENTAVO = Decimal('0.01')
+
+PRECIO_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def normalizar_markup(markup):
+    """Multiplicador como Decimal (ej. 2 = 100% de margen). ValueError si no es > 0"""
+    try:
+        markup = Decimal(str(markup))
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError(f'Markup inválido: {markup!r}')
+    if not markup.is_finite() or markup <= 0:
+        raise ValueError(f'Markup inválido: {markup}')
+    return markup
+
+
+def markup_desde_porcentaje(porcentaje):
+    """100 (%) -> 2.00"""
+    try:
+        return normalizar_markup(1 + Decimal(str(porcentaje)) / 100)
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError(f'Porcentaje de markup inválido: {porcentaje!r}')
+
+
+class Regla:
+    """Regla compilada: calcula precios en Python y arma la expresión SQL equivalente"""
+    __slots__ = ('markup', 'markup_oferta', 'redondeo', 'hacia_arriba')
+
+    def __init__(self, markup, markup_oferta=None, redondeo=CENTAVO, hacia_arriba=False):
+        self.markup = Decimal(markup)
+        self.markup_oferta = Decimal(markup_oferta) if markup_oferta else self.markup
+        self.redondeo = Decimal(redondeo)
+        self.hacia_arriba = hacia_arriba
+
+    @classmethod
+    def desde_modelo(cls, regla):
+        return cls(regla.markup, regla.markup_oferta, regla.redondeo, regla.redondeo_hacia_arriba)
+
+    def _redondear(self, valor):
+        # Mismo algoritmo que expresion(): a 4 decimales en pasos y luego al paso
+        pasos = (valor / self.redondeo).quantize(Decimal('0.0001'), ROUND_HALF_UP)
+        pasos = pasos.quantize(Decimal('1'), ROUND_CEILING if self.hacia_arriba else ROUND_HALF_UP)
+        return (pasos * self.redondeo).quantize(CENTAVO)
+
+    def precio(self, costo):
+        return self._redondear(Decimal(str(costo)) * self.markup)
+
+    def precio_oferta(self, costo):
+        """Precio de oferta; None si el proveedor no informa precio de oferta"""
+        if not costo or Decimal(str(costo)) <= 0:
+            return None
+        return self._redondear(Decimal(str(costo)) * self.markup_oferta)
+
+    def expresion(self, campo, oferta=False):
+        """Expresión SQL del precio calculado desde la columna `campo`"""
+        valor = F(campo) * Value(self.markup_oferta if oferta else self.markup)
+        if self.redondeo == CENTAVO and not self.hacia_arriba:
+            return Round(valor, 2, output_field=PRECIO_FIELD)
+        pasos = Round(valor / Value(self.redondeo), 4)
+        pasos = Ceil(pasos) if self.hacia_arriba else Round(pasos)
+        return Round(pasos * Value(self.redondeo), 2, output_field=PRECIO_FIELD)
+
+
+# Sin reglas cargadas se mantiene el markup histórico del 100%
+REGLA_POR_DEFECTO = Regla(Decimal('2'))
+
+
+class TablaDePrecios:
+    """Reglas compiladas: global + {categoria_id: Regla}"""
+
+    def __init__(self, global_=REGLA_POR_DEFECTO, por_categoria=None):
+        self.global_ = global_
+        self.por_categoria = por_categoria or {}
+
+    @classmethod
+    def compilar(cls):
+        """Lee todas las reglas con una sola consulta"""
+        global_ = REGLA_POR_DEFECTO
+        por_categoria = {}
+        for regla in PricingRule.objects.all():
+            if regla.categoria_id is None:
+                global_ = Regla.desde_modelo(regla)
+            else:
+                por_categoria[regla.categoria_id] = Regla.desde_modelo(regla)
+        return cls(global_, por_categoria)
+
+    def regla(self, categoria_id):
+        return self.por_categoria.get(categoria_id, self.global_)
+
+    def precio(self, categoria_id, costo):
+        return self.regla(categoria_id).precio(costo)
+
+    def precio_oferta(self, categoria_id, costo):
+        return self.regla(categoria_id).precio_oferta(costo)
+
+    def expresion(self, campo, oferta=False):
+        """CASE por categoría con la expresión de cada regla (la global por defecto)"""
+        default = self.global_.expresion(campo, oferta)
+        if not self.por_categoria:
+            return default
+        return Case(
+            *[When(categoria_id=pk, then=regla.expresion(campo, oferta)) for pk, regla in self.por_categoria.items()],
+            default=default,
+            output_field=PRECIO_FIELD,
+        )
+
+
+_lock = threading.Lock()
+_compilada = {'version': None, 'tabla': None}
+
+
+def _version_inicial():
+    # Basada en el reloj (ms), como la generación del catálogo: si el cache
+    # se vacía, la versión nueva no coincide con la de una tabla vieja
+    return int(time.time() * 1000)
+
+
+def pricing_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _version_inicial(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def tabla_de_precios():
+    """
+    Tabla compilada del proceso. Solo consulta la base cuando otra escritura
+    de reglas subió la versión del cache compartido.
+    """
+    version = pricing_version()
+    tabla = _compilada['tabla']
+    if tabla is not None and _compilada['version'] == version:
+        return tabla
+    with _lock:
+        if _compilada['tabla'] is None or _compilada['version'] != version:
+            _compilada['tabla'] = TablaDePrecios.compilar()
+            _compilada['version'] = version
+        return _compilada['tabla']
+
+
+def _invalidar_tabla():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, _version_inicial(), None)
+    _compilada['tabla'] = None
+
+
+def reglas_modificadas(categoria_id=None):
+    """
+    Llamado al guardar o borrar una PricingRule: invalida la tabla en todos
+    los procesos y, al confirmar la transacción, reprecia los productos
+    alcanzados (respetando los precios manuales).
+    """
+    _invalidar_tabla()
+
+    def aplicar():
+        _invalidar_tabla()
+        aplicar_reglas(
+            categorias=[categoria_id] if categoria_id is not None else None,
+            incluir_manuales=False,
+        )
+
+    transaction.on_commit(aplicar)
+
+
+def productos_repreciables(categorias=None, ids=None):
+    """Productos con precio de proveedor, opcionalmente acotados por categoría o ids"""
+    queryset = Product.objects.filter(precio_proveedor__gt=0)
+    if categorias:
+        queryset = queryset.filter(categoria_id__in=categorias)
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset
+
+
+def previsualizar(queryset, nuevo_precio):
+    """Resumen del repricing sin escribir: un único aggregate"""
+    delta = nuevo_precio - F('precio')
+    resumen = queryset.aggregate(
+        productos=Count('id'),
+        cambian=Count('id', filter=~Q(precio=nuevo_precio)),
+        total_actual=Sum('precio'),
+        total_nuevo=Sum(nuevo_precio),
+        delta_min=Min(delta, output_field=PRECIO_FIELD),
+        delta_max=Max(delta, output_field=PRECIO_FIELD),
+    )
+    cero = Decimal('0.00')
+    resumen['total_actual'] = resumen['total_actual'] or cero
+    resumen['total_nuevo'] = resumen['total_nuevo'] or cero
+    resumen['delta_total'] = resumen['total_nuevo'] - resumen['total_actual']
+    return resumen
+
+
+def _repreciar(expresion, categorias, ids, incluir_manuales, dry_run):
+    """
+    `expresion(campo, oferta)` arma el precio SQL desde una columna de costo.
+    Escribe precio y precio_oferta en un UPDATE; con incluir_manuales=False,
+    a los productos con precio manual solo se les recalcula la oferta.
+    """
+    queryset = productos_repreciables(categorias, ids)
+    nuevo_precio = expresion('precio_proveedor', False)
+    nueva_oferta = Case(
+        When(precio_oferta_proveedor__gt=0, then=expresion('precio_oferta_proveedor', True)),
+        default=Value(None),
+        output_field=PRECIO_FIELD,
+    )
+    repreciables = queryset if incluir_manuales else queryset.filter(precio_manual=False)
+
+    if dry_run:
+        return {**previsualizar(repreciables, nuevo_precio), 'dry_run': True}
+
+    with transaction.atomic():
+        actualizados = repreciables.update_catalog(precio=nuevo_precio, precio_oferta=nueva_oferta, precio_manual=False)
+        if not incluir_manuales:
+            queryset.filter(precio_manual=True).update_catalog(precio_oferta=nueva_oferta)
+    return {'actualizados': actualizados, 'dry_run': False}
+
+
+def repreciar(markup, *, categorias=None, ids=None, incluir_manuales=True, dry_run=False):
+    """
+    Aplica un `markup` explícito (multiplicador, también a las ofertas) a los
+    productos alcanzados y los marca como precio automático (precio_manual=False).
+
+    Args:
+        markup: multiplicador sobre precio_proveedor (2 = 100% de margen)
+        categorias: ids de categoría para acotar (opcional)
+        ids: ids de producto para acotar (opcional)
+        incluir_manuales: si False, respeta los precios editados a mano
+        dry_run: no escribe; devuelve el resumen de previsualizar()
+
+    Returns:
+        dict: con 'actualizados' (o el resumen si es dry_run), 'markup' y 'dry_run'
+    """
+    markup = normalizar_markup(markup)
+    regla = Regla(markup)
+    resultado = _repreciar(regla.expresion, categorias, ids, incluir_manuales, dry_run)
+    return {**resultado, 'markup': markup}
+
+
+def aplicar_reglas(*, categorias=None, ids=None, incluir_manuales=True, dry_run=False):
+    """Como repreciar(), pero con el markup y redondeo de la regla de cada categoría"""
+    tabla = tabla_de_precios()
+    return _repreciar(tabla.expresion, categorias, ids, incluir_manuales, dry_run)
@@ -0,0 +1,196 @@
+"""
+Grabación y reproducción de las respuestas del proveedor
+
+Permite correr y medir market/scraper.py sin red:
+
+- `SesionGrabadora` envuelve la sesión real y agrega cada respuesta (URL,
+  parámetros, status y cuerpo tal cual) a un archivo JSON Lines comprimido
+  con gzip. Cada respuesta es un miembro gzip nuevo, así que la grabación es
+  segura entre hilos y queda utilizable aunque la sincronización se corte.
+- `SesionReproductora` sirve esas respuestas por (path, parámetros), siempre
+  las mismas y en cualquier orden. Una página que no está grabada se responde
+  vacía, como hace el proveedor pasado el final de una categoría.
+- `generar_fixture` escribe un archivo sintético con el mismo formato y la
+  cantidad de productos pedida (10k-100k para benchmarks), tomando como
+  plantilla los productos de una grabación real si se la pasa.
+
+build_session() elige el transporte con SCRAPER_TRANSPORT (live, record o
+replay) y el archivo con SCRAPER_FIXTURE. El cuerpo se guarda sin decodificar
+para que el replay también mida el parseo del JSON.
+"""
+
+import copy
+import gzip
+import io
+import json
+import random
+import threading
+from urllib.parse import urlparse
+
+import requests
+from django.utils import timezone
+
+from .scraper import BASE_URL, CATEGORIAS_CONFIG, ENDPOINT_AJAX, PAGE_SIZE_PROVEEDOR
+
+FORMATO = 1
+PAGINA_VACIA = '{"data": []}'
+HOME_SINTETICO = '<html><head><meta name="csrf-token" content="replay-token"></head><body></body></html>'
+
+
+def clave(url, params=None):
+    """Identifica un request por path y parámetros, sin importar el host ni el orden"""
+    return json.dumps([urlparse(url).path or '/', params or {}], sort_keys=True, separators=(',', ':'))
+
+
+def leer_grabacion(archivo):
+    """Registros {'url', 'params', 'status', 'body'} del archivo, sin la cabecera"""
+    with gzip.open(archivo, 'rt', encoding='utf-8') as entrada:
+        for linea in entrada:
+            registro = json.loads(linea)
+            if 'formato' in registro:
+                if registro['formato'] != FORMATO:
+                    raise ValueError(f"Formato de grabación no soportado: {registro['formato']}")
+                continue
+            yield registro
+
+
+def _cabecera(origen, grabado=True):
+    cabecera = {'formato': FORMATO, 'origen': origen}
+    if grabado:
+        cabecera['grabado'] = timezone.now().isoformat(timespec='seconds')
+    return json.dumps(cabecera)
+
+
+class RespuestaGrabada:
+    """Lo que usa el scraper de requests.Response"""
+
+    def __init__(self, url, status_code, text):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} (grabado) para {self.url}', response=self)
+
+
+class SesionGrabadora:
+    def __init__(self, session, archivo):
+        self.session = session
+        self.archivo = archivo
+        self._lock = threading.Lock()
+        with gzip.open(archivo, 'wt', encoding='utf-8') as salida:
+            salida.write(_cabecera('grabacion') + '\n')
+
+    def get(self, url, params=None, **kwargs):
+        response = self.session.get(url, params=params, **kwargs)
+        registro = {'url': url, 'params': params, 'status': response.status_code, 'body': response.text}
+        linea = json.dumps(registro, ensure_ascii=False) + '\n'
+        with self._lock, gzip.open(self.archivo, 'at', encoding='utf-8') as salida:
+            salida.write(linea)
+        return response
+
+    def __getattr__(self, nombre):
+        # mount, get_adapter, close, ... de la sesión real
+        return getattr(self.session, nombre)
+
+
+class SesionReproductora:
+    # Sin red no hay nada que limitar (ver ProviderClient)
+    requests_per_second = 0
+
+    def __init__(self, archivo):
+        self.respuestas = {
+            clave(r['url'], r['params']): (r['status'], r['body']) for r in leer_grabacion(archivo)
+        }
+        self._lock = threading.Lock()
+        self.faltantes = []
+
+    def get(self, url, params=None, **kwargs):
+        respuesta = self.respuestas.get(clave(url, params))
+        if respuesta is None:
+            with self._lock:
+                self.faltantes.append((url, params))
+            if params and 'filter_page' in params:
+                return RespuestaGrabada(url, 200, PAGINA_VACIA)
+            return RespuestaGrabada(url, 404, '')
+        return RespuestaGrabada(url, *respuesta)
+
+    def close(self):
+        pass
+
+
+def plantillas_de(archivo):
+    """Productos de las páginas grabadas, para usarlos de modelo en generar_fixture"""
+    plantillas = []
+    for registro in leer_grabacion(archivo):
+        if registro['params'] and 'filter_page' in registro['params'] and registro['status'] == 200:
+            plantillas.extend(json.loads(registro['body']).get('data', []))
+    return plantillas
+
+
+def producto_sintetico(external_id, rnd, plantilla=None):
+    """Producto del proveedor con id, nombre, link, precio y stock propios"""
+    producto = copy.deepcopy(plantilla) if plantilla else {
+        'p_descripcion': 'Reloj de pulsera con malla de acero',
+        'p_oferta': 0,
+        'stock': [{}],
+        'imagenes': [{'i_link': 'img/reloj.jpg'}, {'i_link': 'img/reloj-2.jpg'}],
+    }
+    precio = rnd.randrange(5000, 250000, 100)
+    producto.update({
+        'idProductos': external_id,
+        'p_nombre': f"{(plantilla or {}).get('p_nombre', 'Reloj')} {external_id}",
+        'p_link': f'producto-{external_id}',
+        'p_precio': precio,
+    })
+    stock = producto.get('stock') or [{}]
+    stock[0] = {**stock[0], 's_cantidad': rnd.randint(0, 20), 's_ilimitado': 0, 's_precio': precio}
+    producto['stock'] = stock
+    if producto.get('p_oferta') == 1:
+        producto['p_precio_oferta'] = precio * 9 // 10
+    return producto
+
+
+def generar_fixture(archivo, productos=10000, base=None, semilla=0, primer_id=10_000_000):
+    """
+    Escribe una grabación sintética: la home con el token CSRF y, por
+    categoría de CATEGORIAS_CONFIG, páginas de PAGE_SIZE_PROVEEDOR productos
+    (repartidos en partes iguales). Con la misma semilla el archivo es el
+    mismo byte a byte: la cabecera no lleva fecha y el gzip va con mtime 0.
+
+    Returns:
+        dict: {categoría: cantidad de productos}
+    """
+    rnd = random.Random(semilla)
+    plantillas = plantillas_de(base) if base else []
+    categorias = list(CATEGORIAS_CONFIG.values())
+    por_categoria = {
+        c['categoria_nombre']: productos // len(categorias) + (1 if i < productos % len(categorias) else 0)
+        for i, c in enumerate(categorias)
+    }
+    external_id = primer_id
+
+    with open(archivo, 'wb') as crudo, \
+            gzip.GzipFile(filename='', mode='wb', fileobj=crudo, mtime=0) as comprimido, \
+            io.TextIOWrapper(comprimido, encoding='utf-8') as salida:
+        salida.write(_cabecera('sintetico', grabado=False) + '\n')
+
+        def escribir(url, params, status, body):
+            salida.write(json.dumps({'url': url, 'params': params, 'status': status, 'body': body}, ensure_ascii=False) + '\n')
+
+        escribir(BASE_URL, None, 200, HOME_SINTETICO)
+        for config in categorias:
+            cantidad = por_categoria[config['categoria_nombre']]
+            for pagina, inicio in enumerate(range(0, cantidad, PAGE_SIZE_PROVEEDOR)):
+                data = []
+                for _ in range(min(PAGE_SIZE_PROVEEDOR, cantidad - inicio)):
+                    plantilla = rnd.choice(plantillas) if plantillas else None
+                    data.append(producto_sintetico(external_id, rnd, plantilla))
+                    external_id += 1
+                params = {'filter_page': pagina, 'filter_order': 0, 'filter_categories[]': config['ids']}
+                escribir(ENDPOINT_AJAX, params, 200, json.dumps({'data': data}, ensure_ascii=False))
+    return por_categoria
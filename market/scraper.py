@@ -2,12 +2,27 @@
 Módulo de scraping para sincronizar productos externos
 """
 
+import hashlib
+import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from urllib.parse import urlparse
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from django.utils.text import slugify
-from market.models import Product, Category
+from market.catalog_cache import bump_catalog_generation
+from market.models import Product, Category, SyncRun
+from market.pricing import tabla_de_precios
+from market.search import build_search_document, index_products
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,6 +41,9 @@ BASE_URL = "https://etomiaccesorios.empretienda.com.ar"
 ENDPOINT_AJAX = f"{BASE_URL}/v4/product/category"
 CDN_BASE = "https://d22fxaf9t8d39k.cloudfront.net"
 
+# El proveedor devuelve páginas de 12 productos; una página más corta es la última
+PAGE_SIZE_PROVEEDOR = 12
+
 # Categorías a sincronizar con sus subcategorías
 CATEGORIAS_CONFIG = {
     'relojes': {
@@ -66,6 +84,166 @@ CATEGORIAS_CONFIG = {
 }
 
 
+class RateLimiter:
+    """
+    Limita la cantidad de requests por segundo hacia cada host.
+    Thread-safe: los hilos reservan su turno bajo lock y esperan fuera de él.
+    """
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Etapas:
+    """
+    Segundos y cantidades acumulados por etapa de una sincronización
+    (ver SyncRun.ETAPAS). Thread-safe: las páginas se descargan en paralelo,
+    así que en 'fetch' y 'parse' los segundos son la suma de todos los hilos
+    y pueden superar la duración total.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = {}
+
+    def sumar(self, etapa, segundos=0.0, cantidad=0):
+        with self._lock:
+            acumulado = self._datos.setdefault(etapa, [0.0, 0])
+            acumulado[0] += segundos
+            acumulado[1] += cantidad
+
+    @contextmanager
+    def medir(self, etapa, cantidad=0):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(etapa, time.perf_counter() - inicio, cantidad)
+
+    def exportar(self):
+        """{etapa: {'segundos': float, 'cantidad': int}} en el orden de SyncRun.ETAPAS"""
+        with self._lock:
+            datos = dict(self._datos)
+        orden = [e for e in SyncRun.ETAPAS if e in datos] + [e for e in datos if e not in SyncRun.ETAPAS]
+        return {e: {'segundos': round(datos[e][0], 4), 'cantidad': datos[e][1]} for e in orden}
+
+
+class ProviderClient:
+    """
+    Cliente HTTP del proveedor compartido por todos los hilos de una sincronización:
+    una sola sesión (pool de conexiones keep-alive), concurrencia acotada,
+    rate limit por host y registro del tiempo de cada página.
+    """
+
+    def __init__(self, session, csrf_token, max_concurrency=None, requests_per_second=None, etapas=None):
+        self.session = session
+        self.etapas = etapas or Etapas()
+        self.csrf_token = csrf_token
+        self.max_concurrency = max_concurrency or getattr(settings, 'SCRAPER_MAX_CONCURRENCY', 4)
+        self.timeout = getattr(settings, 'SCRAPER_TIMEOUT', 15)
+        if requests_per_second is None:
+            # La sesión de replay (market/provider_replay.py) declara 0: no hay red que cuidar
+            requests_per_second = getattr(session, 'requests_per_second', None)
+        if requests_per_second is None:
+            requests_per_second = getattr(settings, 'SCRAPER_REQUESTS_PER_SECOND', 5)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self.page_timings = []
+        self.ajax_headers = {
+            **BROWSER_HEADERS,
+            'X-CSRF-TOKEN': csrf_token,
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+
+    def fetch_page(self, category_ids, category_name, page):
+        """
+        Trae una página de una categoría.
+
+        Returns:
+            list | None: productos de la página, o None si la página falló
+        """
+        params = {
+            'filter_page': page,
+            'filter_order': 0,
+            'filter_categories[]': category_ids
+        }
+        timing = {'categoria': category_name, 'pagina': page, 'productos': 0, 'status': None}
+        inicio = time.perf_counter()
+        productos_pagina = None
+        try:
+            with self._semaphore:
+                self.rate_limiter.wait(ENDPOINT_AJAX)
+                with self.etapas.medir('fetch', cantidad=1):
+                    response = self.session.get(
+                        ENDPOINT_AJAX,
+                        params=params,
+                        headers=self.ajax_headers,
+                        timeout=self.timeout
+                    )
+            timing['status'] = response.status_code
+            if response.status_code != 200:
+                logger.error(f"Error {response.status_code} en página {page} de {category_name}")
+            else:
+                # Decodificar el JSON es parte de 'parse'; la cantidad la suma la normalización
+                with self.etapas.medir('parse'):
+                    productos_pagina = response.json().get('data', [])
+                timing['productos'] = len(productos_pagina)
+        except Exception as e:
+            logger.error(f"Error scrapeando página {page} de {category_name}: {str(e)}")
+            timing['error'] = str(e)
+        timing['segundos'] = round(time.perf_counter() - inicio, 4)
+        self.page_timings.append(timing)
+        return productos_pagina
+
+
+def build_session():
+    """
+    Sesión de requests con pool de conexiones y reintentos con backoff
+    exponencial para errores transitorios (429/5xx), respetando Retry-After.
+
+    Con SCRAPER_TRANSPORT='record' la sesión graba las respuestas en
+    SCRAPER_FIXTURE; con 'replay' las sirve desde ese archivo sin tocar la red.
+    """
+    transporte = getattr(settings, 'SCRAPER_TRANSPORT', 'live')
+    if transporte not in ('live', 'record', 'replay'):
+        raise ValueError(f"SCRAPER_TRANSPORT inválido: {transporte}")
+    if transporte == 'replay':
+        from market.provider_replay import SesionReproductora
+        return SesionReproductora(settings.SCRAPER_FIXTURE)
+
+    max_concurrency = getattr(settings, 'SCRAPER_MAX_CONCURRENCY', 4)
+    retry = Retry(
+        total=getattr(settings, 'SCRAPER_MAX_RETRIES', 3),
+        backoff_factor=getattr(settings, 'SCRAPER_BACKOFF_FACTOR', 0.5),
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if transporte == 'record':
+        from market.provider_replay import SesionGrabadora
+        return SesionGrabadora(session, settings.SCRAPER_FIXTURE)
+    return session
+
+
 def get_session_and_csrf():
     """
     Crea una sesión con cookies y extrae el token CSRF
@@ -74,8 +252,8 @@ def get_session_and_csrf():
         tuple: (session, csrf_token)
     """
     try:
-        session = requests.Session()
-        response = session.get(BASE_URL, headers=BROWSER_HEADERS, timeout=15)
+        session = build_session()
+        response = session.get(BASE_URL, headers=BROWSER_HEADERS, timeout=getattr(settings, 'SCRAPER_TIMEOUT', 15))
         response.raise_for_status()
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -95,167 +273,384 @@ def get_session_and_csrf():
         return None, None
 
 
-def scrape_category(session, csrf_token, category_ids, category_name):
+def iter_category_pages(client, category_ids, category_name):
+    """
+    Páginas de una categoría (listas de productos JSON), en orden y a medida
+    que llegan.
+
+    Como no se conoce la cantidad de páginas de antemano, se piden ventanas
+    de páginas consecutivas en paralelo (tantas como la concurrencia permitida)
+    y se corta en la primera página vacía, incompleta o con error. En memoria
+    hay como mucho una ventana de páginas.
+    """
+    page = 0
+    window = client.max_concurrency
+
+    with ThreadPoolExecutor(max_workers=window, thread_name_prefix='scraper-page') as executor:
+        while True:
+            paginas = list(range(page, page + window))
+            resultados = executor.map(
+                lambda p: client.fetch_page(category_ids, category_name, p), paginas
+            )
+
+            terminado = False
+            for numero, productos_pagina in zip(paginas, resultados):
+                if terminado:
+                    continue
+                if not productos_pagina:
+                    terminado = True
+                    continue
+                logger.info(f"Categoría {category_name} - Página {numero}: {len(productos_pagina)} productos")
+                yield productos_pagina
+                # Si trajo menos de 12, no hay más páginas
+                if len(productos_pagina) < PAGE_SIZE_PROVEEDOR:
+                    terminado = True
+
+            if terminado:
+                break
+            page += window
+
+
+def scrape_category(session, csrf_token, category_ids, category_name, client=None):
     """
-    Scrapea todos los productos de una categoría usando paginación
+    Scrapea todos los productos de una categoría usando paginación.
+
+    La sincronización usa stream_category, que no junta la categoría entera;
+    esta versión queda para grabar al proveedor y para inspeccionar el JSON.
     
     Args:
         session: Sesión de requests con cookies
         csrf_token: Token CSRF para las peticiones AJAX
         category_ids: Lista de IDs de categoría
         category_name: Nombre de la categoría
+        client: ProviderClient compartido (opcional, se crea uno si falta)
     
     Returns:
         list: Lista de productos (JSON)
     """
+    client = client or ProviderClient(session, csrf_token)
     productos = []
-    page = 0
-    
-    ajax_headers = {
-        **BROWSER_HEADERS,
-        'X-CSRF-TOKEN': csrf_token,
-        'X-Requested-With': 'XMLHttpRequest'
-    }
-    
-    while True:
-        try:
-            params = {
-                'filter_page': page,
-                'filter_order': 0,
-                'filter_categories[]': category_ids
-            }
-            
-            response = session.get(
-                ENDPOINT_AJAX,
-                params=params,
-                headers=ajax_headers,
-                timeout=15
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Error {response.status_code} en página {page} de {category_name}")
-                break
-            
-            data = response.json()
-            productos_pagina = data.get('data', [])
-            
-            if not productos_pagina:
-                logger.info(f"Categoría {category_name}: {len(productos)} productos totales")
-                break
-            
-            productos.extend(productos_pagina)
-            logger.info(f"Categoría {category_name} - Página {page}: {len(productos_pagina)} productos")
-            
-            # Si trajo menos de 12, no hay más páginas
-            if len(productos_pagina) < 12:
-                break
-            
-            page += 1
-            
-        except Exception as e:
-            logger.error(f"Error scrapeando página {page} de {category_name}: {str(e)}")
-            break
-    
+    for productos_pagina in iter_category_pages(client, category_ids, category_name):
+        productos.extend(productos_pagina)
+
+    logger.info(f"Categoría {category_name}: {len(productos)} productos totales")
     return productos
 
 
-def process_product_data(producto_json, categoria, subcategorias_map=None):
+def stream_category(client, cat_config, categoria, errores):
     """
-    Procesa el JSON de un producto y lo crea/actualiza en la BD
+    Productos de una categoría como ProductoProveedor, página por página: el
+    JSON de cada página se descarta apenas se convierte. Los productos que no
+    se pueden leer se registran en `errores` y se saltean.
+    """
+    for productos_pagina in iter_category_pages(client, cat_config['ids'], cat_config['categoria_nombre']):
+        registros = []
+        with client.etapas.medir('parse', cantidad=len(productos_pagina)):
+            for producto_json in productos_pagina:
+                try:
+                    registros.append(ProductoProveedor(producto_json, categoria))
+                except Exception as e:
+                    logger.error(f"Error procesando producto {producto_json.get('p_nombre', 'unknown')}: {str(e)}")
+                    errores.append(f"Error procesando producto en {categoria.nombre}")
+        yield from registros
+
+
+# Campos que la sincronización escribe en productos existentes
+SYNC_FIELDS = [
+    'nombre', 'descripcion', 'categoria', 'precio', 'precio_proveedor',
+    'stock_proveedor', 'stock_ilimitado', 'en_oferta', 'precio_oferta_proveedor', 'precio_oferta',
+    'imagenes', 'external_url', 'last_sync', 'search_document', 'sync_hash', 'actualizado',
+]
+
+# Columnas necesarias para decidir qué productos existentes cambiaron
+DIFF_FIELDS = ['id', 'external_id', 'sync_hash', 'precio', 'precio_manual']
+
+
+def product_fingerprint(producto_json, categoria):
+    """
+    Huella del producto tal como lo publica el proveedor: SHA-256 del JSON
+    normalizado (claves ordenadas) más la categoría donde se encontró.
+    Si no cambia, no hace falta reescribir la fila.
+    """
+    normalizado = json.dumps(producto_json, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(f'{categoria.pk}:{normalizado}'.encode('utf-8')).hexdigest()
+
+
+class ProductoProveedor:
+    """
+    Lo que la sincronización usa de un producto del proveedor: los campos que
+    lee normalize_product_data y la huella del JSON completo (si se pasa la
+    categoría). Con __slots__ ocupa una fracción del dict original, que se
+    puede descartar apenas se arma el registro.
+    """
+    __slots__ = (
+        'external_id', 'nombre', 'descripcion', 'stock_proveedor', 'stock_ilimitado', 'precio_proveedor',
+        'en_oferta', 'precio_oferta_proveedor', 'imagenes', 'p_link', 'sync_hash',
+    )
+
+    def __init__(self, producto_json, categoria=None):
+        self.external_id = str(producto_json['idProductos'])
+        self.nombre = producto_json['p_nombre']
+        self.descripcion = producto_json.get('p_descripcion', '')
+
+        # Stock
+        stock_info = producto_json['stock'][0] if producto_json.get('stock') else {}
+        self.stock_proveedor = stock_info.get('s_cantidad', 0)
+        self.stock_ilimitado = stock_info.get('s_ilimitado', 0) == 1
+        self.precio_proveedor = stock_info.get('s_precio', producto_json.get('p_precio', 0))
+
+        # Ofertas
+        self.en_oferta = producto_json.get('p_oferta', 0) == 1
+        self.precio_oferta_proveedor = producto_json.get('p_precio_oferta', 0) if self.en_oferta else None
+
+        # Imágenes: si ya es una URL completa se usa directamente, si es solo el path se agrega el CDN
+        self.imagenes = tuple(
+            i_link if i_link.startswith('http') else f"{CDN_BASE}/{i_link}"
+            for i_link in (img.get('i_link', '') for img in producto_json.get('imagenes', []))
+        )
+        self.p_link = producto_json.get('p_link', '')
+        self.sync_hash = product_fingerprint(producto_json, categoria) if categoria is not None else None
+
+    def campos(self, categoria, tabla=None):
+        """Campos de Product (incluye external_id y precio calculado, no la huella)"""
+        tabla = tabla or tabla_de_precios()
+        # URL del producto original
+        external_url = f"{CATEGORIAS_CONFIG[categoria.nombre.lower()]['url']}/{self.p_link}" if self.p_link else None
+        return {
+            'external_id': self.external_id,
+            'nombre': self.nombre,
+            'descripcion': self.descripcion,
+            'categoria': categoria,
+            # Precios según la regla de la categoría (market/pricing.py)
+            'precio': tabla.precio(categoria.pk, self.precio_proveedor),
+            'precio_oferta': tabla.precio_oferta(categoria.pk, self.precio_oferta_proveedor) if self.en_oferta else None,
+            'precio_proveedor': self.precio_proveedor,
+            'stock_proveedor': self.stock_proveedor,
+            'stock_ilimitado': self.stock_ilimitado,
+            'en_oferta': self.en_oferta,
+            'precio_oferta_proveedor': self.precio_oferta_proveedor,
+            'imagenes': list(self.imagenes),
+            'external_url': external_url,
+        }
+
+
+def normalize_product_data(producto_json, categoria, tabla=None):
+    """
+    Convierte el JSON de un producto del proveedor en los campos del modelo
     
     Args:
         producto_json: Datos del producto en JSON
         categoria: Instancia de Category
-        subcategorias_map: Diccionario {external_id: nombre_subcategoria}
+        tabla: TablaDePrecios compilada (por defecto la del proceso)
     
     Returns:
-        tuple: (producto, created)
+        dict: campos de Product (incluye external_id y precio calculado)
     """
-    try:
-        external_id = str(producto_json['idProductos'])
-        nombre = producto_json['p_nombre']
-        descripcion = producto_json.get('p_descripcion', '')
-        
-        # Stock
-        stock_info = producto_json['stock'][0] if producto_json.get('stock') else {}
-        stock_proveedor = stock_info.get('s_cantidad', 0)
-        stock_ilimitado = stock_info.get('s_ilimitado', 0) == 1
-        precio_proveedor = stock_info.get('s_precio', producto_json.get('p_precio', 0))
-        
-        # Ofertas
-        en_oferta = producto_json.get('p_oferta', 0) == 1
-        precio_oferta_proveedor = producto_json.get('p_precio_oferta', 0) if en_oferta else None
-        
-        # Imágenes
-        imagenes_json = producto_json.get('imagenes', [])
-        imagenes_urls = []
-        for img in imagenes_json:
-            i_link = img.get('i_link', '')
-            # Si ya es una URL completa, usarla directamente
-            if i_link.startswith('http'):
-                imagenes_urls.append(i_link)
-            else:
-                # Si es solo el path, agregar el CDN base
-                imagenes_urls.append(f"{CDN_BASE}/{i_link}")
-        
-        # URL del producto original
-        p_link = producto_json.get('p_link', '')
-        external_url = f"{CATEGORIAS_CONFIG[categoria.nombre.lower()]['url']}/{p_link}" if p_link else None
-        
-        # Calcular precio (markup del 100%)
-        precio_calculado = float(precio_proveedor) * 2
-        
-        # Verificar si el producto ya existe
-        try:
-            producto_existente = Product.objects.get(external_id=external_id)
-            # Si existe y tiene precio manual, mantenerlo
-            if producto_existente.precio_manual:
-                precio_final = producto_existente.precio
-            else:
-                precio_final = precio_calculado
-        except Product.DoesNotExist:
-            # Si no existe, usar el precio calculado
-            precio_final = precio_calculado
-        
-        # Buscar o crear producto
-        producto, created = Product.objects.update_or_create(
-            external_id=external_id,
-            defaults={
-                'nombre': nombre,
-                'descripcion': descripcion,
-                'categoria': categoria,
-                'precio': precio_final,
-                'precio_proveedor': precio_proveedor,
-                'stock_proveedor': stock_proveedor,
-                'stock_ilimitado': stock_ilimitado,
-                'en_oferta': en_oferta,
-                'precio_oferta_proveedor': precio_oferta_proveedor,
-                'imagenes': imagenes_urls,
-                'external_url': external_url,
-                'last_sync': timezone.now(),
-            }
-        )
-        
-        return producto, created
-        
-    except Exception as e:
-        logger.error(f"Error procesando producto {producto_json.get('p_nombre', 'unknown')}: {str(e)}")
-        return None, False
+    return ProductoProveedor(producto_json).campos(categoria, tabla)
+
+
+def assign_unique_slugs(productos, usados=None):
+    """
+    Asigna slugs únicos a productos nuevos con una sola consulta, usando el
+    mismo esquema que Product.save (base, base-1, base-2, ...).
+
+    `usados` permite reusar entre lotes los slugs ya cargados: si viene vacío
+    se llena en la primera llamada y se le agregan los que se asignan.
+    """
+    if not usados:
+        cargados = set(Product.objects.values_list('slug', flat=True))
+        if usados is None:
+            usados = cargados
+        else:
+            usados.update(cargados)
+    for producto in productos:
+        base_slug = slugify(producto.nombre)
+        slug = base_slug
+        counter = 1
+        while slug in usados:
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        usados.add(slug)
+        producto.slug = slug
 
 
-def sync_external_products():
+def persist_products(productos, categoria, etapas=None, slugs_usados=None):
     """
-    Función principal de sincronización
+    Crea/actualiza en lote los productos scrapeados de una categoría.
+
+    Precarga los existentes por external_id en una sola consulta y compara
+    la huella del JSON del proveedor: solo se reescriben los productos
+    nuevos o modificados (bulk_create/bulk_update en lotes, dentro de una
+    única transacción). A los que no cambiaron solo se les actualiza
+    last_sync con un UPDATE por lote. Los productos con precio_manual
+    conservan su precio.
+
+    `productos` puede traer el JSON del proveedor o ProductoProveedor ya
+    armados (stream_category). Cada parte se mide en `etapas` (opcional):
+    'parse' (lectura del JSON, huella y precios), 'diff' (carga de
+    existentes y comparación) y 'persist' (escrituras e índice de búsqueda).
+    `slugs_usados` se pasa a assign_unique_slugs.
+    
+    Returns:
+        dict: {'nuevos': [Product], 'actualizados': [Product],
+               'sin_cambios': [external_id], 'errores': [str]}
+    """
+    etapas = etapas or Etapas()
+    normalizados = {}
+    errores = []
+    leidos = 0
+    with etapas.medir('parse'):
+        tabla = tabla_de_precios()  # Reglas compiladas: un lookup por producto, sin consultas
+        for producto in productos:
+            try:
+                if not isinstance(producto, ProductoProveedor):
+                    leidos += 1
+                    producto = ProductoProveedor(producto, categoria)
+                data = producto.campos(categoria, tabla)
+                data['sync_hash'] = producto.sync_hash
+            except Exception as e:
+                nombre = producto.nombre if isinstance(producto, ProductoProveedor) else producto.get('p_nombre', 'unknown')
+                logger.error(f"Error procesando producto {nombre}: {str(e)}")
+                errores.append(f"Error procesando producto en {categoria.nombre}")
+                continue
+            # Si el proveedor repite un producto, gana la última aparición
+            normalizados[data.pop('external_id')] = data
+    # Los ProductoProveedor ya se contaron al armarlos
+    etapas.sumar('parse', cantidad=leidos)
+
+    nuevos = []
+    actualizados = []
+    sin_cambios = {}
+    if not normalizados:
+        return {'nuevos': nuevos, 'actualizados': actualizados, 'sin_cambios': [], 'errores': errores}
+
+    batch_size = getattr(settings, 'SCRAPER_BULK_BATCH_SIZE', 500)
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        with etapas.medir('diff', cantidad=len(normalizados)):
+            existentes = Product.objects.only(*DIFF_FIELDS).in_bulk(list(normalizados), field_name='external_id')
+
+            for external_id, data in normalizados.items():
+                producto = existentes.get(external_id)
+                if producto is not None and producto.sync_hash == data['sync_hash']:
+                    sin_cambios[producto.pk] = external_id
+                    continue
+                if producto is None:
+                    producto = Product(external_id=external_id, **data)
+                    nuevos.append(producto)
+                else:
+                    precio_manual = producto.precio_manual
+                    precio_actual = producto.precio
+                    for field, value in data.items():
+                        setattr(producto, field, value)
+                    # Si tiene precio manual, mantenerlo
+                    if precio_manual:
+                        producto.precio = precio_actual
+                    # bulk_update no aplica auto_now
+                    producto.actualizado = ahora
+                    actualizados.append(producto)
+                producto.last_sync = ahora
+                producto.search_document = build_search_document(producto.nombre, producto.descripcion)
+
+        with etapas.medir('persist', cantidad=len(nuevos) + len(actualizados)):
+            if nuevos:
+                assign_unique_slugs(nuevos, slugs_usados)
+                Product.objects.bulk_create(nuevos, batch_size=batch_size)
+            if actualizados:
+                Product.objects.bulk_update(actualizados, SYNC_FIELDS, batch_size=batch_size)
+                bump_catalog_generation()
+            # Solo last_sync: no cambia nada visible, el cache del catálogo sigue valiendo
+            ids_sin_cambios = list(sin_cambios)
+            for i in range(0, len(ids_sin_cambios), batch_size):
+                Product.objects.filter(pk__in=ids_sin_cambios[i:i + batch_size]).update(last_sync=ahora)
+            index_products(nuevos + actualizados)
+
+    return {
+        'nuevos': nuevos,
+        'actualizados': actualizados,
+        'sin_cambios': list(sin_cambios.values()),
+        'errores': errores,
+    }
+
+
+def persist_stream(registros, categoria, etapas=None):
+    """
+    Persiste los productos de un iterable (stream_category) en lotes de
+    SCRAPER_BULK_BATCH_SIZE, cada uno con persist_products y en su propia
+    transacción, sin acumular la categoría: en memoria queda un lote.
+
+    Returns:
+        dict: {'productos', 'nuevos', 'actualizados', 'sin_cambios': int, 'errores': [str]}
+    """
+    batch_size = getattr(settings, 'SCRAPER_BULK_BATCH_SIZE', 500)
+    totales = {'productos': 0, 'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0, 'errores': []}
+    registros = iter(registros)
+    # Se cargan una vez, con el primer lote que traiga productos nuevos
+    slugs_usados = set()
+    while True:
+        lote = list(islice(registros, batch_size))
+        if not lote:
+            return totales
+        resultado = persist_products(lote, categoria, etapas, slugs_usados)
+        for producto in resultado['nuevos']:
+            logger.info(f"✅ Producto NUEVO: {producto.nombre}")
+        totales['productos'] += len(lote)
+        for clave in ('nuevos', 'actualizados', 'sin_cambios'):
+            totales[clave] += len(resultado[clave])
+        totales['errores'].extend(resultado['errores'])
+
+
+def sync_external_products(origen='scheduler', usuario=None):
+    """
+    Función principal de sincronización.
+
+    Cada corrida queda registrada en SyncRun con sus totales y el tiempo y
+    la cantidad de cada etapa: sesion (sesión y CSRF), fetch, parse, diff,
+    persist y deactivate.
+
+    Args:
+        origen: 'scheduler' o 'manual'
+        usuario: usuario que pidió la sincronización manual (opcional)
     
     Returns:
         dict: Estadísticas de la sincronización
     """
+    sync_run = SyncRun.objects.create(origen=origen, usuario=usuario)
+    etapas = Etapas()
+    inicio = time.perf_counter()
+    try:
+        resultado = _sincronizar(etapas)
+    except Exception as e:
+        _finalizar_sync_run(sync_run, {'success': False, 'errores': [str(e)]}, etapas, inicio)
+        raise
+    _finalizar_sync_run(sync_run, resultado, etapas, inicio)
+    resultado['duracion_segundos'] = sync_run.duracion_segundos
+    resultado['etapas'] = sync_run.etapas
+    resultado['sync_run_id'] = sync_run.pk
+    return resultado
+
+
+def _finalizar_sync_run(sync_run, resultado, etapas, inicio):
+    sync_run.finalizado = timezone.now()
+    sync_run.duracion_segundos = round(time.perf_counter() - inicio, 3)
+    sync_run.estado = 'ok' if resultado['success'] else 'error'
+    sync_run.etapas = etapas.exportar()
+    sync_run.errores = resultado.get('errores') or ([resultado['error']] if 'error' in resultado else [])
+    for campo in ('nuevos', 'actualizados', 'sin_cambios', 'desactivados', 'productos'):
+        setattr(sync_run, campo, resultado.get(campo, 0))
+    sync_run.paginas = len(resultado.get('paginas', []))
+    sync_run.save()
+
+
+def _sincronizar(etapas):
     logger.info("=" * 60)
     logger.info("INICIANDO SINCRONIZACIÓN DE PRODUCTOS")
     logger.info("=" * 60)
     
     # Obtener sesión y token
-    session, csrf_token = get_session_and_csrf()
+    with etapas.medir('sesion', cantidad=1):
+        session, csrf_token = get_session_and_csrf()
     if not session or not csrf_token:
         return {
             'success': False,
@@ -267,11 +662,18 @@ def sync_external_products():
     
     productos_nuevos = 0
     productos_actualizados = 0
+    productos_sin_cambios = 0
+    productos_recibidos = 0
     errores = []
-    productos_encontrados = []
+    client = ProviderClient(session, csrf_token, etapas=etapas)
+    inicio = time.perf_counter()
+    # Todo lo que se vea en esta corrida queda con last_sync >= inicio_sync
+    inicio_sync = timezone.now()
     
-    # Scrapear cada categoría
-    for cat_key, cat_config in CATEGORIAS_CONFIG.items():
+    # Cada categoría se procesa como un stream: las páginas se piden en
+    # ventanas paralelas (ProviderClient) y se persisten por lotes a medida
+    # que llegan, sin juntar la categoría entera en memoria
+    for cat_config in CATEGORIAS_CONFIG.values():
         try:
             logger.info(f"\n📦 Procesando categoría: {cat_config['categoria_nombre']}")
             
@@ -281,67 +683,57 @@ def sync_external_products():
                 defaults={'descripcion': f'Categoría {cat_config["categoria_nombre"]}'}
             )
             
-            # Scrapear productos de la categoría
-            productos_json = scrape_category(
-                session,
-                csrf_token,
-                cat_config['ids'],
-                cat_config['categoria_nombre']
-            )
-            
-            # Obtener mapa de subcategorías para esta categoría
-            subcategorias_map = cat_config.get('subcategorias', {})
+            resultado = persist_stream(stream_category(client, cat_config, categoria, errores), categoria, etapas)
             
-            # Procesar cada producto
-            for prod_json in productos_json:
-                producto, created = process_product_data(prod_json, categoria, subcategorias_map)
-                
-                if producto:
-                    productos_encontrados.append(producto.external_id)
-                    
-                    if created:
-                        productos_nuevos += 1
-                        logger.info(f"✅ Producto NUEVO: {producto.nombre}")
-                    else:
-                        productos_actualizados += 1
-                        logger.debug(f"🔄 Producto actualizado: {producto.nombre}")
-                else:
-                    errores.append(f"Error procesando producto en {cat_config['categoria_nombre']}")
+            productos_recibidos += resultado['productos']
+            productos_nuevos += resultado['nuevos']
+            productos_actualizados += resultado['actualizados']
+            productos_sin_cambios += resultado['sin_cambios']
+            errores.extend(resultado['errores'])
             
         except Exception as e:
             error_msg = f"Error en categoría {cat_config['categoria_nombre']}: {str(e)}"
             logger.error(error_msg)
             errores.append(error_msg)
     
-    # Marcar como no disponibles los productos que ya no existen
-    productos_desaparecidos = Product.objects.filter(
-        external_id__isnull=False
-    ).exclude(
-        external_id__in=productos_encontrados
-    )
-    
-    count_desaparecidos = productos_desaparecidos.count()
-    if count_desaparecidos > 0:
-        productos_desaparecidos.update(desactivado=True)
-        logger.info(f"⚠️ {count_desaparecidos} productos marcados como desactivados (ya no existen en proveedor)")
+    # Marcar como no disponibles los productos que ya no existen (no se
+    # vieron en esta corrida)
+    with etapas.medir('deactivate'):
+        productos_desaparecidos = Product.objects.filter(
+            external_id__isnull=False, desactivado=False
+        ).exclude(
+            last_sync__gte=inicio_sync
+        )
+        
+        count_desaparecidos = productos_desaparecidos.update_catalog(desactivado=True)
+        if count_desaparecidos > 0:
+            logger.info(f"⚠️ {count_desaparecidos} productos marcados como desactivados (ya no existen en proveedor)")
+    etapas.sumar('deactivate', cantidad=count_desaparecidos)
     
     # Estadísticas finales
-    total = productos_nuevos + productos_actualizados
+    total = productos_nuevos + productos_actualizados + productos_sin_cambios
     
     logger.info("\n" + "=" * 60)
     logger.info("SINCRONIZACIÓN COMPLETADA")
     logger.info("=" * 60)
     logger.info(f"✅ Productos nuevos: {productos_nuevos}")
     logger.info(f"🔄 Productos actualizados: {productos_actualizados}")
+    logger.info(f"💤 Productos sin cambios: {productos_sin_cambios}")
     logger.info(f"📦 Total procesados: {total}")
     logger.info(f"⚠️ Productos desactivados: {count_desaparecidos}")
     logger.info(f"❌ Errores: {len(errores)}")
+    logger.info(f"⏱️ Duración: {time.perf_counter() - inicio:.2f}s en {len(client.page_timings)} páginas")
+    for etapa, datos in etapas.exportar().items():
+        logger.info(f"   {etapa}: {datos['segundos']:.3f}s ({datos['cantidad']})")
     
     return {
         'success': True,
         'nuevos': productos_nuevos,
         'actualizados': productos_actualizados,
+        'sin_cambios': productos_sin_cambios,
         'total': total,
+        'productos': productos_recibidos,
         'desactivados': count_desaparecidos,
-        'errores': errores
+        'errores': errores,
+        'paginas': sorted(client.page_timings, key=lambda t: (t['categoria'], t['pagina'])),
     }
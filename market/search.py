@@ -0,0 +1,172 @@
+"""
+Búsqueda de texto completo sobre el catálogo de productos
+
+El texto buscable de cada producto (nombre + descripción) se normaliza en
+Python a `Product.search_document`: minúsculas, sin acentos, sin HTML, sin
+stopwords y con un stemming liviano para español. Como el documento ya llega
+normalizado, los motores solo tienen que tokenizar por espacios:
+
+- PostgreSQL: índice GIN sobre to_tsvector('simple', search_document).
+- MySQL: índice FULLTEXT sobre search_document (MATCH ... AGAINST en modo
+  booleano). InnoDB no indexa términos de menos de innodb_ft_min_token_size
+  (3) caracteres ni sus stopwords: esos términos se exigen además con LIKE
+  sobre las filas que ya eligió el índice.
+- SQLite: tabla virtual FTS5 `market_product_fts` mantenida por la aplicación.
+- Otros: fallback por términos (LIKE, sin índice) sobre la columna normalizada.
+
+En todos los casos cada término se busca por prefijo ("relo" encuentra "reloj").
+"""
+
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'market_product_fts'
+# innodb_ft_min_token_size por defecto: los términos más cortos no están en el índice
+MYSQL_FT_MIN_TOKEN = 3
+
+STOPWORDS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'para', 'por', 'sin', 'su', 'sus', 'un', 'una', 'unos', 'unas', 'y', 'o',
+}
+
+_TAGS_RE = re.compile(r'<[^>]+>')
+_NO_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+# Cache por alias de conexión: ¿existe la tabla FTS5 en esta base?
+_fts_disponible = {}
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos ni HTML, solo [a-z0-9] separados por espacios"""
+    texto = _TAGS_RE.sub(' ', texto or '')
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALNUM_RE.sub(' ', texto.lower()).strip()
+
+
+def stem(token):
+    """
+    Stemming liviano para español: quita plurales y la vocal final de género
+    (relojes -> reloj, negras -> negr, clásicos -> clasic).
+    """
+    if token.isdigit() or len(token) <= 3:
+        return token
+    if token.endswith('ces') and len(token) > 4:
+        token = token[:-3] + 'z'
+    elif token.endswith('es') and len(token) > 4 and token[-3] not in 'aeiou':
+        token = token[:-2]
+    elif token.endswith('s'):
+        token = token[:-1]
+    if len(token) > 4 and token[-1] in 'aeo':
+        token = token[:-1]
+    return token
+
+
+def tokenizar(texto):
+    """Lista de stems buscables de un texto (en orden, con repeticiones)"""
+    return [stem(t) for t in normalizar(texto).split() if t not in STOPWORDS]
+
+
+def build_search_document(nombre, descripcion):
+    """
+    Documento buscable de un producto. Los términos del nombre se repiten
+    para que pesen más que los de la descripción en el ranking.
+    """
+    nombre_tokens = tokenizar(nombre)
+    descripcion_tokens = tokenizar(descripcion)
+    return ' '.join(nombre_tokens + nombre_tokens + descripcion_tokens)
+
+
+def fts_disponible(conn=None):
+    conn = conn or connection
+    if conn.vendor != 'sqlite':
+        return False
+    # Solo se cachea el resultado positivo: la tabla puede crearse después
+    # (migrate, base de tests) dentro del mismo proceso.
+    if not _fts_disponible.get(conn.alias):
+        _fts_disponible[conn.alias] = FTS_TABLE in conn.introspection.table_names()
+    return _fts_disponible[conn.alias]
+
+
+def index_products(productos):
+    """
+    Sincroniza la tabla FTS5 (solo SQLite) con el search_document de los
+    productos dados. Se usa desde Product.save y desde las escrituras masivas
+    del scraper; en PostgreSQL el índice GIN se mantiene solo.
+    """
+    if not fts_disponible():
+        return
+    filas = [(p.pk, p.search_document) for p in productos if p.pk]
+    if not filas:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk, _ in filas])
+        cursor.executemany(f'INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (%s, %s)', filas)
+
+
+def unindex_products(ids):
+    if not fts_disponible() or not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+
+def search_products(queryset, texto):
+    """
+    Filtra `queryset` por `texto` y anota `search_rank` (mayor = más relevante).
+    El queryset resultante queda ordenado por relevancia.
+    """
+    terminos = list(dict.fromkeys(tokenizar(texto)))
+    if not terminos:
+        # Solo stopwords o símbolos: comportamiento anterior
+        return queryset.filter(nombre__icontains=texto)
+
+    tabla = connection.ops.quote_name(queryset.model._meta.db_table)
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{t}:*' for t in terminos)
+        vector = f"to_tsvector('simple', {tabla}.search_document)"
+        consulta = "to_tsquery('simple', %s)"
+        queryset = queryset.filter(
+            RawSQL(f'{vector} @@ {consulta}', [tsquery], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({vector}, {consulta})', [tsquery], output_field=FloatField())
+        )
+    elif connection.vendor == 'mysql' and any(len(t) >= MYSQL_FT_MIN_TOKEN for t in terminos):
+        against = ' '.join(f'+{t}*' for t in terminos if len(t) >= MYSQL_FT_MIN_TOKEN)
+        match = f'MATCH({tabla}.search_document) AGAINST (%s IN BOOLEAN MODE)'
+        condicion = Q()
+        for termino in terminos:
+            # Mismo resultado que el fallback aunque InnoDB ignore el término
+            condicion &= Q(search_document__icontains=termino)
+        queryset = queryset.filter(
+            RawSQL(match, [against], output_field=BooleanField())
+        ).filter(condicion).annotate(
+            search_rank=RawSQL(match, [against], output_field=FloatField())
+        )
+    elif fts_disponible():
+        match = ' '.join(f'"{t}"*' for t in terminos)
+        queryset = queryset.filter(
+            RawSQL(
+                f'{tabla}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+                [match], output_field=BooleanField()
+            )
+        ).annotate(
+            # bm25() devuelve valores negativos: más chico = más relevante
+            search_rank=RawSQL(
+                f'(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {tabla}.id)',
+                [match], output_field=FloatField()
+            )
+        )
+    else:
+        condicion = Q()
+        for termino in terminos:
+            condicion &= Q(search_document__icontains=termino)
+        queryset = queryset.filter(condicion).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.order_by('-search_rank', 'id')
@@ -3,7 +3,12 @@ from .models import *
 from account_admin.serializer import UserSerializer
 from rest_framework.exceptions import ValidationError
 from rest_framework import parsers
+from django.db import transaction
+from .checkout import StockInsuficiente, crear_pedido
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 class CodigoDescuentoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -67,6 +72,39 @@ class ProductSerializer(serializers.ModelSerializer):
         }
         return representation
     
+class ProductCardSerializer:
+    """
+    Proyección compacta y de solo lectura para grillas (?view=card).
+    Trabaja sobre filas de .values() sin la maquinaria de campos de DRF:
+    una consulta con las columnas justas y un dict por producto.
+    """
+    VALUES = (
+        'id', 'nombre', 'slug', 'precio', 'precio_final', 'imagenes', 'disponible',
+        'categoria_id', 'categoria__nombre',
+    )
+
+    @classmethod
+    def project(cls, queryset):
+        return queryset.values(*cls.VALUES)
+
+    @staticmethod
+    def to_representation(fila):
+        # precio_final y disponible son columnas generadas: vienen calculadas
+        imagenes = fila['imagenes']
+        return {
+            'id': fila['id'],
+            'nombre': fila['nombre'],
+            'slug': fila['slug'],
+            'precio_final': fila['precio_final'],
+            'imagen_principal': imagenes[0] if imagenes else None,
+            'disponible': fila['disponible'],
+            'categoria': {'id': fila['categoria_id'], 'nombre': fila['categoria__nombre']},
+        }
+
+    @classmethod
+    def many(cls, filas):
+        return [cls.to_representation(fila) for fila in filas]
+
 class OrderDetailSerializer(serializers.ModelSerializer):
     # Para mostrar detalles del producto en GET
     producto_detalle = ProductSerializer(source='producto', read_only=True)
@@ -146,56 +184,46 @@ class OrderSerializer(serializers.ModelSerializer):
                 representation['detalles'] = simplified_details
         return representation
     
+    def validate_detalles_input(self, value):
+        """
+        Normaliza los detalles a {'watch_id': int, 'cantidad': int} y verifica
+        que todos los productos existan con una sola consulta.
+        """
+        detalles = []
+        for detalle_data in value:
+            try:
+                watch_id = int(detalle_data.get('watch_id'))
+                cantidad = int(detalle_data.get('cantidad', 1))
+            except (TypeError, ValueError):
+                raise ValidationError(f"Detalle inválido: {detalle_data}")
+            if cantidad < 1:
+                raise ValidationError(f'Cantidad inválida para el producto {watch_id}')
+            detalles.append({'watch_id': watch_id, 'cantidad': cantidad})
+
+        ids = {d['watch_id'] for d in detalles}
+        existentes = set(Product.objects.filter(pk__in=ids).values_list('id', flat=True))
+        faltantes = sorted(ids - existentes)
+        if faltantes:
+            raise ValidationError(f"Producto con ID {', '.join(map(str, faltantes))} no encontrado")
+        return detalles
+
     def create(self, validated_data):
         """
         Crea una orden con sus detalles.
-        Maneja el campo write_only 'detalles_input' para crear los OrderDetail.
+        Maneja el campo write_only 'detalles_input' (ya validado) y crea los
+        OrderDetail en lote: reserva de stock con un único UPDATE, detalles con
+        bulk_create y total calculado en memoria, todo en una transacción.
         """
-        # Extraer detalles_input antes de crear la orden
         detalles_data = validated_data.pop('detalles_input', [])
-        
-        print(f"📦 Creando orden con validated_data: {validated_data}")
-        print(f"📦 Detalles a crear: {detalles_data}")
-        
-        # Crear la orden
-        order = Order.objects.create(**validated_data)
-        print(f"✅ Orden creada: #{order.id}")
-        
-        # Crear los detalles si existen
-        for detalle_data in detalles_data:
-            watch_id = detalle_data.get('watch_id')
-            cantidad = detalle_data.get('cantidad', 1)
-            
-            print(f"🔍 Buscando producto ID: {watch_id}, cantidad: {cantidad}")
-            
-            # Buscar el producto
-            try:
-                producto = Product.objects.get(id=watch_id)
-                print(f"✅ Producto encontrado: {producto.nombre}")
-            except Product.DoesNotExist:
-                # Si el producto no existe, eliminar la orden y lanzar error
-                print(f"❌ Producto con ID {watch_id} no encontrado")
-                order.delete()
-                raise ValidationError(f'Producto con ID {watch_id} no encontrado')
-            
-            # Crear el detalle
-            detalle = OrderDetail.objects.create(
-                pedido=order,
-                producto=producto,
-                cantidad=cantidad,
-                subtotal=producto.precio * cantidad
-            )
-            print(f"✅ Detalle creado: {detalle.id}")
-            
-            # Actualizar stock vendido
-            producto.stock_vendido += cantidad
-            producto.save()
-            print(f"📊 Stock vendido actualizado: {producto.stock_vendido}")
-        
-        # Actualizar total de la orden
-        order.total_update()
-        print(f"💰 Total de la orden: {order.total}")
-        
+        items = [(d['watch_id'], d['cantidad']) for d in detalles_data]
+
+        try:
+            with transaction.atomic():
+                order = crear_pedido(items, **validated_data)
+        except StockInsuficiente as e:
+            raise ValidationError(str(e))
+
+        logger.info(f"✅ Orden #{order.id} creada con {len(items)} detalles, total {order.total}")
         return order
 
 class PaySerializer(serializers.ModelSerializer):
@@ -359,9 +387,11 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'usuario', 'fecha_actualizacion']
     
     def to_representation(self, instance):
+        # Con Cart.objects.con_resumen() el total sale de la anotación, sin recorrer items
         representation = super().to_representation(instance)
-        representation['total'] = float(instance.total())
-        representation['cantidad_items'] = instance.cantidad_items()
+        resumen = instance.resumen()
+        representation['total'] = float(resumen['total'])
+        representation['cantidad_items'] = resumen['cantidad_items']
         return representation
 
 class ProductBriefSerializer(serializers.ModelSerializer):
@@ -379,3 +409,16 @@ class FavoriteSerializer(serializers.ModelSerializer):
         model = Favorite
         fields = ('id', 'product', 'product_id', 'created_at')
         read_only_fields = ('id', 'created_at')
+
+
+class SyncRunSerializer(serializers.ModelSerializer):
+    usuario = serializers.CharField(source='usuario.username', read_only=True, default=None)
+
+    class Meta:
+        model = SyncRun
+        fields = (
+            'id', 'iniciado', 'finalizado', 'estado', 'origen', 'usuario', 'duracion_segundos',
+            'paginas', 'productos', 'nuevos', 'actualizados', 'sin_cambios', 'desactivados',
+            'etapas', 'errores',
+        )
+        read_only_fields = fields
@@ -1,35 +1,219 @@
+"""
+Notificaciones a Telegram mediante una cola persistente (outbox)
+
+`send_order_paid_notification` no llama a Telegram: arma el mensaje y lo
+guarda en TelegramOutbox dentro de la transacción en curso. Un único worker
+(el job del scheduler, ver Velorum/scheduler.py) vacía la cola con
+`drain_outbox`:
+
+- Una sesión HTTP con pool de conexiones (keep-alive) para todos los envíos.
+- Reintentos con backoff exponencial ante errores de red o 5xx.
+- Ante un 429 respeta `retry_after` y posterga toda la cola.
+- Si hay varios mensajes pendientes los agrupa en un solo mensaje (digest)
+  de hasta TELEGRAM_DIGEST_MAX pedidos, sin pasar el límite de Telegram.
+  Si Telegram rechaza un digest (4xx), sus mensajes se reenvían de a uno:
+  solo falla el que tiene el problema.
+
+Los mensajes se envían con parse_mode=HTML: los datos del pedido se escapan.
+"""
+
+import html
+import logging
 import threading
+from collections import deque
+from datetime import timedelta
+
 import requests
 from django.conf import settings
-import logging
+from django.db.models import F
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+# Límite de Telegram para el texto de un mensaje
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = "\n\n──────────\n\n"
 
-def _send_text(token, chat_id, text, parse_mode="HTML"):
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
+
+class TelegramError(Exception):
+    """Error al enviar; `reintentable` indica si vale la pena volver a intentar"""
+
+    def __init__(self, mensaje, reintentable=True):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+
+
+class TelegramRateLimited(TelegramError):
+    """Telegram respondió 429: no enviar nada más por `retry_after` segundos"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limit de Telegram, reintentar en {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TelegramClient:
+    """Cliente de la Bot API con una sesión HTTP reutilizada"""
+
+    def __init__(self, token=None, chat_id=None, api_url=None, timeout=None):
+        self.token = token or getattr(settings, "TELEGRAM_BOT_TOKEN", None)
+        self.chat_id = chat_id or getattr(settings, "TELEGRAM_CHAT_ID", None)
+        self.api_url = (api_url or settings.TELEGRAM_API_URL).rstrip('/')
+        self.timeout = timeout or settings.TELEGRAM_TIMEOUT
+        self.session = requests.Session()
+        # Un solo worker envía: basta un pool chico con keep-alive
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+    @property
+    def configurado(self):
+        return bool(self.token and self.chat_id)
+
+    def send_text(self, text, parse_mode="HTML"):
+        url = f"{self.api_url}/bot{self.token}/sendMessage"
+        payload = {"chat_id": self.chat_id, "text": text, "parse_mode": parse_mode}
+        try:
+            resp = self.session.post(url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise TelegramError(f"Error de red: {e}")
+        if resp.status_code == 429:
+            try:
+                retry_after = int(resp.json().get('parameters', {}).get('retry_after', 1))
+            except ValueError:
+                retry_after = int(resp.headers.get('Retry-After', 1))
+            raise TelegramRateLimited(retry_after)
+        if resp.status_code >= 500:
+            raise TelegramError(f"HTTP {resp.status_code}")
+        if resp.status_code >= 400:
+            # Token, chat o texto inválidos: reintentar no lo arregla
+            raise TelegramError(f"HTTP {resp.status_code}: {resp.text[:200]}", reintentable=False)
         return True
-    except Exception as e:
-        logger.exception("Error sending Telegram message: %s", e)
-        return False
 
+    def close(self):
+        self.session.close()
 
-def send_order_paid_notification(order):
-    """Envía una notificación a Telegram sobre un pedido pagado.
 
-    Usa las variables de entorno `TELEGRAM_BOT_TOKEN` y `TELEGRAM_CHAT_ID`
-    expuestas en `settings`.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Cliente compartido del proceso (una sola sesión HTTP)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TelegramClient()
+        return _client
+
+
+def _backoff(intentos):
+    base = settings.TELEGRAM_BACKOFF_SECONDS
+    return timedelta(seconds=min(base * (2 ** max(intentos - 1, 0)), 3600))
+
+
+def _encabezado(cantidad):
+    return f"🧾 {cantidad} pedidos confirmados"
+
+
+def _armar_lotes(mensajes, maximo):
     """
-    token = getattr(settings, "TELEGRAM_BOT_TOKEN", None)
-    chat_id = getattr(settings, "TELEGRAM_CHAT_ID", None)
-    if not token or not chat_id:
-        logger.debug("Telegram token o chat_id no configurados; omitiendo notificación")
-        return
+    Agrupa mensajes consecutivos en digests que respetan el límite de
+    Telegram, contando el encabezado y su separador: un digest nunca se corta.
+    """
+    lotes = []
+    actual = []
+    largo = 0  # textos y separadores entre ellos
+    for mensaje in mensajes:
+        if actual:
+            extra = len(DIGEST_SEPARATOR) + len(mensaje.texto)
+            digest = len(_encabezado(len(actual) + 1)) + len(DIGEST_SEPARATOR) + largo + extra
+            if len(actual) >= maximo or digest > MAX_MESSAGE_LENGTH:
+                lotes.append(actual)
+                actual, largo, extra = [], 0, len(mensaje.texto)
+        else:
+            extra = len(mensaje.texto)
+        actual.append(mensaje)
+        largo += extra
+    if actual:
+        lotes.append(actual)
+    return lotes
+
+
+def _texto_lote(lote):
+    if len(lote) == 1:
+        return lote[0].texto[:MAX_MESSAGE_LENGTH]
+    # _armar_lotes ya garantizó que entra completo
+    return _encabezado(len(lote)) + DIGEST_SEPARATOR + DIGEST_SEPARATOR.join(m.texto for m in lote)
+
+
+def drain_outbox(client=None, limit=100):
+    """
+    Envía los mensajes pendientes y vencidos de TelegramOutbox.
+
+    Returns:
+        dict: {'enviados': int, 'mensajes': int, 'reintentos': int, 'fallidos': int}
+    """
+    from .models import TelegramOutbox
+
+    client = client or get_client()
+    resultado = {'enviados': 0, 'mensajes': 0, 'reintentos': 0, 'fallidos': 0}
+    if not client.configurado:
+        logger.debug("Telegram token o chat_id no configurados; la cola queda pendiente")
+        return resultado
+
+    ahora = timezone.now()
+    pendientes = list(
+        TelegramOutbox.objects.filter(estado='pendiente', proximo_intento__lte=ahora).order_by('id')[:limit]
+    )
+    lotes = deque(_armar_lotes(pendientes, max(settings.TELEGRAM_DIGEST_MAX, 1)))
+    while lotes:
+        lote = lotes.popleft()
+        ids = [m.pk for m in lote]
+        try:
+            client.send_text(_texto_lote(lote))
+        except TelegramRateLimited as e:
+            # Postergar toda la cola: cualquier envío antes de retry_after vuelve a fallar
+            logger.warning(str(e))
+            TelegramOutbox.objects.filter(estado='pendiente').update(
+                proximo_intento=timezone.now() + timedelta(seconds=e.retry_after)
+            )
+            resultado['reintentos'] += len(ids)
+            break
+        except TelegramError as e:
+            if not e.reintentable and len(lote) > 1:
+                # Un 4xx del digest suele venir de un solo mensaje: de a uno,
+                # los demás se envían y falla solo el que tiene el problema
+                logger.warning("Telegram rechazó un digest de %s mensajes (%s); se envían de a uno", len(ids), e)
+                lotes.extendleft(reversed([[mensaje] for mensaje in lote]))
+                continue
+            logger.warning("Error enviando a Telegram (%s mensajes): %s", len(ids), e)
+            _registrar_error(lote, e)
+            for mensaje in lote:
+                resultado['fallidos' if mensaje.estado == 'fallido' else 'reintentos'] += 1
+            continue
+        TelegramOutbox.objects.filter(pk__in=ids).update(
+            estado='enviado', enviado_en=timezone.now(), intentos=F('intentos') + 1, ultimo_error=''
+        )
+        resultado['enviados'] += 1
+        resultado['mensajes'] += len(ids)
+    return resultado
 
+
+def _registrar_error(lote, error):
+    maximo = settings.TELEGRAM_MAX_INTENTOS
+    ahora = timezone.now()
+    for mensaje in lote:
+        mensaje.intentos += 1
+        mensaje.ultimo_error = str(error)[:1000]
+        if not error.reintentable or mensaje.intentos >= maximo:
+            mensaje.estado = 'fallido'
+        else:
+            mensaje.proximo_intento = ahora + _backoff(mensaje.intentos)
+    type(lote[0]).objects.bulk_update(lote, ['intentos', 'ultimo_error', 'estado', 'proximo_intento'])
+
+
+def format_order_paid_message(order):
+    """Texto de la notificación de un pedido pagado"""
     def _format_price(value):
         try:
             val = float(value)
@@ -186,9 +370,24 @@ def send_order_paid_notification(order):
         lines.append("📝 Notas de envío:")
         lines.append(notas_envio)
 
-    text = "\n".join(lines)
+    # El texto no lleva marcas propias y se envía con parse_mode=HTML: se
+    # escapa todo lo que escribió el cliente (nombres, dirección, notas, productos)
+    return html.escape("\n".join(lines), quote=False)
+
+
+def send_order_paid_notification(order):
+    """Encola una notificación a Telegram sobre un pedido pagado.
+
+    Usa las variables de entorno `TELEGRAM_BOT_TOKEN` y `TELEGRAM_CHAT_ID`
+    expuestas en `settings`. El envío lo hace `drain_outbox` en el worker
+    del scheduler; el mensaje se guarda en la transacción en curso.
+    """
+    from .models import TelegramOutbox
+
+    token = getattr(settings, "TELEGRAM_BOT_TOKEN", None)
+    chat_id = getattr(settings, "TELEGRAM_CHAT_ID", None)
+    if not token or not chat_id:
+        logger.debug("Telegram token o chat_id no configurados; omitiendo notificación")
+        return None
 
-    # Enviar en hilo para no bloquear la respuesta del webhook
-    t = threading.Thread(target=_send_text, args=(token, chat_id, text))
-    t.daemon = True
-    t.start()
+    return TelegramOutbox.objects.create(pedido=order, texto=format_order_paid_message(order))
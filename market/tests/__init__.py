@@ -1,4 +1,23 @@
 from .test_models import *
 from .test_serializers import *
 from .test_views import *
-from .test_urls import *
\ No newline at end of file
+from .test_urls import *
+from .test_pagination import *
+from .test_queries import *
+from .test_search import *
+from .test_scraper import *
+from .test_scheduler import *
+from .test_checkout import *
+from .test_order_serializer import *
+from .test_cache import *
+from .test_catalog_cache import *
+from .test_product_card import *
+from .test_derived_columns import *
+from .test_pricing import *
+from .test_telegram import *
+from .test_mercadopago import *
+from .test_mp_events import *
+from .test_benchmark import *
+from .test_instrumentation import *
+from .test_sync_runs import *
+from .test_provider_replay import *
\ No newline at end of file
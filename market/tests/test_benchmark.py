@@ -0,0 +1,40 @@
+from django.test import TestCase
+from market.benchmark import Benchmark, comparar
+
+VOLUMENES_CHICOS = {
+    'productos': 30, 'categorias': 3, 'pedidos': 6, 'items_por_pedido': 2,
+    'items_carrito': 4, 'productos_sync': 12,
+}
+
+
+class TestBenchmark(TestCase):
+    def test_report_covers_all_scenarios(self):
+        reporte = Benchmark(VOLUMENES_CHICOS, iteraciones=2).ejecutar()
+        self.assertEqual(reporte['meta']['volumenes'], VOLUMENES_CHICOS)
+        self.assertEqual(reporte['meta']['iteraciones'], 2)
+        escenarios = reporte['escenarios']
+        self.assertEqual(set(escenarios), {
+            'product_list', 'product_list_cached', 'product_list_card', 'product_list_ordered',
+            'cart_read', 'checkout', 'order_list', 'my_orders', 'webhook', 'webhook_worker',
+            'sync_sin_cambios', 'sync_cambios',
+        })
+        for nombre, resultado in escenarios.items():
+            latencia = resultado['latencia_ms']
+            self.assertLessEqual(latencia['min'], latencia['mediana'], nombre)
+            self.assertLessEqual(latencia['mediana'], latencia['max'], nombre)
+            self.assertIn(resultado.get('status', 200), (200, 201), nombre)
+            self.assertGreater(resultado['memoria_kb'], 0, nombre)
+        self.assertEqual(escenarios['product_list_cached']['consultas'], 0)
+        self.assertGreater(escenarios['product_list']['consultas'], 0)
+
+    def test_unknown_scenario(self):
+        with self.assertRaisesMessage(ValueError, 'nope'):
+            Benchmark(VOLUMENES_CHICOS, iteraciones=1).ejecutar(['nope'])
+
+    def test_compare_reports(self):
+        def reporte(consultas, mediana):
+            return {'escenarios': {'cart_read': {'consultas': consultas, 'latencia_ms': {'mediana': mediana}}}}
+
+        diferencias = comparar(reporte(2, 10.0), reporte(5, 12.5))
+        self.assertEqual(diferencias, {'cart_read': {'consultas': (2, 5), 'mediana_ms': (10.0, 12.5, 25.0)}})
+        self.assertEqual(comparar({'escenarios': {}}, reporte(2, 1.0)), {})
@@ -0,0 +1,83 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from Velorum.cache import TieredCache
+
+
+def worker_cache(worker, version=1, l1_timeout=5):
+    """
+    TieredCache de un 'worker': el L1 es propio (LocMem por nombre) y el L2 en
+    memoria es el mismo para todos, como lo sería Redis.
+    """
+    return TieredCache(worker, {
+        'KEY_PREFIX': 'velorum',
+        'VERSION': version,
+        'OPTIONS': {
+            'L1_TIMEOUT': l1_timeout,
+            'LOCK_POLL': 0.01,
+            'L2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-l2'},
+        },
+    })
+
+
+class TestTieredCache(SimpleTestCase):
+    def setUp(self):
+        self.a = worker_cache('a')
+        self.b = worker_cache('b')
+        self.a.clear()
+        self.b.clear()
+
+    def test_default_cache_is_tiered(self):
+        self.assertEqual(settings.CACHES['default']['BACKEND'], 'Velorum.cache.TieredCache')
+        cache.set('ping', 'pong')
+        self.assertEqual(cache.get('ping'), 'pong')
+
+    def test_workers_share_values_through_l2(self):
+        self.a.set('catalogo', [1, 2, 3])
+        self.assertEqual(self.b.get('catalogo'), [1, 2, 3])
+        self.assertEqual(self.b.get_many(['catalogo', 'otra']), {'catalogo': [1, 2, 3]})
+
+    def test_l1_copy_expires_quickly_after_remote_delete(self):
+        b = worker_cache('rapido', l1_timeout=1)
+        self.a.set('clave', 'v1')
+        self.assertEqual(b.get('clave'), 'v1')
+        self.a.delete('clave')
+        self.assertEqual(b.get('clave'), 'v1')  # copia local todavía vigente
+        time.sleep(1.1)
+        self.assertIsNone(b.get('clave'))
+
+    def test_version_isolates_keys(self):
+        self.a.set('clave', 'vieja')
+        nueva = worker_cache('nuevo-deploy', version=2)
+        self.assertIsNone(nueva.get('clave'))
+
+    def test_add_and_incr_use_shared_level(self):
+        self.assertTrue(self.a.add('contador', 1))
+        self.assertFalse(self.b.add('contador', 5))
+        self.assertEqual(self.b.incr('contador'), 2)
+        self.assertEqual(self.a.incr('contador'), 3)
+
+    def test_get_or_set_computes_once_under_concurrency(self):
+        llamadas = []
+        barrera = threading.Barrier(8)
+        resultados = []
+
+        def calcular():
+            llamadas.append(1)
+            time.sleep(0.1)
+            return 'caro'
+
+        def pedir(c):
+            barrera.wait()
+            resultados.append(c.get_or_set('reporte', calcular, 60))
+
+        hilos = [threading.Thread(target=pedir, args=(self.a if i % 2 else self.b,)) for i in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(resultados, ['caro'] * 8)
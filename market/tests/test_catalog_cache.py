@@ -0,0 +1,191 @@
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from market.catalog_cache import catalog_generation
+from market.models import Category, Product
+from market import scraper
+from .test_scraper import fake_product
+from account_admin.models import User
+from faker import Faker
+
+fake = Faker()
+
+
+@override_settings(CATALOG_CACHE_TIMEOUT=300)
+class TestCatalogResponseCache(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.visible = self._product('Reloj visible')
+        self.oculto = self._product('Reloj oculto', desactivado=True)
+
+    def _product(self, nombre, **extra):
+        return Product.objects.create(
+            nombre=nombre, descripcion=fake.text(), precio=1000, stock_proveedor=5,
+            categoria=self.category, **extra
+        )
+
+    def _ids(self, response):
+        return sorted(p['id'] for p in response.data)
+
+    def test_second_request_is_served_without_database(self):
+        url = reverse('product-list')
+        primera = self.client.get(url)
+        self.assertEqual(primera['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            segunda = self.client.get(url)
+        self.assertEqual(segunda['X-Cache'], 'HIT')
+        self.assertEqual(segunda.data, primera.data)
+
+    def test_retrieve_and_categories_are_cached(self):
+        for url in (reverse('product-detail', kwargs={'pk': self.visible.id}), reverse('category-list')):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_query_params_are_part_of_the_key(self):
+        url = reverse('product-list')
+        self.client.get(url, {'precio_min': 1})
+        response = self.client.get(url, {'precio_min': 5000})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data, [])
+
+    def test_staff_and_public_are_cached_separately(self):
+        url = reverse('product-list')
+        self.assertEqual(self._ids(self.client.get(url)), [self.visible.id])
+        admin = User.objects.create_user(
+            username=fake.unique.user_name(), email=fake.unique.email(), password='x', role='admin'
+        )
+        self.client.force_authenticate(user=admin)
+        self.assertEqual(self._ids(self.client.get(url)), [self.visible.id, self.oculto.id])
+
+    def test_save_bumps_generation_and_invalidates(self):
+        url = reverse('product-list')
+        self.client.get(url)
+        generacion = catalog_generation()
+        self.oculto.desactivado = False
+        self.oculto.save()
+        self.assertGreater(catalog_generation(), generacion)
+        self.assertEqual(self._ids(self.client.get(url)), [self.visible.id, self.oculto.id])
+
+    def test_catalog_update_invalidates(self):
+        url = reverse('product-detail', kwargs={'pk': self.visible.id})
+        self.client.get(url)
+        Product.objects.filter(pk=self.visible.pk).update_catalog(stock_vendido=5)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertFalse(response.data['disponible'])
+
+    def test_bookkeeping_update_keeps_cache(self):
+        url = reverse('product-list')
+        self.client.get(url)
+        generacion = catalog_generation()
+        Product.objects.filter(pk=self.visible.pk).update(last_sync=timezone.now())
+        self.assertEqual(catalog_generation(), generacion)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+    def test_category_write_invalidates(self):
+        url = reverse('category-list')
+        self.client.get(url)
+        Category.objects.create(nombre=fake.unique.word())
+        self.assertEqual(len(self.client.get(url).data), 2)
+
+    @override_settings(CATALOG_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        url = reverse('product-list')
+        self.client.get(url)
+        self.assertFalse(self.client.get(url).has_header('X-Cache'))
+
+
+class TestCatalogConditionalGet(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.producto = Product.objects.create(
+            nombre='Reloj', descripcion=fake.text(), precio=1000, stock_proveedor=5, categoria=self.category
+        )
+        self.urls = [
+            reverse('product-list'),
+            reverse('product-detail', kwargs={'pk': self.producto.id}),
+            reverse('category-list'),
+        ]
+
+    def test_responses_carry_validators(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertTrue(response['ETag'].startswith('"'), url)
+            self.assertIn('Last-Modified', response)
+            self.assertIn('Authorization', response['Vary'])
+
+    def test_if_none_match_returns_304_without_queries(self):
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(response.content, b'')
+
+    def test_if_modified_since_returns_304(self):
+        url = self.urls[0]
+        ultima = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima).status_code, 304)
+
+    def test_changes_produce_new_etag(self):
+        url = self.urls[1]
+        etag = self.client.get(url)['ETag']
+        Product.objects.filter(pk=self.producto.pk).update_catalog(stock_vendido=1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_differs_per_variant(self):
+        self.assertNotEqual(
+            self.client.get(self.urls[0])['ETag'],
+            self.client.get(self.urls[0], {'precio_min': 1})['ETag']
+        )
+
+    def test_catalog_update_touches_actualizado(self):
+        antes = Product.objects.get(pk=self.producto.pk).actualizado
+        Product.objects.filter(pk=self.producto.pk).update_catalog(stock_vendido=2)
+        self.assertGreater(Product.objects.get(pk=self.producto.pk).actualizado, antes)
+
+    def test_catalog_instance_save_touches_actualizado(self):
+        antes = Product.objects.get(pk=self.producto.pk).actualizado
+        producto = Product.objects.for_catalog().get(pk=self.producto.pk)
+        producto.desactivado = True
+        producto.save()
+        self.assertGreater(Product.objects.get(pk=self.producto.pk).actualizado, antes)
+
+    def test_bookkeeping_update_keeps_actualizado(self):
+        antes = Product.objects.get(pk=self.producto.pk).actualizado
+        Product.objects.filter(pk=self.producto.pk).update(last_sync=timezone.now())
+        self.assertEqual(Product.objects.get(pk=self.producto.pk).actualizado, antes)
+
+    def test_unchanged_sync_keeps_validators(self):
+        relojes = Category.objects.create(nombre='Relojes', descripcion='Categoría Relojes')
+        productos = [fake_product(1), fake_product(2)]
+        scraper.persist_products(productos, relojes)
+        url = self.urls[0]
+        primera = self.client.get(url)
+        actualizado = Product.objects.get(external_id='1').actualizado
+
+        resultado = scraper.persist_products(productos, relojes)
+        self.assertEqual(len(resultado['sin_cambios']), 2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], primera['ETag'])
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=primera['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(url)['Last-Modified'], primera['Last-Modified'])
+        self.assertEqual(Product.objects.get(external_id='1').actualizado, actualizado)
+
+    def test_last_modified_rebuilt_from_database(self):
+        cache.clear()
+        response = self.client.get(self.urls[2])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
@@ -0,0 +1,189 @@
+import threading
+from unittest.mock import patch
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from market import checkout
+from market.models import Cart, CartItem, Category, Order, OrderDetail, Product
+from account_admin.models import User
+from faker import Faker
+
+fake = Faker()
+
+
+def crear_usuario():
+    return User.objects.create_user(
+        username=fake.unique.user_name(),
+        email=fake.unique.email(),
+        password='testpass123',
+        role='client'
+    )
+
+
+class TestCheckout(TestCase):
+    def setUp(self):
+        self.user = crear_usuario()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.cart = Cart.objects.create(usuario=self.user)
+
+    def _product(self, stock=5, precio=100, **extra):
+        return Product.objects.create(
+            nombre=fake.word(), descripcion=fake.text(), precio=precio,
+            stock_proveedor=stock, categoria=self.category, **extra
+        )
+
+    def _checkout(self):
+        return self.client.post(reverse('cart-checkout'))
+
+    def test_checkout_creates_order_and_reserves_stock(self):
+        p1 = self._product(stock=5, precio=100)
+        p2 = self._product(stock=3, precio=50)
+        CartItem.objects.create(carrito=self.cart, producto=p1, cantidad=2)
+        CartItem.objects.create(carrito=self.cart, producto=p2, cantidad=3)
+
+        response = self._checkout()
+
+        self.assertEqual(response.status_code, 201)
+        pedido = Order.objects.get(pk=response.data['pedido_id'])
+        self.assertEqual(pedido.total, 350)
+        self.assertEqual(
+            sorted(pedido.detalles.values_list('producto_id', 'cantidad', 'subtotal')),
+            sorted([(p1.id, 2, 200), (p2.id, 3, 150)])
+        )
+        p1.refresh_from_db()
+        p2.refresh_from_db()
+        self.assertEqual((p1.stock_vendido, p2.stock_vendido), (2, 3))
+        self.assertEqual(self.cart.items.count(), 0)
+
+    def test_insufficient_stock_leaves_nothing_behind(self):
+        p1 = self._product(stock=5)
+        p2 = self._product(stock=1)
+        CartItem.objects.create(carrito=self.cart, producto=p1, cantidad=2)
+        CartItem.objects.create(carrito=self.cart, producto=p2, cantidad=2)
+
+        response = self._checkout()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Stock insuficiente', response.data['error'])
+        self.assertFalse(Order.objects.exists())
+        p1.refresh_from_db()
+        self.assertEqual(p1.stock_vendido, 0)
+        self.assertEqual(self.cart.items.count(), 2)
+
+    def test_hidden_product_is_rejected(self):
+        producto = self._product(desactivado=True)
+        CartItem.objects.create(carrito=self.cart, producto=producto, cantidad=1)
+        response = self._checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ya no está disponible', response.data['error'])
+        self.assertFalse(Order.objects.exists())
+
+    def test_unlimited_stock_is_never_short(self):
+        producto = self._product(stock=0, stock_ilimitado=True)
+        CartItem.objects.create(carrito=self.cart, producto=producto, cantidad=10)
+        self.assertEqual(self._checkout().status_code, 201)
+
+    def test_reservation_changes_product_etag(self):
+        producto = self._product(stock=5)
+        url = reverse('product-detail', kwargs={'pk': producto.id})
+        anterior = self.client.get(url)
+        CartItem.objects.create(carrito=self.cart, producto=producto, cantidad=2)
+        self.assertEqual(self._checkout().status_code, 201)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anterior['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], anterior['ETag'])
+        self.assertEqual(response.data['stock_disponible'], 3)
+
+    def test_query_count_does_not_grow_with_items(self):
+        def medir(n):
+            for _ in range(n):
+                CartItem.objects.create(carrito=self.cart, producto=self._product(), cantidad=1)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self._checkout().status_code, 201)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(medir(1), medir(8))
+
+
+class TestCheckoutRace(TestCase):
+    """
+    Simula la carrera que FOR UPDATE evita en PostgreSQL/MySQL: otra
+    transacción se lleva el stock después de leer las filas. El UPDATE
+    condicional tiene que rechazar el pedido igual.
+    """
+
+    def test_conditional_update_rejects_stale_stock(self):
+        usuario = crear_usuario()
+        category = Category.objects.create(nombre='Relojes', descripcion='x')
+        producto = Product.objects.create(
+            nombre='Reloj', descripcion='x', precio=100, stock_proveedor=3, categoria=category
+        )
+        CartItem.objects.create(carrito=Cart.objects.create(usuario=usuario), producto=producto, cantidad=2)
+
+        bloquear = checkout._bloquear_productos
+
+        def snapshot_y_competidor(ids):
+            productos = bloquear(ids)
+            Product.objects.filter(pk=producto.pk).update(stock_vendido=2)
+            return productos
+
+        client = APIClient()
+        client.force_authenticate(user=usuario)
+        with patch('market.checkout._bloquear_productos', snapshot_y_competidor):
+            response = client.post(reverse('cart-checkout'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Solo hay 1 unidades', response.data['error'])
+        self.assertFalse(Order.objects.exists())
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class TestCheckoutConcurrency(TransactionTestCase):
+    """
+    Muchos checkouts simultáneos sobre el mismo producto no sobrevenden.
+    Requiere bloqueos de fila reales (PostgreSQL/MySQL): la base en memoria
+    compartida de SQLite que usan los tests no soporta escrituras concurrentes.
+    """
+
+    STOCK = 5
+    COMPRADORES = 12
+
+    def test_concurrent_checkouts_never_oversell(self):
+        category = Category.objects.create(nombre='Relojes', descripcion='x')
+        producto = Product.objects.create(
+            nombre='Reloj', descripcion='x', precio=100, stock_proveedor=self.STOCK, categoria=category
+        )
+        usuarios = []
+        for _ in range(self.COMPRADORES):
+            usuario = crear_usuario()
+            CartItem.objects.create(carrito=Cart.objects.create(usuario=usuario), producto=producto, cantidad=1)
+            usuarios.append(usuario)
+
+        barrera = threading.Barrier(self.COMPRADORES)
+        resultados = []
+
+        def comprar(usuario):
+            client = APIClient()
+            client.force_authenticate(user=usuario)
+            barrera.wait()
+            try:
+                resultados.append(client.post(reverse('cart-checkout')).status_code)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=comprar, args=(u,)) for u in usuarios]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        producto.refresh_from_db()
+        self.assertEqual(resultados.count(201), self.STOCK)
+        self.assertEqual(resultados.count(400), self.COMPRADORES - self.STOCK)
+        self.assertEqual(producto.stock_vendido, self.STOCK)
+        self.assertEqual(OrderDetail.objects.count(), self.STOCK)
@@ -0,0 +1,117 @@
+from decimal import Decimal
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from market.checkout import crear_pedido
+from market.models import Category, Product, STOCK_ILIMITADO
+from faker import Faker
+
+fake = Faker()
+
+
+class TestDerivedColumns(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.producto = Product.objects.create(
+            nombre='Reloj', descripcion=fake.text(), precio=1000, stock_proveedor=5,
+            stock_vendido=2, categoria=self.category
+        )
+
+    def test_values_returned_on_insert(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.producto.stock_disponible, 3)
+            self.assertTrue(self.producto.disponible)
+            self.assertEqual(self.producto.precio_final, Decimal('1000'))
+
+    def test_save_refreshes_derived_values(self):
+        self.producto.stock_vendido = 5
+        self.producto.en_oferta = True
+        self.producto.precio_oferta_proveedor = 300
+        self.producto.save()
+        self.assertEqual(self.producto.stock_disponible, 0)
+        self.assertFalse(self.producto.disponible)
+        self.assertEqual(self.producto.precio_final, Decimal('600'))
+
+    def test_unlimited_and_deactivated(self):
+        self.producto.stock_ilimitado = True
+        self.producto.desactivado = True
+        self.producto.save()
+        self.assertEqual(self.producto.stock_disponible, STOCK_ILIMITADO)
+        self.assertFalse(self.producto.disponible)
+
+    def test_stock_never_negative(self):
+        Product.objects.filter(pk=self.producto.pk).update(stock_proveedor=1)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_disponible, 0)
+
+    def test_bulk_update_keeps_columns_in_sync(self):
+        Product.objects.filter(pk=self.producto.pk).update(stock_vendido=5)
+        self.assertFalse(Product.objects.filter(disponible=True).exists())
+        self.producto.stock_vendido = 0
+        Product.objects.bulk_update([self.producto], ['stock_vendido'])
+        self.assertEqual(Product.objects.get(pk=self.producto.pk).stock_disponible, 5)
+
+    def test_checkout_and_cancellation(self):
+        with transaction.atomic():
+            pedido = crear_pedido([(self.producto.pk, 3)], direccion_envio='Calle 123')
+        self.assertFalse(Product.objects.get(pk=self.producto.pk).disponible)
+
+        pedido.estado = 'cancelado'
+        pedido.save()
+        producto = Product.objects.get(pk=self.producto.pk)
+        self.assertEqual(producto.stock_disponible, 3)
+        self.assertTrue(producto.disponible)
+
+
+class TestCatalogDerivedFilters(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.oferta = Product.objects.create(
+            nombre='Reloj en oferta', descripcion=fake.text(), precio=1000, stock_proveedor=3,
+            en_oferta=True, precio_oferta_proveedor=300, categoria=self.category
+        )
+        self.caro = Product.objects.create(
+            nombre='Reloj caro', descripcion=fake.text(), precio=800, stock_proveedor=2,
+            categoria=self.category
+        )
+        self.agotado = Product.objects.create(
+            nombre='Reloj agotado', descripcion=fake.text(), precio=500, stock_proveedor=1,
+            stock_vendido=1, categoria=self.category
+        )
+
+    def _ids(self, **params):
+        response = self.client.get(reverse('product-list'), params)
+        self.assertEqual(response.status_code, 200)
+        datos = response.data['results'] if 'results' in response.data else response.data
+        return [p['id'] for p in datos]
+
+    def test_filter_disponible(self):
+        self.assertEqual(set(self._ids(disponible='true')), {self.oferta.id, self.caro.id})
+        self.assertEqual(self._ids(disponible='false'), [self.agotado.id])
+
+    def test_filter_en_oferta(self):
+        self.assertEqual(self._ids(en_oferta='true'), [self.oferta.id])
+
+    def test_ordering_precio_final(self):
+        self.assertEqual(self._ids(ordering='precio_final'), [self.agotado.id, self.oferta.id, self.caro.id])
+        self.assertEqual(self._ids(ordering='-precio_final'), [self.caro.id, self.oferta.id, self.agotado.id])
+
+    def test_keyset_pagination_by_precio_final(self):
+        pagina = self.client.get(
+            reverse('product-list'), {'page_size': 1, 'ordering': 'precio_final', 'disponible': 'true'}
+        ).data
+        self.assertEqual([p['id'] for p in pagina['results']], [self.oferta.id])
+        siguiente = self.client.get(pagina['next']).data
+        self.assertEqual([p['id'] for p in siguiente['results']], [self.caro.id])
+        self.assertIsNone(siguiente['next'])
+
+    def test_filters_run_in_sql(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self._ids(disponible='true', en_oferta='true', ordering='precio_final')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        sql = ctx.captured_queries[0]['sql']
+        self.assertIn('"disponible"', sql)
+        self.assertIn('ORDER BY "market_product"."precio_final"', sql)
@@ -0,0 +1,86 @@
+import re
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from account_admin.models import User
+from market.models import Category, Product
+from Velorum import instrumentation
+from faker import Faker
+
+fake = Faker()
+
+SERVER_TIMING_RE = re.compile(
+    r'db;dur=[\d.]+;desc="(?P<consultas>\d+) consultas", ser;dur=(?P<ser>[\d.]+), app;dur=[\d.]+, total;dur=(?P<total>[\d.]+)'
+)
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1, CATALOG_CACHE_TIMEOUT=0)
+class TestInstrumentation(APITestCase):
+    def setUp(self):
+        instrumentation.registro.reiniciar()
+        self.addCleanup(instrumentation.registro.reiniciar)
+        self.client = APIClient()
+        categoria = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        for _ in range(3):
+            Product.objects.create(
+                nombre=fake.unique.word(), descripcion=fake.text(), precio=100, stock_proveedor=1, categoria=categoria
+            )
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('product-list'))
+        match = SERVER_TIMING_RE.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreater(int(match['consultas']), 0)
+        self.assertGreater(float(match['ser']), 0)
+        self.assertGreaterEqual(float(match['total']), float(match['ser']))
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(instrumentation.registro.requests, {})
+
+    @override_settings(INSTRUMENTATION_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(sum(instrumentation.registro.requests.values()), 1)
+
+    def test_metrics_requires_admin(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        cliente = User.objects.create_user(username=fake.unique.user_name(), email=fake.unique.email(), password='x')
+        self.client.force_authenticate(user=cliente)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    def test_metrics_prometheus_format(self):
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-detail', args=[Product.objects.first().pk]))
+        admin = User.objects.create_user(
+            username=fake.unique.user_name(), email=fake.unique.email(), password='x', role='admin', is_staff=True
+        )
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        self.assertIn('velorum_http_requests_total{route="product-list",method="GET",status="200"} 2', texto)
+        self.assertIn('velorum_http_request_duration_seconds_count{route="product-list",method="GET"} 2', texto)
+        self.assertIn('velorum_http_request_duration_seconds_bucket{route="product-list",method="GET",le="+Inf"} 2', texto)
+        # Una serie por vista, no por path
+        self.assertIn('velorum_http_db_queries_count{route="product-detail",method="GET"} 1', texto)
+        self.assertIn('# TYPE velorum_http_serialization_duration_seconds histogram', texto)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histograma = instrumentation.Histograma((1, 5, 10))
+        for valor in (0.5, 3, 3, 20):
+            histograma.observar(valor)
+        lineas = list(histograma.lineas('m', 'route="r"'))
+        self.assertEqual(lineas, [
+            'm_bucket{route="r",le="1"} 1',
+            'm_bucket{route="r",le="5"} 3',
+            'm_bucket{route="r",le="10"} 3',
+            'm_bucket{route="r",le="+Inf"} 4',
+            'm_sum{route="r"} 26.500000',
+            'm_count{route="r"} 4',
+        ])
@@ -0,0 +1,76 @@
+import requests
+from django.test import SimpleTestCase, override_settings
+from market import mercadopago_service
+from market.fake_mercadopago import FakeMercadoPago
+from market.mercadopago_service import (
+    create_preference, get_sdk, process_payment_notification, reset_sdk,
+)
+
+
+def datos_pedido(order_id=1):
+    return {
+        'order_id': order_id,
+        'items': [{'name': 'Reloj', 'quantity': 2, 'price': '1500.50'}],
+        'payer_email': 'cliente@example.com',
+        'payer_name': 'Cliente',
+        'total': 3001,
+    }
+
+
+class TestMercadoPagoClient(SimpleTestCase):
+    def setUp(self):
+        self.mp = FakeMercadoPago()
+        self.addCleanup(self.mp.close)
+        ajustes = override_settings(MERCADOPAGO_API_URL=self.mp.url, MERCADOPAGO_ACCESS_TOKEN='TEST-token')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        reset_sdk()
+        self.addCleanup(reset_sdk)
+
+    def test_create_preference_against_fake_server(self):
+        resultado = create_preference(datos_pedido(7))
+        self.assertTrue(resultado['preference_id'].startswith('pref-'))
+        self.assertIn(resultado['preference_id'], resultado['init_point'])
+        metodo, path, cuerpo = self.mp.requests[0]
+        self.assertEqual((metodo, path), ('POST', '/checkout/preferences'))
+        self.assertEqual(cuerpo['external_reference'], '7')
+        self.assertEqual(cuerpo['items'][0]['unit_price'], 1500.5)
+
+    def test_sdk_is_shared_and_connections_reused(self):
+        self.assertIs(get_sdk(), get_sdk())
+        self.mp.agregar_pago(99, order_id=3)
+        for order_id in range(5):
+            create_preference(datos_pedido(order_id))
+        process_payment_notification('99')
+        self.assertEqual(len(self.mp.requests), 6)
+        self.assertEqual(len(self.mp.conexiones), 1)
+
+    def test_sdk_rebuilt_when_credentials_change(self):
+        sdk = get_sdk()
+        with override_settings(MERCADOPAGO_ACCESS_TOKEN='TEST-otro'):
+            self.assertIsNot(get_sdk(), sdk)
+        self.assertIs(get_sdk(), sdk)
+
+    def test_process_payment_notification(self):
+        self.mp.agregar_pago(123, order_id=42, status='approved', monto=3001)
+        pago = process_payment_notification('123')
+        self.assertEqual(pago, {
+            'status': 'approved', 'status_detail': 'accredited', 'order_id': '42',
+            'transaction_amount': 3001, 'payment_method_id': 'visa', 'payment_id': 123,
+        })
+
+    def test_error_status_raises(self):
+        self.mp.respuestas.append((400, {'message': 'invalid items'}))
+        with self.assertRaisesMessage(Exception, 'invalid items'):
+            create_preference(datos_pedido())
+
+    @override_settings(MERCADOPAGO_READ_TIMEOUT=0.2)
+    def test_read_timeout_applied(self):
+        self.mp.latencia = 0.5
+        with self.assertRaises(requests.Timeout):
+            create_preference(datos_pedido())
+
+    def test_default_api_url_is_rewritten(self):
+        cliente = get_sdk().http_client
+        self.assertEqual(cliente.base_url, self.mp.url)
+        self.assertTrue(mercadopago_service.MP_API_URL.startswith('https://'))
@@ -0,0 +1,157 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from market.fake_mercadopago import FakeMercadoPago
+from market.mercadopago_service import process_payment_notification, reset_sdk
+from market.models import MercadoPagoEvent, Order, Pay, TelegramOutbox
+from market.mp_events import process_mp_events, registrar_notificacion
+
+
+@override_settings(
+    TELEGRAM_BOT_TOKEN='token', TELEGRAM_CHAT_ID='chat',
+    MERCADOPAGO_EVENTS_MAX_INTENTOS=2, MERCADOPAGO_EVENTS_BACKOFF_SECONDS=30,
+)
+class TestMercadoPagoEvents(TestCase):
+    def setUp(self):
+        self.mp = FakeMercadoPago()
+        self.addCleanup(self.mp.close)
+        ajustes = override_settings(MERCADOPAGO_API_URL=self.mp.url)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        reset_sdk()
+        self.addCleanup(reset_sdk)
+        self.client = APIClient()
+        self.order = Order.objects.create(direccion_envio='Calle Falsa 123', total=100)
+
+    def notificar(self, payment_id):
+        return self.client.post(reverse('mp-webhook'), {'type': 'payment', 'data': {'id': payment_id}}, format='json')
+
+    def consultas_a_mp(self):
+        return [r for r in self.mp.requests if r[0] == 'GET']
+
+    def test_webhook_only_enqueues(self):
+        self.mp.agregar_pago(1, order_id=self.order.id)
+        response = self.notificar('1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.mp.requests, [])
+        evento = MercadoPagoEvent.objects.get()
+        self.assertEqual((evento.payment_id, evento.estado), ('1', 'pendiente'))
+        self.assertFalse(Pay.objects.exists())
+
+    def test_legacy_ipn_query_params(self):
+        response = self.client.post(reverse('mp-webhook') + '?topic=payment&id=77')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(MercadoPagoEvent.objects.get().payment_id, '77')
+
+    def test_other_topics_ignored(self):
+        self.client.post(reverse('mp-webhook') + '?topic=merchant_order&id=5')
+        self.assertFalse(MercadoPagoEvent.objects.exists())
+
+    def test_repeated_notifications_are_coalesced(self):
+        self.mp.agregar_pago(1, order_id=self.order.id)
+        for _ in range(5):
+            self.notificar('1')
+        evento = MercadoPagoEvent.objects.get()
+        self.assertEqual(evento.notificaciones, 5)
+        self.assertEqual(process_mp_events()['procesados'], 1)
+        self.assertEqual(len(self.consultas_a_mp()), 1)
+
+    def test_approved_payment_transitions_once(self):
+        self.mp.agregar_pago(1, order_id=self.order.id, monto=100)
+        self.notificar('1')
+        process_mp_events()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.estado, 'pagado')
+        pay = Pay.objects.get()
+        self.assertEqual((pay.estado, pay.external_id, pay.metadata['status_detail']), ('completado', '1', 'accredited'))
+        self.assertEqual(TelegramOutbox.objects.count(), 1)
+        evento = MercadoPagoEvent.objects.get()
+        self.assertEqual((evento.estado, evento.estado_pago, evento.pedido_id), ('procesado', 'approved', self.order.id))
+
+        # Una notificación repetida vuelve a consultar, pero no repite la transición
+        self.notificar('1')
+        self.assertEqual(process_mp_events(), {'procesados': 0, 'sin_cambios': 1, 'reintentos': 0, 'fallidos': 0})
+        self.assertEqual(Pay.objects.count(), 1)
+        self.assertEqual(TelegramOutbox.objects.count(), 1)
+
+    def test_pending_then_approved(self):
+        self.mp.agregar_pago(1, order_id=self.order.id, status='pending')
+        self.notificar('1')
+        process_mp_events()
+        self.assertEqual(Pay.objects.get().estado, 'pendiente')
+        self.assertFalse(TelegramOutbox.objects.exists())
+
+        self.mp.agregar_pago(1, order_id=self.order.id, status='approved')
+        self.notificar('1')
+        process_mp_events()
+        self.assertEqual(Pay.objects.get().estado, 'completado')
+        self.assertEqual(Order.objects.get(pk=self.order.pk).estado, 'pagado')
+        self.assertEqual(TelegramOutbox.objects.count(), 1)
+
+    def test_does_not_regress_shipped_order(self):
+        Order.objects.filter(pk=self.order.pk).update(estado='enviado')
+        self.mp.agregar_pago(1, order_id=self.order.id)
+        self.notificar('1')
+        process_mp_events()
+        self.assertEqual(Order.objects.get(pk=self.order.pk).estado, 'enviado')
+
+    def test_notification_during_processing_requeues(self):
+        self.mp.agregar_pago(1, order_id=self.order.id)
+        registrar_notificacion('1')
+
+        def consultar_y_notificar(payment_id):
+            registrar_notificacion(payment_id)  # llega mientras el worker consulta a MP
+            return process_payment_notification(payment_id)
+
+        with patch('market.mp_events.process_payment_notification', consultar_y_notificar):
+            self.assertEqual(process_mp_events()['procesados'], 1)
+        evento = MercadoPagoEvent.objects.get()
+        self.assertEqual((evento.estado, evento.notificaciones), ('pendiente', 2))
+        self.assertEqual(process_mp_events()['sin_cambios'], 1)
+        self.assertEqual(MercadoPagoEvent.objects.get().estado, 'procesado')
+
+    def test_api_errors_retry_with_backoff(self):
+        self.notificar('404')  # el fake responde 404: pago desconocido
+        antes = timezone.now()
+        self.assertEqual(process_mp_events()['reintentos'], 1)
+        evento = MercadoPagoEvent.objects.get()
+        self.assertEqual((evento.estado, evento.intentos), ('pendiente', 1))
+        self.assertGreaterEqual(evento.proximo_intento - antes, timedelta(seconds=29))
+        self.assertEqual(process_mp_events()['reintentos'], 0)  # todavía no venció
+
+        MercadoPagoEvent.objects.update(proximo_intento=timezone.now())
+        self.assertEqual(process_mp_events()['fallidos'], 1)
+        self.assertEqual(MercadoPagoEvent.objects.get().estado, 'fallido')
+
+        # Una notificación nueva reactiva el evento fallido
+        self.mp.agregar_pago(404, order_id=self.order.id)
+        self.notificar('404')
+        self.assertEqual(process_mp_events()['procesados'], 1)
+
+    def test_unknown_order_fails_without_retry(self):
+        self.mp.agregar_pago(1, order_id=999999)
+        self.notificar('1')
+        self.assertEqual(process_mp_events()['fallidos'], 1)
+        self.assertIn('999999', MercadoPagoEvent.objects.get().ultimo_error)
+
+    def test_notification_keeps_claim_deadline(self):
+        self.mp.agregar_pago(1, order_id=self.order.id)
+        self.notificar('1')
+        plazo = timezone.now() + timedelta(minutes=1)
+        MercadoPagoEvent.objects.update(estado='procesando', proximo_intento=plazo)
+        registrar_notificacion('1')
+        evento = MercadoPagoEvent.objects.get()
+        self.assertEqual((evento.estado, evento.proximo_intento, evento.notificaciones), ('procesando', plazo, 2))
+        # Otro worker no puede reclamarlo mientras el primero sigue consultando a MP
+        self.assertEqual(process_mp_events(), {'procesados': 0, 'sin_cambios': 0, 'reintentos': 0, 'fallidos': 0})
+
+    def test_expired_claim_is_picked_up(self):
+        self.mp.agregar_pago(1, order_id=self.order.id)
+        self.notificar('1')
+        MercadoPagoEvent.objects.update(estado='procesando', proximo_intento=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(process_mp_events()['procesados'], 0)
+        MercadoPagoEvent.objects.update(proximo_intento=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(process_mp_events()['procesados'], 1)
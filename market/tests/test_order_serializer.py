@@ -0,0 +1,94 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from market.models import Category, Order, OrderDetail, Product
+from market.serializer import OrderSerializer
+from faker import Faker
+
+fake = Faker()
+
+
+class TestOrderSerializerCreate(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+
+    def _product(self, stock=10, precio=100):
+        return Product.objects.create(
+            nombre=fake.word(), descripcion=fake.text(), precio=precio,
+            stock_proveedor=stock, categoria=self.category
+        )
+
+    def _serializer(self, detalles):
+        return OrderSerializer(data={
+            'direccion_envio': 'Calle 123',
+            'email_invitado': 'invitado@example.com',
+            'detalles_input': detalles,
+        })
+
+    def test_creates_details_stock_and_total(self):
+        p1 = self._product(precio=100)
+        p2 = self._product(precio=30)
+        serializer = self._serializer([
+            {'watch_id': p1.id, 'cantidad': 2},
+            {'watch_id': str(p2.id), 'cantidad': '3'},
+        ])
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        order = serializer.save()
+
+        self.assertEqual(order.total, 290)
+        self.assertEqual(Order.objects.get(pk=order.pk).total, 290)
+        self.assertEqual(
+            sorted(order.detalles.values_list('producto_id', 'cantidad', 'subtotal')),
+            sorted([(p1.id, 2, 200), (p2.id, 3, 90)])
+        )
+        self.assertEqual(
+            list(Product.objects.order_by('id').values_list('stock_vendido', flat=True)), [2, 3]
+        )
+
+    def test_missing_products_are_reported_together(self):
+        producto = self._product()
+        serializer = self._serializer([
+            {'watch_id': producto.id, 'cantidad': 1},
+            {'watch_id': 998, 'cantidad': 1},
+            {'watch_id': 999, 'cantidad': 1},
+        ])
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('998, 999', str(serializer.errors['detalles_input']))
+        self.assertFalse(Order.objects.exists())
+
+    def test_insufficient_stock_creates_nothing(self):
+        producto = self._product(stock=1)
+        serializer = self._serializer([{'watch_id': producto.id, 'cantidad': 2}])
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderDetail.objects.exists())
+
+    def test_product_gone_after_validation_is_a_400(self):
+        borrado = self._product()
+        oculto = self._product()
+        retirar = [
+            lambda: Product.objects.filter(pk=borrado.pk).delete(),
+            lambda: Product.objects.filter(pk=oculto.pk).update_catalog(desactivado=True),
+        ]
+        for producto, retirar in zip((borrado, oculto), retirar):
+            serializer = self._serializer([{'watch_id': producto.id, 'cantidad': 1}])
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            retirar()
+            with self.assertRaisesMessage(ValidationError, 'ya no está disponible'):
+                serializer.save()
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=oculto.pk).stock_vendido, 0)
+
+    def test_query_count_does_not_grow_with_details(self):
+        def medir(n):
+            detalles = [{'watch_id': self._product().id, 'cantidad': 1} for _ in range(n)]
+            serializer = self._serializer(detalles)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+                serializer.save()
+            return len(ctx.captured_queries)
+
+        self.assertEqual(medir(1), medir(10))
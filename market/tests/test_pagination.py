@@ -0,0 +1,85 @@
+import base64
+import json
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from market.models import Category, Product
+from faker import Faker
+
+fake = Faker()
+
+class TestProductKeysetPagination(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        # Precios repetidos para forzar empates en la clave compuesta
+        for i in range(7):
+            Product.objects.create(
+                nombre=f'Reloj {i}',
+                descripcion=fake.text(),
+                precio=Decimal('1000.00') * (i % 3 + 1),
+                stock_proveedor=5,
+                categoria=self.category
+            )
+        self.url = reverse('product-list')
+
+    def _collect(self, query):
+        ids = []
+        url = self.url + query
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            ids.extend(p['id'] for p in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_without_pagination_params_returns_full_list(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_walks_all_pages_by_precio_without_duplicates(self):
+        ids = self._collect('?page_size=3&ordering=precio')
+        esperado = list(Product.objects.order_by('precio', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_walks_all_pages_descending(self):
+        ids = self._collect('?page_size=3&ordering=-precio')
+        esperado = list(Product.objects.order_by('-precio', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_page_size_is_capped(self):
+        with self.settings(PRODUCTS_MAX_PAGE_SIZE=2):
+            response = self.client.get(self.url + '?page_size=50')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['page_size'], 2)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.url + '?cursor=no-es-un-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        response = self.client.get(self.url + '?page_size=3&ordering=precio')
+        next_url = response.data['next'].replace('ordering=precio', 'ordering=nombre')
+        response = self.client.get(next_url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_values_return_404(self):
+        def cursor(ordering, valores):
+            payload = json.dumps({'o': ordering, 'v': valores}).encode('utf-8')
+            return base64.urlsafe_b64encode(payload).decode('ascii')
+
+        casos = [
+            ('-id', ['abc']),
+            ('-id', ['9' * 30]),
+            ('precio', ['no-es-precio', '1']),
+            ('precio', ['NaN', '1']),
+            ('precio_final', ['1000', 'x']),
+            ('precio', [None, '1']),
+            ('precio', 'ab'),
+        ]
+        for ordering, valores in casos:
+            response = self.client.get(self.url, {'page_size': 3, 'ordering': ordering, 'cursor': cursor(ordering, valores)})
+            self.assertEqual(response.status_code, 404, (ordering, valores))
@@ -0,0 +1,260 @@
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from account_admin.models import User
+from market import pricing
+from market.models import Category, PricingRule, Product
+from market.pricing import (
+    Regla, aplicar_reglas, markup_desde_porcentaje, normalizar_markup,
+    repreciar, tabla_de_precios,
+)
+from market.scraper import normalize_product_data
+from faker import Faker
+
+fake = Faker()
+
+
+def crear_producto(categoria, precio_proveedor, precio=1, **extra):
+    return Product.objects.create(
+        nombre=fake.unique.word(), descripcion=fake.text(), precio=precio,
+        precio_proveedor=precio_proveedor, categoria=categoria, **extra
+    )
+
+
+class TestRepricingEngine(TestCase):
+    def setUp(self):
+        self.relojes = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.correas = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.a = crear_producto(self.relojes, '100.00', precio=150)
+        self.b = crear_producto(self.relojes, '33.33', precio=50)
+        self.manual = crear_producto(self.correas, '10.00', precio=99, precio_manual=True)
+        self.sin_proveedor = crear_producto(self.correas, None, precio=70)
+
+    def precios(self):
+        return dict(Product.objects.values_list('id', 'precio'))
+
+    def test_single_update_for_whole_catalog(self):
+        with self.assertNumQueries(3):  # SAVEPOINT, UPDATE, RELEASE SAVEPOINT
+            resultado = repreciar(2)
+        self.assertEqual(resultado['actualizados'], 3)
+        precios = self.precios()
+        self.assertEqual(precios[self.a.id], Decimal('200.00'))
+        self.assertEqual(precios[self.b.id], Decimal('66.66'))
+        self.assertEqual(precios[self.manual.id], Decimal('20.00'))
+        self.assertEqual(precios[self.sin_proveedor.id], Decimal('70'))
+        self.assertFalse(Product.objects.get(pk=self.manual.id).precio_manual)
+
+    def test_rounds_to_cents(self):
+        repreciar(Decimal('1.5'), ids=[self.b.id])
+        self.assertEqual(self.precios()[self.b.id], Decimal('50.00'))  # 49.995
+
+    def test_scoped_by_category_and_ids(self):
+        self.assertEqual(repreciar(3, categorias=[self.relojes.id])['actualizados'], 2)
+        self.assertEqual(repreciar(3, ids=[self.manual.id])['actualizados'], 1)
+        self.assertEqual(repreciar(3, ids=[self.sin_proveedor.id])['actualizados'], 0)
+
+    def test_respects_manual_prices(self):
+        resultado = repreciar(2, incluir_manuales=False)
+        self.assertEqual(resultado['actualizados'], 2)
+        self.assertEqual(self.precios()[self.manual.id], Decimal('99'))
+
+    def test_updates_generated_precio_final(self):
+        repreciar(2, ids=[self.a.id])
+        self.assertEqual(Product.objects.get(pk=self.a.id).precio_final, Decimal('200.00'))
+
+    def test_dry_run_does_not_write(self):
+        antes = self.precios()
+        with self.assertNumQueries(1):
+            resumen = repreciar(2, categorias=[self.relojes.id], dry_run=True)
+        self.assertEqual(self.precios(), antes)
+        self.assertTrue(resumen['dry_run'])
+        self.assertEqual(resumen['productos'], 2)
+        self.assertEqual(resumen['cambian'], 2)
+        self.assertEqual(resumen['total_actual'], Decimal('200'))
+        self.assertEqual(resumen['total_nuevo'], Decimal('266.66'))
+        self.assertEqual(resumen['delta_total'], Decimal('66.66'))
+        self.assertEqual(resumen['delta_min'], Decimal('16.66'))
+        self.assertEqual(resumen['delta_max'], Decimal('50.00'))
+
+    def test_dry_run_counts_only_changes(self):
+        repreciar(2)
+        resumen = repreciar(2, dry_run=True)
+        self.assertEqual(resumen['productos'], 3)
+        self.assertEqual(resumen['cambian'], 0)
+        self.assertEqual(resumen['delta_total'], 0)
+
+    def test_invalid_markup(self):
+        for invalido in (0, -1, 'abc', None, 'NaN'):
+            with self.assertRaises(ValueError):
+                normalizar_markup(invalido)
+        self.assertEqual(markup_desde_porcentaje(100), Decimal('2'))
+        self.assertEqual(markup_desde_porcentaje('50'), Decimal('1.5'))
+
+
+class TestRepricingEndpoints(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username=fake.unique.user_name(), email=fake.unique.email(), password='x',
+            role='admin', is_staff=True
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.a = crear_producto(self.category, '100.00', precio=150, precio_manual=True)
+        self.b = crear_producto(self.category, '40.00', precio=80)
+
+    def test_reset_all_prices(self):
+        response = self.client.post(reverse('product-reset-all-prices'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['actualizados'], 2)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(Product.objects.get(pk=self.a.id).precio, Decimal('200.00'))
+
+    def test_reset_all_prices_dry_run(self):
+        response = self.client.post(reverse('product-reset-all-prices'), {'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cambian'], 1)
+        self.assertEqual(response.data['delta_total'], 50.0)
+        self.assertEqual(Product.objects.get(pk=self.a.id).precio, Decimal('150'))
+
+    def test_bulk_markup(self):
+        response = self.client.post(
+            reverse('bulk-update-markup'), {'markup': 1.5, 'producto_ids': [self.b.id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['actualizados'], 1)
+        self.assertEqual(response.data['markup'], 1.5)
+        self.assertEqual(Product.objects.get(pk=self.b.id).precio, Decimal('60.00'))
+
+    def test_bulk_markup_percentage_respecting_manual(self):
+        response = self.client.post(
+            reverse('bulk-update-markup'),
+            {'markup_percentage': 50, 'incluir_manuales': False}, format='json'
+        )
+        self.assertEqual(response.data['actualizados'], 1)
+        self.assertEqual(Product.objects.get(pk=self.a.id).precio, Decimal('150'))
+
+    def test_bulk_markup_survives_later_saves(self):
+        Product.objects.filter(pk=self.b.id).update(en_oferta=True, precio_oferta_proveedor='30.00')
+        self.client.post(
+            reverse('bulk-update-markup'), {'markup': 1.5, 'producto_ids': [self.b.id]}, format='json'
+        )
+        response = self.client.post(reverse('product-toggle-visibility', kwargs={'pk': self.b.id}))
+        self.assertEqual(response.status_code, 200)
+        producto = Product.objects.get(pk=self.b.id)
+        self.assertEqual((producto.precio, producto.precio_oferta), (Decimal('60.00'), Decimal('45.00')))
+
+        producto.precio_oferta_proveedor = Decimal('40.00')
+        producto.save()
+        self.assertEqual(producto.precio_oferta, Decimal('80.00'))  # costo nuevo: vuelve a la regla
+
+    def test_bulk_markup_invalid(self):
+        response = self.client.post(reverse('bulk-update-markup'), {'markup': 0}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TestPricingRules(TestCase):
+    def setUp(self):
+        # La tabla compilada vive en el proceso: que no se filtre entre tests
+        pricing._invalidar_tabla()
+        self.addCleanup(pricing._invalidar_tabla)
+        self.relojes = Category.objects.create(nombre='Relojes', descripcion=fake.text())
+        self.correas = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        PricingRule.objects.create(markup=Decimal('1.8'))
+        PricingRule.objects.create(
+            categoria=self.relojes, markup=Decimal('2.5'), markup_oferta=Decimal('1.5'),
+            redondeo=Decimal('10'), redondeo_hacia_arriba=True
+        )
+
+    def test_regla_rounding(self):
+        self.assertEqual(Regla(2).precio('33.335'), Decimal('66.67'))
+        self.assertEqual(Regla(2, redondeo=100).precio(149), Decimal('300.00'))
+        self.assertEqual(Regla(2, redondeo=100).precio(124), Decimal('200.00'))
+        self.assertEqual(Regla(Decimal('1.1'), redondeo=1, hacia_arriba=True).precio(100), Decimal('110.00'))
+        self.assertEqual(Regla(2, redondeo=10, hacia_arriba=True).precio('40.01'), Decimal('90.00'))
+        self.assertIsNone(Regla(2).precio_oferta(None))
+        self.assertIsNone(Regla(2).precio_oferta(0))
+
+    def test_compiled_table_is_cached_per_process(self):
+        tabla = tabla_de_precios()
+        with self.assertNumQueries(0):
+            self.assertIs(tabla_de_precios(), tabla)
+            self.assertEqual(tabla.precio(self.relojes.id, 101), Decimal('260.00'))
+            self.assertEqual(tabla.precio(self.correas.id, 100), Decimal('180.00'))
+            self.assertEqual(tabla.precio_oferta(self.relojes.id, 100), Decimal('150.00'))
+            self.assertEqual(tabla.precio_oferta(self.correas.id, 100), Decimal('180.00'))
+
+    def test_rule_change_recompiles(self):
+        tabla = tabla_de_precios()
+        PricingRule.objects.filter(categoria__isnull=True).get().delete()
+        nueva = tabla_de_precios()
+        self.assertIsNot(nueva, tabla)
+        self.assertEqual(nueva.precio(self.correas.id, 100), Decimal('200.00'))  # markup por defecto
+
+    def test_sql_matches_python(self):
+        costos = ['0.01', '9.99', '33.33', '100', '101', '1234.56', '40.01']
+        productos = [
+            crear_producto(categoria, costo, precio_oferta_proveedor=costo, en_oferta=True)
+            for categoria in (self.relojes, self.correas) for costo in costos
+        ]
+        self.assertEqual(aplicar_reglas()['actualizados'], len(productos))
+        tabla = tabla_de_precios()
+        for producto in Product.objects.filter(pk__in=[p.pk for p in productos]):
+            self.assertEqual(producto.precio, tabla.precio(producto.categoria_id, producto.precio_proveedor))
+            self.assertEqual(
+                producto.precio_oferta, tabla.precio_oferta(producto.categoria_id, producto.precio_oferta_proveedor)
+            )
+            self.assertEqual(producto.precio_final, producto.precio_oferta)
+
+    def test_save_computes_offer_price(self):
+        producto = crear_producto(self.relojes, '100', en_oferta=True, precio_oferta_proveedor=80)
+        self.assertEqual(producto.precio_oferta, Decimal('120.00'))
+        self.assertEqual(producto.precio_final, Decimal('120.00'))
+
+    def test_rule_save_reprices_its_category_on_commit(self):
+        reloj = crear_producto(self.relojes, '100', precio=1)
+        manual = crear_producto(self.relojes, '100', precio=7, precio_manual=True)
+        correa = crear_producto(self.correas, '100', precio=1)
+        regla = PricingRule.objects.get(categoria=self.relojes)
+        regla.markup = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            regla.save()
+        precios = dict(Product.objects.values_list('id', 'precio'))
+        self.assertEqual(precios[reloj.id], Decimal('300.00'))
+        self.assertEqual(precios[manual.id], Decimal('7'))
+        self.assertEqual(precios[correa.id], Decimal('1'))
+
+    def test_single_global_rule(self):
+        with self.assertRaisesMessage(ValidationError, 'Ya existe una regla de precios global.'):
+            PricingRule(markup=3).full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PricingRule.objects.create(markup=3)
+        PricingRule(markup=3, categoria=Category.objects.create(nombre=fake.unique.word(), descripcion='x')).full_clean()
+        global_ = PricingRule.objects.get(categoria__isnull=True)
+        global_.markup = 3
+        global_.full_clean()
+        global_.save()
+
+    def test_sync_uses_category_rule(self):
+        data = normalize_product_data({
+            'idProductos': 1, 'p_nombre': 'Reloj', 'p_precio': 101, 'p_oferta': 1, 'p_precio_oferta': 90,
+            'stock': [{'s_cantidad': 1, 's_ilimitado': 0, 's_precio': 101}],
+        }, self.relojes)
+        self.assertEqual(data['precio'], Decimal('260.00'))
+        self.assertEqual(data['precio_oferta'], Decimal('140.00'))
+
+    def test_reset_all_prices_uses_rules(self):
+        reloj = crear_producto(self.relojes, '100')
+        correa = crear_producto(self.correas, '100')
+        admin = User.objects.create_user(
+            username=fake.unique.user_name(), email=fake.unique.email(), password='x', role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        response = client.post(reverse('product-reset-all-prices'))
+        self.assertEqual(response.data['actualizados'], 2)
+        self.assertEqual(Product.objects.get(pk=reloj.id).precio, Decimal('250.00'))
+        self.assertEqual(Product.objects.get(pk=correa.id).precio, Decimal('180.00'))
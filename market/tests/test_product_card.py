@@ -0,0 +1,59 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from market.models import Category, Product
+from faker import Faker
+
+fake = Faker()
+
+CARD_KEYS = {'id', 'nombre', 'slug', 'precio_final', 'imagen_principal', 'disponible', 'categoria'}
+
+
+class TestProductCardView(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.oferta = Product.objects.create(
+            nombre='Reloj en oferta', descripcion=fake.text(), precio=1000, stock_proveedor=3,
+            en_oferta=True, precio_oferta_proveedor=300, imagenes=['a.jpg', 'b.jpg'], categoria=self.category
+        )
+        self.agotado = Product.objects.create(
+            nombre='Reloj agotado', descripcion=fake.text(), precio=500, stock_proveedor=1,
+            stock_vendido=1, categoria=self.category
+        )
+
+    def _cards(self, **params):
+        response = self.client.get(reverse('product-list'), {'view': 'card', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_card_matches_full_serializer_values(self):
+        completos = {p['id']: p for p in self.client.get(reverse('product-list')).data}
+        for card in self._cards():
+            self.assertEqual(set(card), CARD_KEYS)
+            completo = completos[card['id']]
+            for campo in ('nombre', 'slug', 'precio_final', 'imagen_principal', 'disponible', 'categoria'):
+                self.assertEqual(card[campo], completo[campo], campo)
+
+    def test_derived_fields(self):
+        cards = {c['id']: c for c in self._cards()}
+        self.assertEqual(cards[self.oferta.id]['precio_final'], 600)
+        self.assertEqual(cards[self.oferta.id]['imagen_principal'], 'a.jpg')
+        self.assertFalse(cards[self.agotado.id]['disponible'])
+        self.assertIsNone(cards[self.agotado.id]['imagen_principal'])
+
+    def test_card_view_is_a_single_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self._cards()
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_card_view_supports_keyset_pagination(self):
+        pagina = self._cards(page_size=1, ordering='precio')
+        self.assertEqual([c['id'] for c in pagina['results']], [self.agotado.id])
+        siguiente = self.client.get(pagina['next']).data
+        self.assertEqual([c['id'] for c in siguiente['results']], [self.oferta.id])
+
+    def test_card_view_supports_filters_and_search(self):
+        self.assertEqual([c['id'] for c in self._cards(precio_min=800)], [self.oferta.id])
+        self.assertEqual([c['id'] for c in self._cards(nombre='oferta')], [self.oferta.id])
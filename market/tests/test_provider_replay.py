@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from django.test import TestCase, override_settings
+from market.models import Product, SyncRun
+from market import provider_replay, scraper
+from .test_scraper import FakeProviderSession, fake_product
+
+HOME = '<html><head><meta name="csrf-token" content="abc123"></head></html>'
+
+
+class RespuestaTexto:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class SesionProveedorTexto(FakeProviderSession):
+    """FakeProviderSession con el cuerpo como texto, como requests.Response"""
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        if params is None:
+            return RespuestaTexto(200, HOME)
+        return RespuestaTexto(200, json.dumps(super().get(url, params).json()))
+
+
+class TestProviderReplay(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.archivo = os.path.join(directorio.name, 'proveedor.jsonl.gz')
+        self.ids = scraper.CATEGORIAS_CONFIG['relojes']['ids']
+        self.relojes = [fake_product(1000 + i, nombre=f'Reloj ñandú {i}') for i in range(15)]
+
+    def grabar(self):
+        sesion = provider_replay.SesionGrabadora(
+            SesionProveedorTexto({tuple(self.ids): self.relojes}, delay=0), self.archivo
+        )
+        sesion.get(scraper.BASE_URL)
+        return scraper.scrape_category(sesion, 'abc123', self.ids, 'Relojes')
+
+    def test_record_and_replay(self):
+        self.assertEqual(len(self.grabar()), 15)
+        with override_settings(SCRAPER_TRANSPORT='replay', SCRAPER_FIXTURE=self.archivo):
+            session, csrf_token = scraper.get_session_and_csrf()
+        self.assertIsInstance(session, provider_replay.SesionReproductora)
+        self.assertEqual(csrf_token, 'abc123')
+        client = scraper.ProviderClient(session, csrf_token, max_concurrency=3)
+        self.assertEqual(client.rate_limiter.interval, 0)
+        productos = scraper.scrape_category(session, csrf_token, self.ids, 'Relojes', client)
+        self.assertEqual(productos, self.relojes)
+
+    def test_missing_requests(self):
+        self.grabar()
+        session = provider_replay.SesionReproductora(self.archivo)
+        respuesta = session.get(scraper.ENDPOINT_AJAX, params={'filter_page': 99, 'filter_order': 0, 'filter_categories[]': self.ids})
+        self.assertEqual(respuesta.json(), {'data': []})
+        self.assertEqual(session.get(f'{scraper.BASE_URL}/otra').status_code, 404)
+        self.assertEqual(len(session.faltantes), 2)
+
+    def test_synthetic_fixture(self):
+        por_categoria = provider_replay.generar_fixture(self.archivo, productos=50, semilla=3)
+        self.assertEqual(sum(por_categoria.values()), 50)
+        self.assertEqual(por_categoria['Relojes'], 17)
+        with open(self.archivo, 'rb') as archivo:
+            contenido = archivo.read()
+        provider_replay.generar_fixture(self.archivo, productos=50, semilla=3)
+        with open(self.archivo, 'rb') as archivo:
+            self.assertEqual(archivo.read(), contenido)
+
+        with override_settings(SCRAPER_TRANSPORT='replay', SCRAPER_FIXTURE=self.archivo):
+            resultado = scraper.sync_external_products()
+        self.assertTrue(resultado['success'])
+        self.assertEqual((resultado['nuevos'], resultado['productos']), (50, 50))
+        self.assertEqual(Product.objects.filter(categoria__nombre='Relojes').count(), 17)
+        self.assertEqual(SyncRun.objects.get().etapas['parse']['cantidad'], 50)
+
+    def test_synthetic_fixture_from_recording(self):
+        self.grabar()
+        destino = self.archivo.replace('proveedor', 'grande')
+        provider_replay.generar_fixture(destino, productos=30, base=self.archivo)
+        plantillas = provider_replay.plantillas_de(destino)
+        self.assertEqual(len(plantillas), 30)
+        self.assertEqual(len({p['idProductos'] for p in plantillas}), 30)
+        self.assertTrue(all(p['p_nombre'].startswith('Reloj ñandú') for p in plantillas))
+
+    @override_settings(SCRAPER_TRANSPORT='offline')
+    def test_unknown_transport(self):
+        with self.assertRaises(ValueError):
+            scraper.build_session()
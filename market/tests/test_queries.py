@@ -0,0 +1,136 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from market.models import *
+from account_admin.models import User
+from faker import Faker
+
+fake = Faker()
+
+class QueryCountTestCase(APITestCase):
+    """
+    Arnés de regresión N+1: mide las consultas de un endpoint con pocos
+    registros, siembra más y exige que la cantidad de consultas no cambie.
+    """
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, seed, extra=5):
+        antes = self.count_queries(url)
+        seed(extra)
+        despues = self.count_queries(url)
+        self.assertEqual(
+            antes, despues,
+            f'{url}: {antes} consultas con pocos registros y {despues} al sembrar {extra} más'
+        )
+
+
+class TestCatalogQueryCount(QueryCountTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username=fake.unique.user_name(),
+            email=fake.unique.email(),
+            password='testpass123',
+            role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.order = Order.objects.create(usuario=self.user, estado='pendiente')
+        self.seed_products(2)
+
+    def seed_products(self, n):
+        for _ in range(n):
+            categoria = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+            producto = Product.objects.create(
+                nombre=fake.word(),
+                descripcion=fake.text(),
+                precio=fake.pydecimal(left_digits=4, right_digits=2, positive=True),
+                stock_proveedor=10,
+                categoria=categoria
+            )
+            Favorite.objects.create(user=self.user, product=producto)
+            OrderDetail.objects.create(pedido=self.order, producto=producto, cantidad=1)
+
+    def seed_orders(self, n):
+        producto = Product.objects.first()
+        for _ in range(n):
+            order = Order.objects.create(usuario=self.user, estado='pendiente')
+            OrderDetail.objects.create(pedido=order, producto=producto, cantidad=1)
+
+    def test_product_list_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('product-list'), self.seed_products)
+
+    def test_product_page_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('product-list') + '?page_size=50', self.seed_products)
+
+    def test_favorite_list_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('favorites-list'), self.seed_products)
+
+    def test_order_detail_products_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('order-detail', kwargs={'pk': self.order.id}), self.seed_products)
+
+    def test_order_list_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('order-list'), self.seed_orders)
+
+    def test_my_orders_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('order-my-orders'), self.seed_orders)
+
+
+class TestCartQueryCount(QueryCountTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username=fake.unique.user_name(),
+            email=fake.unique.email(),
+            password='testpass123',
+            role='client'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.cart = Cart.objects.create(usuario=self.user)
+        self.seed_items(2)
+
+    def seed_items(self, n):
+        for _ in range(n):
+            categoria = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+            producto = Product.objects.create(
+                nombre=fake.word(), descripcion=fake.text(), precio=100, stock_proveedor=10, categoria=categoria
+            )
+            CartItem.objects.create(carrito=self.cart, producto=producto, cantidad=2)
+
+    def test_cart_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('cart-list'), self.seed_items)
+
+    def test_cart_items_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('cartitem-list'), self.seed_items)
+
+    def test_cart_items_response_shape(self):
+        response = self.client.get(reverse('cartitem-list'))
+        self.assertEqual(set(response.data), {'items', 'total_items'})
+        self.assertEqual(response.data['total_items'], 2)
+
+    def test_add_to_cart_query_count_is_constant(self):
+        producto = Product.objects.first()
+
+        def agregar():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(reverse('product-add-to-cart', kwargs={'pk': producto.id}), {'cantidad': 1})
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        antes = agregar()
+        self.seed_items(5)
+        self.assertEqual(antes, agregar())
+
+    def test_cart_summary_is_computed_in_database(self):
+        response = self.client.get(reverse('cart-list'))
+        self.assertEqual(response.data['total'], 400.0)
+        self.assertEqual(response.data['cantidad_items'], 4)
+        self.assertEqual(len(response.data['items']), 2)
+        carrito = Cart.objects.con_resumen().get(pk=self.cart.pk)
+        self.assertEqual((carrito.total(), carrito.cantidad_items()), (400, 4))
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).total(), 400)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from market.models import SchedulerLease
+from Velorum import scheduler
+
+
+class TestSchedulerLease(TestCase):
+    def test_only_one_owner_holds_the_lease(self):
+        self.assertTrue(SchedulerLease.acquire('scheduler', 'web-1', 60))
+        self.assertFalse(SchedulerLease.acquire('scheduler', 'web-2', 60))
+        self.assertTrue(SchedulerLease.acquire('scheduler', 'web-1', 60))
+        self.assertEqual(SchedulerLease.objects.get().owner, 'web-1')
+
+    def test_expired_lease_can_be_taken_over(self):
+        SchedulerLease.objects.create(
+            nombre='scheduler', owner='caido', expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertTrue(SchedulerLease.acquire('scheduler', 'nuevo', 60))
+        self.assertEqual(SchedulerLease.objects.get().owner, 'nuevo')
+
+    def test_release_only_by_owner(self):
+        SchedulerLease.acquire('scheduler', 'web-1', 60)
+        SchedulerLease.release('scheduler', 'web-2')
+        self.assertTrue(SchedulerLease.objects.exists())
+        SchedulerLease.release('scheduler', 'web-1')
+        self.assertFalse(SchedulerLease.objects.exists())
+
+
+@override_settings(SCHEDULER_LEASE_SECONDS=60)
+class TestLeaderOnlyJobs(TestCase):
+    def setUp(self):
+        self.llamadas = []
+        self.job = scheduler.leader_only(self.sync)
+
+    def sync(self):
+        self.llamadas.append(1)
+        return {'message': 'ok'}
+
+    def test_leader_runs_job(self):
+        self.assertEqual(self.job(), {'message': 'ok'})
+        self.assertEqual(len(self.llamadas), 1)
+
+    def test_follower_skips_job(self):
+        SchedulerLease.acquire(scheduler.LEASE_NAME, 'otro-proceso', 60)
+        self.assertIsNone(self.job())
+        self.assertEqual(self.llamadas, [])
+
+    def test_web_process_does_not_autostart_scheduler(self):
+        self.assertFalse(scheduler.scheduler_started)
+
+    def test_configure_jobs_registers_sync_heartbeat_and_outbox(self):
+        class FakeScheduler:
+            def __init__(self):
+                self.jobs = []
+
+            def add_job(self, **kwargs):
+                self.jobs.append(kwargs['id'])
+
+        fake = FakeScheduler()
+        scheduler.configure_jobs(fake)
+        self.assertEqual(
+            sorted(fake.jobs),
+            ['drain_telegram_outbox', 'process_mp_events', 'scheduler_heartbeat', 'sync_external_products']
+        )
+
+    def test_run_once_command_skips_when_not_leader(self):
+        from django.core.management import call_command
+        SchedulerLease.acquire(scheduler.LEASE_NAME, 'otro-proceso', 60)
+        with patch('market.scraper.sync_external_products', self.job):
+            call_command('run_scheduler', '--once', stdout=StringIO())
+        self.assertEqual(self.llamadas, [])
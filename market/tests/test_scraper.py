@@ -0,0 +1,220 @@
+import threading
+import time
+from unittest.mock import patch
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from market.models import Category, Product
+from market import scraper
+
+
+def fake_product(external_id, nombre=None, precio=1000, cantidad=5):
+    return {
+        'idProductos': external_id,
+        'p_nombre': nombre or f'Producto {external_id}',
+        'p_descripcion': 'Descripción',
+        'p_precio': precio,
+        'p_link': f'producto-{external_id}',
+        'stock': [{'s_cantidad': cantidad, 's_ilimitado': 0, 's_precio': precio}],
+        'imagenes': [{'i_link': f'img/{external_id}.jpg'}],
+    }
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self):
+        return {'data': self.data}
+
+
+class FakeProviderSession:
+    """Sesión falsa: sirve páginas de 12 productos por categoría y mide la concurrencia"""
+
+    def __init__(self, productos_por_categoria, delay=0.01):
+        self.productos = productos_por_categoria
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.calls.append(params)
+        try:
+            time.sleep(self.delay)
+            ids = tuple(params['filter_categories[]'])
+            page = params['filter_page']
+            productos = self.productos.get(ids, [])
+            return FakeResponse(productos[page * 12:(page + 1) * 12])
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@override_settings(SCRAPER_MAX_CONCURRENCY=3, SCRAPER_REQUESTS_PER_SECOND=0)
+class TestConcurrentScraper(TestCase):
+    def setUp(self):
+        ids = tuple(scraper.CATEGORIAS_CONFIG['relojes']['ids'])
+        self.relojes = [fake_product(1000 + i) for i in range(29)]
+        self.session = FakeProviderSession({ids: self.relojes})
+
+    def test_scrape_category_collects_all_pages_in_order(self):
+        productos = scraper.scrape_category(
+            self.session, 'token', scraper.CATEGORIAS_CONFIG['relojes']['ids'], 'Relojes'
+        )
+        self.assertEqual([p['idProductos'] for p in productos], [p['idProductos'] for p in self.relojes])
+
+    def test_concurrency_is_bounded(self):
+        client = scraper.ProviderClient(self.session, 'token', max_concurrency=2)
+        scraper.scrape_category(self.session, 'token', scraper.CATEGORIAS_CONFIG['relojes']['ids'], 'Relojes', client)
+        self.assertLessEqual(self.session.max_in_flight, 2)
+        self.assertGreater(self.session.max_in_flight, 1)
+
+    def test_rate_limiter_spaces_requests_per_host(self):
+        limiter = scraper.RateLimiter(requests_per_second=50)
+        inicio = time.monotonic()
+        for _ in range(6):
+            limiter.wait('https://proveedor.test/x')
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.09)
+
+    def test_build_session_retries_with_backoff(self):
+        session = scraper.build_session()
+        retries = session.get_adapter('https://proveedor.test').max_retries
+        self.assertIn(429, retries.status_forcelist)
+        self.assertGreater(retries.backoff_factor, 0)
+
+    def test_sync_reports_page_timings(self):
+        with patch('market.scraper.get_session_and_csrf', return_value=(self.session, 'token')):
+            resultado = scraper.sync_external_products()
+        self.assertTrue(resultado['success'])
+        self.assertEqual(resultado['nuevos'], 29)
+        self.assertEqual(Product.objects.filter(categoria__nombre='Relojes').count(), 29)
+        self.assertTrue(Category.objects.filter(nombre='Smartwatch').exists())
+        paginas_relojes = [p for p in resultado['paginas'] if p['categoria'] == 'Relojes']
+        self.assertEqual([p['productos'] for p in paginas_relojes][:3], [12, 12, 5])
+        self.assertTrue(all('segundos' in p for p in resultado['paginas']))
+
+
+class TestBulkPersistence(TestCase):
+    def setUp(self):
+        self.categoria = Category.objects.create(nombre='Relojes', descripcion='Categoría Relojes')
+
+    def test_creates_and_updates_in_bulk(self):
+        existente = Product.objects.create(
+            nombre='Viejo', descripcion='x', precio=10, external_id='1', categoria=self.categoria
+        )
+        resultado = scraper.persist_products([fake_product(1, 'Nuevo nombre'), fake_product(2)], self.categoria)
+        self.assertEqual(len(resultado['nuevos']), 1)
+        self.assertEqual(len(resultado['actualizados']), 1)
+        existente.refresh_from_db()
+        self.assertEqual(existente.nombre, 'Nuevo nombre')
+        self.assertEqual(existente.precio, 2000)
+        self.assertIsNotNone(existente.last_sync)
+        nuevo = Product.objects.get(external_id='2')
+        self.assertEqual(nuevo.slug, 'producto-2')
+        self.assertIn('product', nuevo.search_document)
+
+    def test_keeps_manual_price(self):
+        Product.objects.create(
+            nombre='Manual', descripcion='x', precio=1234, precio_manual=True,
+            external_id='1', categoria=self.categoria
+        )
+        scraper.persist_products([fake_product(1, precio=5000)], self.categoria)
+        producto = Product.objects.get(external_id='1')
+        self.assertEqual(producto.precio, 1234)
+        self.assertEqual(producto.precio_proveedor, 5000)
+
+    def test_new_slugs_avoid_collisions(self):
+        Product.objects.create(nombre='Reloj', descripcion='x', precio=1, categoria=self.categoria)
+        scraper.persist_products([fake_product(1, 'Reloj'), fake_product(2, 'Reloj')], self.categoria)
+        slugs = set(Product.objects.values_list('slug', flat=True))
+        self.assertEqual(slugs, {'reloj', 'reloj-1', 'reloj-2'})
+
+    def _count_sync_queries(self, n):
+        productos = [fake_product(i) for i in range(n)]
+        scraper.persist_products(productos, self.categoria)
+        with CaptureQueriesContext(connection) as ctx:
+            scraper.persist_products(productos, self.categoria)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_products(self):
+        self.assertEqual(self._count_sync_queries(3), self._count_sync_queries(30))
+
+    def test_invalid_product_is_reported_and_skipped(self):
+        resultado = scraper.persist_products([{'p_nombre': 'roto'}, fake_product(1)], self.categoria)
+        self.assertEqual(len(resultado['errores']), 1)
+        self.assertEqual(len(resultado['nuevos']), 1)
+
+    def test_unchanged_products_are_not_rewritten(self):
+        productos = [fake_product(1), fake_product(2)]
+        scraper.persist_products(productos, self.categoria)
+        Product.objects.filter(external_id='1').update(nombre='Editado localmente', last_sync=None)
+
+        resultado = scraper.persist_products(productos, self.categoria)
+
+        self.assertEqual(resultado['nuevos'], [])
+        self.assertEqual(resultado['actualizados'], [])
+        self.assertEqual(sorted(resultado['sin_cambios']), ['1', '2'])
+        producto = Product.objects.get(external_id='1')
+        self.assertEqual(producto.nombre, 'Editado localmente')
+        self.assertIsNotNone(producto.last_sync)
+
+    def test_changed_provider_data_is_rewritten(self):
+        scraper.persist_products([fake_product(1), fake_product(2)], self.categoria)
+        resultado = scraper.persist_products([fake_product(1, precio=1500), fake_product(2)], self.categoria)
+        self.assertEqual([p.external_id for p in resultado['actualizados']], ['1'])
+        self.assertEqual(resultado['sin_cambios'], ['2'])
+        self.assertEqual(Product.objects.get(external_id='1').precio_proveedor, 1500)
+
+    def test_fingerprint_ignores_key_order(self):
+        producto = fake_product(1)
+        invertido = dict(reversed(list(producto.items())))
+        self.assertEqual(
+            scraper.product_fingerprint(producto, self.categoria),
+            scraper.product_fingerprint(invertido, self.categoria)
+        )
+
+
+class TestStreamingSync(TestCase):
+    def setUp(self):
+        self.categoria = Category.objects.create(nombre='Relojes', descripcion='Categoría Relojes')
+        self.config = scraper.CATEGORIAS_CONFIG['relojes']
+        self.relojes = [fake_product(1000 + i, nombre='Reloj') for i in range(29)]
+        self.session = FakeProviderSession({tuple(self.config['ids']): self.relojes}, delay=0)
+
+    def test_compact_record_matches_provider_json(self):
+        producto = fake_product(7)
+        registro = scraper.ProductoProveedor(producto, self.categoria)
+        self.assertFalse(hasattr(registro, '__dict__'))
+        self.assertEqual(registro.sync_hash, scraper.product_fingerprint(producto, self.categoria))
+        self.assertEqual(registro.campos(self.categoria), scraper.normalize_product_data(producto, self.categoria))
+
+    def test_pages_are_consumed_incrementally(self):
+        client = scraper.ProviderClient(self.session, 'token', max_concurrency=2)
+        registros = scraper.stream_category(client, self.config, self.categoria, [])
+        primero = next(registros)
+        self.assertIsInstance(primero, scraper.ProductoProveedor)
+        self.assertEqual(primero.external_id, '1000')
+        # Solo la primera ventana: la tercera página todavía no se pidió
+        self.assertLessEqual(len(self.session.calls), 2)
+        self.assertEqual(len(list(registros)), 28)
+        self.assertEqual(len(self.session.calls), 4)
+
+    @override_settings(SCRAPER_BULK_BATCH_SIZE=10)
+    def test_persists_in_batches(self):
+        client = scraper.ProviderClient(self.session, 'token', max_concurrency=2)
+        errores = []
+        registros = scraper.stream_category(client, self.config, self.categoria, errores)
+        with patch('market.scraper.persist_products', wraps=scraper.persist_products) as persist:
+            resultado = scraper.persist_stream(registros, self.categoria, client.etapas)
+        self.assertEqual([len(llamada.args[0]) for llamada in persist.call_args_list], [10, 10, 9])
+        self.assertEqual((resultado['productos'], resultado['nuevos']), (29, 29))
+        self.assertEqual(errores, [])
+        # Mismo nombre en todos los lotes: los slugs siguen siendo únicos
+        self.assertEqual(Product.objects.filter(slug__startswith='reloj').values('slug').distinct().count(), 29)
+        self.assertEqual(client.etapas.exportar()['parse']['cantidad'], 29)
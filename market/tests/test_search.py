@@ -0,0 +1,97 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from market.models import Category, Product
+from django.db import connection
+from market.search import FTS_TABLE, build_search_document, fts_disponible, normalizar, search_products, stem
+from faker import Faker
+
+fake = Faker()
+
+class TestSearchNormalization(TestCase):
+    def test_normalizar_removes_accents_and_html(self):
+        self.assertEqual(normalizar('<p>Reloj <b>Clásico</b> ÑANDÚ</p>'), 'reloj clasico nandu')
+
+    def test_stem_plural_and_gender(self):
+        self.assertEqual(stem('relojes'), 'reloj')
+        self.assertEqual(stem('negras'), stem('negro'))
+        self.assertEqual(stem('luces'), 'luz')
+
+    def test_mysql_uses_fulltext_index(self):
+        with patch.object(connection, 'vendor', 'mysql'):
+            sql, params = search_products(Product.objects.all(), 'relojes xl').query.sql_with_params()
+        self.assertIn('MATCH(', sql)
+        self.assertIn('IN BOOLEAN MODE', sql)
+        self.assertIn('+reloj*', params)  # "xl" es más corto que el token mínimo de InnoDB
+        self.assertIn('%xl%', params)
+
+    def test_document_repeats_name_terms(self):
+        documento = build_search_document('Reloj Casio', 'de acero')
+        self.assertEqual(documento.split().count('reloj'), 2)
+        self.assertNotIn(' de ', f' {documento} ')
+
+
+class TestProductSearch(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(nombre=fake.unique.word(), descripcion=fake.text())
+        self.clasico = self._product('Reloj Clásico Dorado', 'Malla de cuero')
+        self.deportivo = self._product('Smartwatch Deportivo', 'Ideal para relojes de running')
+        self.otro = self._product('Billetera', 'Cuero negro')
+
+    def _product(self, nombre, descripcion):
+        return Product.objects.create(
+            nombre=nombre, descripcion=descripcion, precio=1000, stock_proveedor=1, categoria=self.category
+        )
+
+    def _search(self, texto):
+        response = self.client.get(reverse('product-list'), {'nombre': texto})
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in response.data]
+
+    def test_accent_insensitive(self):
+        self.assertEqual(self._search('clasico'), [self.clasico.id])
+
+    def test_prefix_matching(self):
+        self.assertIn(self.clasico.id, self._search('relo'))
+
+    def test_plural_matches_singular(self):
+        self.assertIn(self.clasico.id, self._search('relojes'))
+
+    def test_all_terms_required(self):
+        self.assertEqual(self._search('cuero negro'), [self.otro.id])
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self._search('reloj'), [self.clasico.id, self.deportivo.id])
+
+    def test_index_follows_save_and_delete(self):
+        self.otro.nombre = 'Pulsera'
+        self.otro.save()
+        self.assertEqual(self._search('billetera'), [])
+        self.assertEqual(self._search('pulsera'), [self.otro.id])
+        self.otro.delete()
+        self.assertEqual(self._search('pulsera'), [])
+
+    def _fts_rowids(self):
+        if not fts_disponible():
+            self.skipTest('Sin FTS5')
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {FTS_TABLE}')
+            return sorted(fila[0] for fila in cursor.fetchall())
+
+    def test_queryset_delete_unindexes(self):
+        Product.objects.filter(pk=self.otro.pk).delete()
+        self.assertEqual(self._fts_rowids(), sorted([self.clasico.id, self.deportivo.id]))
+
+    def test_category_cascade_unindexes(self):
+        otra = Category.objects.create(nombre=fake.unique.word())
+        suelto = Product.objects.create(nombre='Anillo', descripcion='Plata', precio=1, categoria=otra)
+        Category.objects.filter(pk=self.category.pk).delete()
+        self.assertEqual(self._fts_rowids(), [suelto.id])
+        otra.delete()
+        self.assertEqual(self._fts_rowids(), [])
+
+    def test_stopwords_only_falls_back_to_icontains(self):
+        queryset = search_products(Product.objects.all(), 'de')
+        self.assertEqual(list(queryset), [self.deportivo])
@@ -0,0 +1,96 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from account_admin.models import User
+from market.models import Category, Product, SyncRun
+from market import scraper
+from market.catalog_cache import catalog_generation
+from .test_scraper import FakeProviderSession, fake_product
+
+
+class TestSyncRuns(TestCase):
+    def setUp(self):
+        ids = tuple(scraper.CATEGORIAS_CONFIG['relojes']['ids'])
+        self.session = FakeProviderSession({ids: [fake_product(1000 + i) for i in range(15)]}, delay=0)
+        self.admin = User.objects.create_user(
+            username='admin-sync', email='admin-sync@test.local', password='x', role='admin', is_staff=True
+        )
+
+    def sincronizar(self, **kwargs):
+        with patch('market.scraper.get_session_and_csrf', return_value=(self.session, 'token')):
+            return scraper.sync_external_products(**kwargs)
+
+    def test_records_stages(self):
+        resultado = self.sincronizar()
+        run = SyncRun.objects.get(pk=resultado['sync_run_id'])
+        self.assertEqual(run.estado, 'ok')
+        self.assertEqual(run.origen, 'scheduler')
+        self.assertIsNotNone(run.finalizado)
+        self.assertEqual((run.nuevos, run.productos), (15, 15))
+        # Una ventana de páginas (SCRAPER_MAX_CONCURRENCY) por categoría
+        self.assertEqual(run.paginas, 3 * scraper.ProviderClient(None, 'token').max_concurrency)
+        self.assertEqual(list(run.etapas), SyncRun.ETAPAS)
+        self.assertEqual(run.etapas['sesion']['cantidad'], 1)
+        self.assertEqual(run.etapas['fetch']['cantidad'], run.paginas)
+        self.assertEqual(run.etapas['parse']['cantidad'], 15)
+        self.assertEqual(run.etapas['persist']['cantidad'], 15)
+        self.assertEqual(run.etapas['deactivate']['cantidad'], 0)
+        self.assertEqual(resultado['etapas'], run.etapas)
+
+        # Segunda corrida: nada que escribir, y un producto desaparecido se desactiva
+        Product.objects.create(
+            nombre='Viejo', descripcion='x', precio=1, external_id='999',
+            categoria=Category.objects.get(nombre='Relojes'),
+        )
+        run = SyncRun.objects.get(pk=self.sincronizar()['sync_run_id'])
+        self.assertEqual((run.sin_cambios, run.desactivados), (15, 1))
+        self.assertEqual(run.etapas['diff']['cantidad'], 15)
+        self.assertEqual(run.etapas['persist']['cantidad'], 0)
+        self.assertEqual(run.etapas['deactivate']['cantidad'], 1)
+
+        # Los ya desactivados no se vuelven a contar ni a escribir: el cache del catálogo sigue valiendo
+        generacion = catalog_generation()
+        run = SyncRun.objects.get(pk=self.sincronizar()['sync_run_id'])
+        self.assertEqual((run.sin_cambios, run.desactivados), (15, 0))
+        self.assertEqual(catalog_generation(), generacion)
+
+    def test_session_failure_is_recorded(self):
+        with patch('market.scraper.get_session_and_csrf', return_value=(None, None)):
+            resultado = scraper.sync_external_products()
+        self.assertFalse(resultado['success'])
+        run = SyncRun.objects.get()
+        self.assertEqual(run.estado, 'error')
+        self.assertEqual(run.errores, ['No se pudo establecer sesión con el proveedor'])
+        self.assertEqual(list(run.etapas), ['sesion'])
+
+    def test_unexpected_error_is_recorded(self):
+        with patch('market.scraper._sincronizar', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                scraper.sync_external_products()
+        run = SyncRun.objects.get()
+        self.assertEqual((run.estado, run.errores), ('error', ['boom']))
+
+    def test_manual_sync_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        with patch('market.scraper.get_session_and_csrf', return_value=(self.session, 'token')):
+            response = client.post(reverse('manual-sync-products'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('fetch', response.data['etapas'])
+
+        self.sincronizar()
+        response = client.get(reverse('manual-sync-products'), {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['origen'], 'scheduler')
+
+        response = client.get(reverse('manual-sync-products'))
+        self.assertEqual([r['origen'] for r in response.data], ['scheduler', 'manual'])
+        self.assertEqual(response.data[1]['usuario'], 'admin-sync')
+
+    def test_history_requires_staff(self):
+        cliente = User.objects.create_user(username='cliente-sync', email='c@test.local', password='x')
+        client = APIClient()
+        client.force_authenticate(user=cliente)
+        self.assertEqual(client.get(reverse('manual-sync-products')).status_code, 403)
@@ -0,0 +1,197 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from market.models import Order, TelegramOutbox
+from market.telegram import (
+    DIGEST_SEPARATOR, MAX_MESSAGE_LENGTH, TelegramClient, drain_outbox, send_order_paid_notification,
+)
+
+
+class TelegramStub:
+    """Bot API local: registra los mensajes y responde lo que se encole en `respuestas`"""
+
+    def __init__(self):
+        self.mensajes = []
+        self.respuestas = []
+        self.conexiones = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, para ver el pool de conexiones
+
+            def do_POST(self):
+                largo = int(self.headers.get('Content-Length', 0))
+                stub.mensajes.append(json.loads(self.rfile.read(largo)))
+                stub.conexiones.add(self.client_address)
+                status, cuerpo = stub.respuestas.pop(0) if stub.respuestas else (200, {'ok': True})
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(
+    TELEGRAM_BOT_TOKEN='token', TELEGRAM_CHAT_ID='chat', TELEGRAM_DIGEST_MAX=5,
+    TELEGRAM_MAX_INTENTOS=3, TELEGRAM_BACKOFF_SECONDS=30,
+)
+class TestTelegramOutbox(TestCase):
+    def setUp(self):
+        self.stub = TelegramStub()
+        self.addCleanup(self.stub.close)
+        self.client = TelegramClient(api_url=self.stub.url)
+        self.addCleanup(self.client.close)
+
+    def encolar(self, cantidad):
+        pedidos = [Order.objects.create(direccion_envio='Calle Falsa 123, Springfield, BA', total=100) for _ in range(cantidad)]
+        return [send_order_paid_notification(pedido) for pedido in pedidos]
+
+    def test_notification_is_queued_not_sent(self):
+        mensaje = self.encolar(1)[0]
+        self.assertEqual(mensaje.estado, 'pendiente')
+        self.assertIn(f'Pedido: #{mensaje.pedido_id}', mensaje.texto)
+        self.assertEqual(self.stub.mensajes, [])
+
+    @override_settings(TELEGRAM_BOT_TOKEN=None)
+    def test_not_queued_without_credentials(self):
+        self.assertIsNone(send_order_paid_notification(Order.objects.create(total=1)))
+        self.assertFalse(TelegramOutbox.objects.exists())
+
+    def test_drain_sends_and_marks_sent(self):
+        self.encolar(1)
+        resultado = drain_outbox(self.client)
+        self.assertEqual(resultado['mensajes'], 1)
+        self.assertEqual(len(self.stub.mensajes), 1)
+        self.assertEqual(self.stub.mensajes[0]['chat_id'], 'chat')
+        self.assertEqual(TelegramOutbox.objects.get().estado, 'enviado')
+        self.assertEqual(drain_outbox(self.client)['mensajes'], 0)
+
+    def test_pending_messages_are_batched_into_digests(self):
+        self.encolar(7)
+        resultado = drain_outbox(self.client)
+        self.assertEqual(resultado, {'enviados': 2, 'mensajes': 7, 'reintentos': 0, 'fallidos': 0})
+        self.assertTrue(self.stub.mensajes[0]['text'].startswith('🧾 5 pedidos confirmados'))
+        self.assertTrue(self.stub.mensajes[1]['text'].startswith('🧾 2 pedidos confirmados'))
+        # Una sola conexión HTTP reutilizada para todos los envíos
+        self.assertEqual(len(self.stub.conexiones), 1)
+
+    def test_digest_respects_message_limit(self):
+        for mensaje in self.encolar(3):
+            mensaje.texto = 'x' * 2000
+            mensaje.save()
+        self.assertEqual(drain_outbox(self.client)['enviados'], 2)
+        self.assertTrue(all(len(m['text']) <= MAX_MESSAGE_LENGTH for m in self.stub.mensajes))
+
+    def test_digest_near_limit_is_never_truncated(self):
+        # Los textos y su separador suman 4090 (< 4096), pero con el encabezado no entran
+        mensajes = self.encolar(3)
+        largo = (MAX_MESSAGE_LENGTH - 6 - len(DIGEST_SEPARATOR)) // 2
+        for numero, mensaje in enumerate(mensajes[:2]):
+            mensaje.texto = 'x' * (largo - 4) + f'FIN{numero}'
+            mensaje.save()
+        mensajes[2].texto = 'corto FIN2'
+        mensajes[2].save()
+
+        self.assertEqual(drain_outbox(self.client)['mensajes'], 3)
+        textos = [m['text'] for m in self.stub.mensajes]
+        self.assertTrue(all(len(texto) <= MAX_MESSAGE_LENGTH for texto in textos))
+        for numero in range(3):
+            self.assertEqual(sum(texto.count(f'FIN{numero}') for texto in textos), 1)
+        self.assertEqual(set(TelegramOutbox.objects.values_list('estado', flat=True)), {'enviado'})
+
+    def test_digest_fills_up_to_limit_with_header(self):
+        mensajes = self.encolar(2)
+        disponible = MAX_MESSAGE_LENGTH - len('🧾 2 pedidos confirmados') - 2 * len(DIGEST_SEPARATOR)
+        mensajes[0].texto = 'a' * (disponible // 2)
+        mensajes[1].texto = 'b' * (disponible - disponible // 2)
+        for mensaje in mensajes:
+            mensaje.save()
+        self.assertEqual(drain_outbox(self.client)['enviados'], 1)
+        self.assertEqual(len(self.stub.mensajes[0]['text']), MAX_MESSAGE_LENGTH)
+        self.assertTrue(self.stub.mensajes[0]['text'].endswith('b'))
+
+    def test_rate_limit_postpones_queue(self):
+        self.encolar(2)
+        self.stub.respuestas.append((429, {'ok': False, 'parameters': {'retry_after': 40}}))
+        with override_settings(TELEGRAM_DIGEST_MAX=1):
+            resultado = drain_outbox(self.client)
+        self.assertEqual(resultado['enviados'], 0)
+        self.assertEqual(len(self.stub.mensajes), 1)  # no insiste durante el rate limit
+        for mensaje in TelegramOutbox.objects.all():
+            self.assertEqual(mensaje.estado, 'pendiente')
+            self.assertEqual(mensaje.intentos, 0)
+            self.assertGreater(mensaje.proximo_intento, timezone.now() + timedelta(seconds=30))
+        self.assertEqual(drain_outbox(self.client)['mensajes'], 0)
+
+    def test_server_error_retries_with_backoff_then_fails(self):
+        self.encolar(1)
+        for intento in range(1, 4):
+            self.stub.respuestas.append((502, {'ok': False}))
+            TelegramOutbox.objects.update(proximo_intento=timezone.now())
+            drain_outbox(self.client)
+            mensaje = TelegramOutbox.objects.get()
+            self.assertEqual(mensaje.intentos, intento)
+        self.assertEqual(mensaje.estado, 'fallido')
+        self.assertIn('502', mensaje.ultimo_error)
+
+    def test_backoff_grows(self):
+        self.encolar(1)
+        self.stub.respuestas.append((500, {'ok': False}))
+        antes = timezone.now()
+        drain_outbox(self.client)
+        espera = TelegramOutbox.objects.get().proximo_intento - antes
+        self.assertGreaterEqual(espera, timedelta(seconds=29))
+        self.assertLess(espera, timedelta(seconds=60))
+
+    def test_client_error_is_not_retried(self):
+        self.encolar(1)
+        self.stub.respuestas.append((400, {'ok': False, 'description': 'chat not found'}))
+        self.assertEqual(drain_outbox(self.client)['fallidos'], 1)
+        self.assertEqual(TelegramOutbox.objects.get().estado, 'fallido')
+
+    def test_rejected_digest_is_resent_one_by_one(self):
+        mensajes = self.encolar(3)
+        self.stub.respuestas += [
+            (400, {'ok': False, 'description': "can't parse entities"}),
+            (200, {'ok': True}),
+            (400, {'ok': False, 'description': "can't parse entities"}),
+        ]
+        resultado = drain_outbox(self.client)
+        self.assertEqual(resultado, {'enviados': 2, 'mensajes': 2, 'reintentos': 0, 'fallidos': 1})
+        self.assertEqual(len(self.stub.mensajes), 4)
+        estados = dict(TelegramOutbox.objects.values_list('id', 'estado'))
+        self.assertEqual(
+            [estados[m.pk] for m in mensajes], ['enviado', 'fallido', 'enviado']
+        )
+
+    def test_customer_data_is_html_escaped(self):
+        pedido = Order.objects.create(
+            nombre_invitado='<b>Ana</b>', apellido_invitado='Smith & Co',
+            direccion_envio='Calle <Falsa> 123, Springfield, BA', total=100,
+        )
+        texto = send_order_paid_notification(pedido).texto
+        self.assertIn('&lt;b&gt;Ana&lt;/b&gt; Smith &amp; Co', texto)
+        self.assertIn('Calle &lt;Falsa&gt;', texto)
+        self.assertNotIn('<', texto)
+
+    def test_network_error_is_retried(self):
+        self.encolar(1)
+        caido = TelegramClient(api_url='http://127.0.0.1:9')
+        self.addCleanup(caido.close)
+        self.assertEqual(drain_outbox(caido)['reintentos'], 1)
+        self.assertEqual(TelegramOutbox.objects.get().estado, 'pendiente')
@@ -1,4 +1,7 @@
+from decimal import Decimal
 from django.shortcuts import render, get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import viewsets, status
 from .serializer import *
 from .models import *
@@ -9,15 +12,40 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from django.core.cache import cache
 from django.utils import timezone
-from .telegram import send_order_paid_notification
+from .pagination import ProductKeysetPagination
+from .search import search_products
+from .checkout import StockInsuficiente, crear_pedido
+from .catalog_cache import CatalogCacheMixin
+from .pricing import aplicar_reglas, markup_desde_porcentaje, normalizar_markup, repreciar, tabla_de_precios
 
 # Create your views here.
 
-class CategoryViewSet(viewsets.ModelViewSet):
+def _query_bool(valor):
+    """Interpreta un query param booleano (?disponible=true / 1 / si)"""
+    return valor.strip().lower() in ('true', '1', 'si', 'sí', 'yes')
+
+def _flag(request, nombre, default=False):
+    """Booleano del body (JSON o form) o de la query"""
+    valor = request.data.get(nombre, request.query_params.get(nombre))
+    if valor is None:
+        return default
+    if isinstance(valor, bool):
+        return valor
+    return _query_bool(str(valor))
+
+def _resumen_repricing(resultado):
+    """Previsualización de repricing con los montos como float (como el resto de la API)"""
+    return {
+        clave: float(valor) if isinstance(valor, Decimal) else valor
+        for clave, valor in resultado.items()
+    }
+
+class CategoryViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar las categorías de productos.
     - Administradores y operadores: acceso completo (CRUD)
     - Clientes: solo lectura (GET)
+    - list/retrieve se sirven desde el cache del catálogo (catalog_cache.py)
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer 
@@ -34,20 +62,23 @@ class CategoryViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar productos.
     - Administradores y operadores: acceso completo (CRUD) 
     - Clientes: solo lectura (GET)
+    - list/retrieve se sirven desde el cache del catálogo (catalog_cache.py)
     """
-    queryset = Product.objects.all()
+    queryset = Product.objects.for_catalog()
     serializer_class = ProductSerializer
     permission_classes = [ProductPermission]
     parser_classes = [JSONParser, MultiPartParser, FormParser]
+    # Paginación keyset opcional (?page_size=24&ordering=precio&cursor=...)
+    pagination_class = ProductKeysetPagination
     
     def get_queryset(self):
         """Permite filtrar productos por nombre, categoría o precio"""
-        queryset = Product.objects.all()
+        queryset = Product.objects.for_catalog()
         
         # Si el usuario no es admin/operator, ocultar productos desactivados
         user = self.request.user
@@ -59,16 +90,42 @@ class ProductViewSet(viewsets.ModelViewSet):
         precio_min = self.request.query_params.get('precio_min', None)
         precio_max = self.request.query_params.get('precio_max', None)
         
-        if nombre:
-            queryset = queryset.filter(nombre__icontains=nombre)
         if categoria:
             queryset = queryset.filter(categoria__id=categoria)
         if precio_min:
             queryset = queryset.filter(precio__gte=precio_min)
         if precio_max:
             queryset = queryset.filter(precio__lte=precio_max)
+        # Columnas generadas: se filtran y ordenan en la base con sus índices
+        disponible = self.request.query_params.get('disponible', None)
+        en_oferta = self.request.query_params.get('en_oferta', None)
+        if disponible:
+            queryset = queryset.filter(disponible=_query_bool(disponible))
+        if en_oferta:
+            queryset = queryset.filter(en_oferta=_query_bool(en_oferta))
+        # Búsqueda de texto completo sobre nombre y descripción (ordena por relevancia)
+        if nombre:
+            queryset = search_products(queryset, nombre)
+        # ?ordering=precio_final (o precio, nombre, id; con - para descendente).
+        # Con paginación keyset el paginador aplica la misma clave.
+        ordering = ProductKeysetPagination.orderings.get(self.request.query_params.get('ordering'))
+        if ordering:
+            queryset = queryset.order_by(*ordering)
             
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        """?view=card devuelve la proyección compacta para grillas"""
+        if request.query_params.get('view') == 'card':
+            return self._catalog_cached(self.card_list, request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
+
+    def card_list(self, request, *args, **kwargs):
+        queryset = ProductCardSerializer.project(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(ProductCardSerializer.many(page))
+        return Response(ProductCardSerializer.many(queryset))
         
     @action(detail=True, methods=['post'], permission_classes=[AddToCartPermission])
     def add_to_cart(self, request, pk=None):
@@ -119,10 +176,11 @@ class ProductViewSet(viewsets.ModelViewSet):
             mensaje = 'Producto agregado al carrito'
         
         # 7. Preparar respuesta con los datos del carrito actualizado
+        resumen = carrito.resumen()
         datos_carrito = {
             'mensaje': mensaje,
-            'total_items': carrito.cantidad_items(),
-            'total': float(carrito.total()),
+            'total_items': resumen['cantidad_items'],
+            'total': float(resumen['total']),
             'producto_agregado': {
                 'id': producto.id,
                 'nombre': producto.nombre,
@@ -135,23 +193,20 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'], permission_classes=[IsAdminOrOperator])
     def reset_all_prices(self, request):
-        """Resetea todos los precios de productos a precio_proveedor * 2"""
+        """
+        Resetea todos los precios de productos según las reglas de precios
+        (PricingRule) con un único UPDATE. Con {"dry_run": true} solo devuelve
+        la previsualización.
+        """
         try:
-            productos = Product.objects.all()
-            actualizados = 0
-            
-            for producto in productos:
-                if producto.precio_proveedor:
-                    nuevo_precio = producto.precio_proveedor * 2
-                    producto.precio = nuevo_precio
-                    producto.precio_manual = False
-                    producto.save()
-                    actualizados += 1
+            resultado = aplicar_reglas(dry_run=_flag(request, 'dry_run'))
+            if resultado['dry_run']:
+                return Response(_resumen_repricing(resultado), status=status.HTTP_200_OK)
             
             return Response({
                 'mensaje': f'Precios reseteados exitosamente',
-                'actualizados': actualizados,
-                'total': productos.count()
+                'actualizados': resultado['actualizados'],
+                'total': Product.objects.count()
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -161,7 +216,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'], permission_classes=[IsAdminOrOperator])
     def reset_price(self, request, pk=None):
-        """Resetea el precio de un producto específico a precio_proveedor * 2"""
+        """Resetea el precio de un producto específico según la regla de su categoría"""
         try:
             producto = self.get_object()
             
@@ -170,7 +225,8 @@ class ProductViewSet(viewsets.ModelViewSet):
                     'error': 'Este producto no tiene precio de proveedor definido'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            nuevo_precio = producto.precio_proveedor * 2
+            regla = tabla_de_precios().regla(producto.categoria_id)
+            nuevo_precio = regla.precio(producto.precio_proveedor)
             producto.precio = nuevo_precio
             producto.precio_manual = False
             producto.save()
@@ -239,8 +295,24 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if hasattr(user, 'role') and user.role in ['admin', 'operator']:
-            return Order.objects.all()
-        return Order.objects.filter(usuario=user)
+            return self._with_details(Order.objects.all())
+        return self._with_details(Order.objects.filter(usuario=user))
+
+    @staticmethod
+    def _with_details(queryset):
+        """
+        Precarga usuario y detalles (con producto y categoría) para que
+        serializar N órdenes cueste una cantidad fija de consultas.
+        """
+        detalles = OrderDetail.objects.select_related('producto__categoria').only(
+            'id', 'pedido_id', 'producto_id', 'cantidad', 'subtotal',
+            *ProductQuerySet.catalog_fields('producto__')
+        )
+        return queryset.select_related('usuario').prefetch_related(
+            'usuario__groups',
+            'usuario__user_permissions',
+            Prefetch('detalles', queryset=detalles),
+        )
     
     @action(detail=False, methods=['get'], url_path='my-orders', permission_classes=[IsAuthenticated])
     def my_orders(self, request):
@@ -249,7 +321,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         vea solo sus propios pedidos.
         """
         user = request.user
-        orders = Order.objects.filter(usuario=user).order_by('-fecha')
+        orders = self._with_details(Order.objects.filter(usuario=user).order_by('-fecha'))
         serializer = self.get_serializer(orders, many=True)
         return Response(serializer.data)
 
@@ -262,11 +334,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         # Usar dirección del body si existe, sino usar la del usuario
         direccion = serializer.validated_data.get('direccion_envio') or user.address
         # Asignar el usuario actual como dueño de la orden
-        orden = serializer.save(usuario=user, direccion_envio=direccion)
-        # Recalcular el total de la orden en base a los detalles
-        orden.total_update()
-        
-        return orden
+        # (el serializer ya calcula el total a partir de los detalles)
+        return serializer.save(usuario=user, direccion_envio=direccion)
         
     def perform_update(self, serializer):
         """Maneja la actualización de una orden y sus detalles"""
@@ -445,11 +514,11 @@ class CartViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Retorna solo el carrito del usuario actual"""
-        return Cart.objects.filter(usuario=self.request.user)
+        return Cart.objects.con_resumen().con_items().filter(usuario=self.request.user)
     
     def list(self, request):
         """Obtener detalles del carrito actual del usuario"""
-        carrito, created = Cart.objects.get_or_create(usuario=request.user)
+        carrito = Cart.objects.para_usuario(request.user)
         serializer = self.get_serializer(carrito)
         return Response(serializer.data)
     
@@ -472,52 +541,22 @@ class CartViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Verificar stock disponible para todos los productos (primer chequeo)
-        for item in carrito.items.all():
-            if item.cantidad > item.producto.stock_disponible:
-                return Response(
-                    {'error': f'Stock insuficiente para {item.producto.nombre}. Solo hay {item.producto.stock_disponible} unidades disponibles'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
         direccion_cliente = getattr(request.user, 'address', 'Dirección no proporcionada por el cliente')
-        
-        # Crear nuevo pedido
-        pedido = Order.objects.create(
-            usuario=request.user,
-            estado='pendiente',
-            total=carrito.total(),
-            direccion_envio=direccion_cliente
-        )
-        
-        # Transferir items del carrito al pedido (segundo chequeo y reducción de stock)
-        for item in carrito.items.all():
-            # Refrescar el producto desde la base de datos para obtener stock actualizado
-            item.producto.refresh_from_db()
-            
-            # Verificar stock nuevamente (segundo chequeo)
-            if item.cantidad > item.producto.stock_disponible:
-                # Si falla, eliminar el pedido creado y retornar error
-                pedido.delete()
-                return Response(
-                    {'error': f'Stock insuficiente para {item.producto.nombre}. Solo hay {item.producto.stock_disponible} unidades disponibles'}, 
-                    status=status.HTTP_400_BAD_REQUEST
+        items = carrito.items.values_list('producto_id', 'cantidad')
+
+        # Reserva de stock, pedido y detalles en una sola transacción:
+        # si algún producto no alcanza no queda nada a medio crear
+        try:
+            with transaction.atomic():
+                pedido = crear_pedido(
+                    items,
+                    usuario=request.user,
+                    estado='pendiente',
+                    direccion_envio=direccion_cliente
                 )
-            
-            # Crear el detalle del pedido
-            OrderDetail.objects.create(
-                pedido=pedido,
-                producto=item.producto,
-                cantidad=item.cantidad,
-                subtotal=item.cantidad * item.producto.precio
-            )
-            
-            # Incrementar stock vendido
-            item.producto.stock_vendido += item.cantidad
-            item.producto.save()
-        
-        # Vaciar el carrito
-        carrito.limpiar()
+                carrito.limpiar()
+        except StockInsuficiente as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'mensaje': 'Pedido creado correctamente',
@@ -717,15 +756,15 @@ class CartItemViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Retorna solo los items del carrito del usuario actual"""
-        return CartItem.objects.filter(carrito__usuario=self.request.user)
+        return CartItem.objects.filter(carrito__usuario=self.request.user).select_related('producto__categoria')
     
     def list(self, request, *args, **kwargs):
         """Lista todos los items del carrito del usuario"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        items = list(self.get_queryset().order_by('id'))
+        serializer = self.get_serializer(items, many=True)
         return Response({
             'items': serializer.data,
-            'total_items': queryset.count()
+            'total_items': len(items)  # ya cargados: sin un COUNT aparte
         })
     
     def retrieve(self, request, *args, **kwargs):
@@ -804,7 +843,9 @@ class FavoriteViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        qs = Favorite.objects.select_related('product')
+        qs = Favorite.objects.select_related('product').only(
+            'id', 'user_id', 'created_at', 'product__id', 'product__nombre', 'product__precio'
+        )
         if getattr(user, 'role', None) in ['admin', 'operator']:
             uid = self.request.query_params.get('user')
             return qs.filter(user_id=uid) if uid else qs
@@ -856,13 +897,17 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-@api_view(['POST'])
+@api_view(['GET', 'POST'])
 @permission_classes([IsAdminOrOperator])
 def manual_sync_products(request):
     """
     Endpoint para sincronización manual de productos externos.
     Accesible por administradores y operadores.
     
+    GET /api/products/sync-external/?limit=20
+        Historial de sincronizaciones (SyncRun), la más reciente primero,
+        con la duración y los segundos/cantidad de cada etapa.
+
     POST /api/products/sync-external/
     
     Returns:
@@ -872,12 +917,22 @@ def manual_sync_products(request):
             "productos_actualizados": 517,
             "total": 527,
             "desactivados": 0,
-            "errores": []
+            "errores": [],
+            "sync_run_id": 42,
+            "etapas": {"fetch": {"segundos": 3.2, "cantidad": 45}, ...}
         }
     """
+    if request.method == 'GET':
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 200)
+        except ValueError:
+            return Response({'detail': 'limit debe ser un entero'}, status=status.HTTP_400_BAD_REQUEST)
+        runs = SyncRun.objects.select_related('usuario').order_by('-iniciado')[:limit]
+        return Response(SyncRunSerializer(runs, many=True).data)
+
     try:
         logger.info("Sincronización manual iniciada por usuario: " + request.user.username)
-        resultado = sync_external_products()
+        resultado = sync_external_products(origen='manual', usuario=request.user)
         
         return Response(resultado, status=status.HTTP_200_OK)
         
@@ -974,56 +1029,12 @@ def reset_stock_vendido(request, pk):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['POST'])
-@permission_classes([IsAdminUser])
-def bulk_update_markup(request):
-    """
-    Recalcula los precios de todos los productos con un nuevo markup.
-    Solo afecta productos que NO tienen precio manual.
-    
-    POST /api/products/bulk-markup/
-    Body: {"markup_percentage": 100}  // 100% = precio x2
-    
-    Returns:
-        {
-            "success": true,
-            "productos_actualizados": 527
-        }
-    """
-    try:
-        markup_percentage = float(request.data.get('markup_percentage', 100))
-        markup_multiplier = 1 + (markup_percentage / 100)
-        
-        # Solo actualizar productos sin precio manual y con precio_proveedor
-        productos = Product.objects.filter(
-            precio_manual=False,
-            precio_proveedor__isnull=False
-        )
-        
-        count = 0
-        for producto in productos:
-            producto.precio = float(producto.precio_proveedor) * markup_multiplier
-            producto.save()
-            count += 1
-        
-        return Response({
-            'success': True,
-            'productos_actualizados': count,
-            'markup_aplicado': markup_percentage
-        }, status=status.HTTP_200_OK)
-        
-    except Exception as e:
-        return Response({
-            'success': False,
-            'error': str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
 # ============================================================
 # ENDPOINTS PARA MERCADO PAGO
 # ============================================================
 
 from .mercadopago_service import create_preference, process_payment_notification
+from .mp_events import registrar_notificacion
 
 
 @api_view(['POST'])
@@ -1035,7 +1046,7 @@ def create_mp_preference(request):
     POST /market/mp/create-preference/
     """
     try:
-        print("📦 Datos recibidos:", request.data)
+        logger.debug("mp.create_preference.request datos=%s", request.data)
         
         customer_data = request.data.get('customer_data', {})
         shipping_data = request.data.get('shipping_data', {})
@@ -1075,17 +1086,18 @@ def create_mp_preference(request):
             } for item in cart_items]
         }
         
-        print("📋 Order data preparada:", order_data)
-        
         from .serializer import OrderSerializer
         serializer = OrderSerializer(data=order_data, context={'request': request})
         
         if not serializer.is_valid():
-            print(f"❌ Error de validación del serializer: {serializer.errors}")
+            logger.warning("mp.create_preference.invalido errores=%s", serializer.errors)
             return Response({'success': False, 'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
         
-        order = serializer.save()
-        print(f"✅ Orden creada: #{order.id}")
+        try:
+            order = serializer.save()
+        except serializers.ValidationError as e:
+            return Response({'success': False, 'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info("mp.create_preference.orden order_id=%s", order.id)
         
         # Preparar items para MP
         mp_items = [{'name': item.get('name', 'Producto'), 'quantity': item.get('quantity', 1), 'price': item.get('price', 0)} for item in cart_items]
@@ -1116,9 +1128,7 @@ def create_mp_preference(request):
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        print(f"❌ Error creando preferencia de MP: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("mp.create_preference.error error=%s", e)
         return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -1127,90 +1137,25 @@ def mercadopago_webhook(request):
     """
     Webhook para recibir notificaciones de Mercado Pago.
     POST /market/mp/webhook/
-    """
-    try:
-        topic = request.query_params.get('topic') or request.data.get('type')
-        resource_id = request.query_params.get('id') or request.data.get('data', {}).get('id')
-        
-        logger.info(f"Webhook MP - Topic: {topic}, ID: {resource_id}")
-        
-        if topic == 'payment' and resource_id:
-            payment_info = process_payment_notification(resource_id)
-            order_id = payment_info.get('order_id')
-            
-            if order_id:
-                try:
-                    order = Order.objects.get(id=order_id)
-                    
-                    if payment_info['status'] == 'approved':
-                        order.estado_pago = 'completado'
-                        order.estado = 'pagado'
-                        pay_estado = 'completado'
-                    elif payment_info['status'] == 'pending':
-                        order.estado_pago = 'pendiente'
-                        pay_estado = 'pendiente'
-                    elif payment_info['status'] in ['rejected', 'cancelled']:
-                        order.estado_pago = 'fallido'
-                        pay_estado = 'fallido'
-                    else:
-                        pay_estado = 'en_revision'
-                    
-                    order.save()
-                    
-                    # Crear o actualizar registro de pago
-                    existing_pay = Pay.objects.filter(pedido=order, external_id=str(payment_info['payment_id'])).first()
-                    previous_estado = existing_pay.estado if existing_pay else None
 
-                    pay, created = Pay.objects.get_or_create(
-                        pedido=order,
-                        external_id=str(payment_info['payment_id']),
-                        defaults={
-                            'metodo': 'tarjeta',
-                            'monto_pagado': payment_info['transaction_amount'],
-                            'estado': pay_estado,
-                            'metadata': {
-                                'payment_method_id': payment_info['payment_method_id'],
-                                'status_detail': payment_info['status_detail'],
-                                'mp_payment_id': payment_info['payment_id']
-                            }
-                        }
-                    )
-                    if not created:
-                        # Actualizar si ya existe
-                        pay.estado = pay_estado
-                        pay.monto_pagado = payment_info['transaction_amount']
-                        pay.metadata.update({
-                            'payment_method_id': payment_info['payment_method_id'],
-                            'status_detail': payment_info['status_detail'],
-                            'mp_payment_id': payment_info['payment_id']
-                        })
-                        pay.save()
+    Solo registra el pago en la cola (MercadoPagoEvent, deduplicado por
+    payment id) y responde; el worker del scheduler consulta a MP y actualiza
+    el pedido (market/mp_events.py).
+    """
+    topic = request.query_params.get('topic') or request.data.get('type')
+    resource_id = request.query_params.get('id') or request.data.get('data', {}).get('id')
 
-                    logger.info(f"Orden {order_id} actualizada: {payment_info['status']}, Pay {'creado' if created else 'actualizado'}")
+    logger.info("mp.webhook topic=%s id=%s", topic, resource_id)
 
-                    # Notificar a Telegram solo si el estado pasó a 'completado'
-                    try:
-                        should_notify = False
-                        if pay_estado == 'completado':
-                            if created:
-                                should_notify = True
-                            else:
-                                if previous_estado != 'completado':
-                                    should_notify = True
+    if topic == 'payment' and resource_id:
+        try:
+            registrar_notificacion(resource_id, topic)
+        except Exception as e:
+            # Sin 200 MP reintenta la notificación más tarde
+            logger.exception("mp.webhook.error id=%s error=%s", resource_id, e)
+            return Response({'status': 'error'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-                        if should_notify:
-                            send_order_paid_notification(order)
-                    except Exception:
-                        logger.exception('Error al enviar notificación a Telegram')
-                    
-                except Order.DoesNotExist:
-                    logger.error(f"Orden {order_id} no encontrada")
-        
-        return Response({'status': 'ok'}, status=status.HTTP_200_OK)
-        
-    except Exception as e:
-        logger.error(f"Error en webhook MP: {str(e)}")
-        return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_200_OK)
+    return Response({'status': 'ok'}, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -1399,24 +1344,36 @@ def reset_stock_vendido(request, pk):
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def bulk_update_markup(request):
-    """Actualiza el markup (margen) de múltiples productos"""
+    """
+    Actualiza el markup (margen) de múltiples productos con un único UPDATE.
+    
+    Body:
+        markup: multiplicador (default 2.0 = 100% de margen) o
+        markup_percentage: porcentaje (100 = x2)
+        producto_ids / categoria_ids: acotan los productos (opcional)
+        incluir_manuales: false para respetar precios editados a mano (default true)
+        dry_run: true para previsualizar sin escribir
+    """
     try:
-        markup = request.data.get('markup', 2.0)  # Por defecto 100% de margen (x2)
-        producto_ids = request.data.get('producto_ids', [])
-        
-        if not producto_ids:
-            # Si no se especifican IDs, aplicar a todos los productos
-            productos = Product.objects.filter(precio_proveedor__isnull=False)
-        else:
-            productos = Product.objects.filter(id__in=producto_ids, precio_proveedor__isnull=False)
-        
-        actualizados = 0
-        for producto in productos:
-            producto.precio = producto.precio_proveedor * float(markup)
-            producto.precio_manual = False
-            producto.save()
-            actualizados += 1
+        try:
+            if request.data.get('markup_percentage') is not None:
+                markup = markup_desde_porcentaje(request.data['markup_percentage'])
+            else:
+                markup = normalizar_markup(request.data.get('markup', 2.0))  # Por defecto 100% de margen (x2)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        resultado = repreciar(
+            markup,
+            ids=request.data.get('producto_ids') or None,
+            categorias=request.data.get('categoria_ids') or None,
+            incluir_manuales=_flag(request, 'incluir_manuales', True),
+            dry_run=_flag(request, 'dry_run'),
+        )
+        if resultado['dry_run']:
+            return Response(_resumen_repricing(resultado), status=status.HTTP_200_OK)
         
+        actualizados = resultado['actualizados']
         return Response({
             'mensaje': f'{actualizados} productos actualizados',
             'actualizados': actualizados,